@@ -0,0 +1,531 @@
+# [비동기 API 모듈] DART/네이버/OpenAI 호출의 asyncio 버전을 제공합니다.
+# 이벤트 루프마다 공용 aiohttp 세션(커넥션 풀)을 하나 두고, 하나의 루프에서 수백 개의 요청을 동시에 처리합니다.
+# 응답 파싱/캐시/프롬프트는 동기 모듈(dart_api, naver_api, financial, news, llm_utils)과 같은 함수를 사용하므로 결과 형식이 동일합니다.
+# 취소: 각 함수는 일반 코루틴이므로 task.cancel() / asyncio.wait_for(...)로 진행 중인 요청까지 취소됩니다.
+# 사용 예:
+#   async with async_client():
+#       codes = await asyncio.gather(*(async_get_corp_code(api_key, name) for name in names))
+import os
+import time
+import heapq
+import asyncio
+import tempfile
+import weakref
+from contextlib import asynccontextmanager
+import aiohttp
+from deadline import DeadlineExceeded, async_hedged_call, call_timeout, remaining, report_deadline
+
+ASYNC_HTTP_LIMIT = int(os.getenv("ASYNC_HTTP_LIMIT", "200"))                    # 루프당 최대 동시 연결 수
+ASYNC_HTTP_LIMIT_PER_HOST = int(os.getenv("ASYNC_HTTP_LIMIT_PER_HOST", "50"))   # 호스트별 최대 동시 연결 수
+ASYNC_HTTP_TIMEOUT = 60
+
+DART_BASE_URL = "https://opendart.fss.or.kr/api"
+
+# 이벤트 루프 → {'session', 'locks', 'llm_gate'} (루프가 닫히면 함께 해제)
+_loop_states = weakref.WeakKeyDictionary()
+
+def _loop_state():
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        state = {"session": None, "locks": {}, "llm_gate": None}
+        _loop_states[loop] = state
+    return state
+
+def get_async_session():
+    """현재 이벤트 루프의 공용 aiohttp.ClientSession 반환 (keep-alive 커넥션 재사용)"""
+    state = _loop_state()
+    session = state["session"]
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=ASYNC_HTTP_LIMIT, limit_per_host=ASYNC_HTTP_LIMIT_PER_HOST, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=ASYNC_HTTP_TIMEOUT))
+        state["session"] = session
+    return session
+
+async def close_async_session():
+    """현재 이벤트 루프의 공용 세션 종료 (루프 종료 전에 호출)"""
+    state = _loop_state()
+    session, state["session"] = state["session"], None
+    if session is not None and not session.closed:
+        await session.close()
+
+@asynccontextmanager
+async def async_client():
+    """블록 안에서 공용 세션을 사용하고, 끝나면 닫음"""
+    try:
+        yield get_async_session()
+    finally:
+        await close_async_session()
+
+def _loop_lock(name):
+    locks = _loop_state()["locks"]
+    if name not in locks:
+        locks[name] = asyncio.Lock()
+    return locks[name]
+
+async def _get_bytes(url, params=None, headers=None, timeout=None):
+    """GET 후 (status, body bytes) 반환 (timeout은 리포트 마감까지 남은 시간 이내로 제한)"""
+    timeout = call_timeout(ASYNC_HTTP_TIMEOUT if timeout is None else timeout)
+    async with get_async_session().get(url, params=params, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        return response.status, await response.read()
+
+async def _acquire_credential(pool):
+    """CredentialPool.acquire_wait의 비동기 버전 (모든 키가 잠시 제외됐으면 해제될 때까지 asyncio.sleep)"""
+    from credentials import CredentialsExhausted, CREDENTIAL_MAX_WAIT
+    while True:
+        try:
+            return pool.acquire()
+        except CredentialsExhausted as e:
+            left = remaining()
+            if e.retry_at is None or e.retry_at - time.time() > (CREDENTIAL_MAX_WAIT if left is None else min(CREDENTIAL_MAX_WAIT, left)):
+                raise
+            await asyncio.sleep(max(0.05, e.retry_at - time.time()))
+
+# ---------------------------------------------------------------- DART
+async def _dart_get_bytes(api_key, url, params, timeout=None):
+    """dart_api.dart_get의 비동기 버전: 키 풀에서 crtfc_key를 골라 GET 후 (status, body bytes), 같은 요청은 루프 안에서 1회로 병합"""
+    from singleflight import get_async_flight, request_key
+    from credentials import resolve_pool
+    pool = resolve_pool("dart", api_key)
+    return await get_async_flight("dart").do(request_key(url, params, pool.identity), lambda: _dart_fetch_bytes(pool, url, params, timeout))
+
+async def _dart_fetch_bytes(api_key, url, params, timeout):
+    from credentials import resolve_pool
+    from dart_api import dart_response_status, dart_key_outcome, dart_hedge_allowed
+    pool = resolve_pool("dart", api_key)
+    for attempt in range(max(1, len(pool))):
+        credential = pool.acquire()
+        request_params = dict(params, crtfc_key=credential.secret)
+        # 읽기 전용 조회: 엔드포인트 p95보다 늦으면 같은 요청을 한 번 더 보내 먼저 온 응답 사용 (늦은 쪽은 취소, 중복 요청도 키 사용량에 반영)
+        if dart_hedge_allowed(url):
+            status, content = await async_hedged_call(url, lambda: _get_bytes(url, params=request_params, timeout=timeout),
+                                                      on_hedge=lambda: pool.count_extra(credential))
+        else:
+            status, content = await _get_bytes(url, params=request_params, timeout=timeout)
+        outcome = dart_key_outcome(status, dart_response_status(content))
+        pool.report(credential, outcome)
+        if outcome not in ("quota", "auth"):
+            break
+    return status, content
+
+async def async_load_corp_code_index(api_key, refresh=False):
+    """dart_api.load_corp_code_index의 비동기 버전 (같은 프로세스 메모리 인덱스를 공유)"""
+    import dart_api
+    index = dart_api._corp_code_index
+
+    def fresh():
+        return index and time.time() - index["loaded_at"] < dart_api.CORP_CODE_TTL
+
+    if not refresh and fresh():
+        return index
+    async with _loop_lock("corp_code"):
+        # 동시에 들어온 호출은 첫 다운로드 결과를 재사용
+        if not refresh and fresh():
+            return index
+        status, content = await _dart_get_bytes(api_key, f"{DART_BASE_URL}/corpCode.xml", {}, timeout=60)
+        if status != 200:
+            raise Exception(f"Failed to download corpCode.xml: {status}")
+        by_name, listed, by_stock = await asyncio.to_thread(dart_api.parse_corp_code_zip, content)
+        with dart_api._corp_code_lock:
+            index.update({"by_name": by_name, "listed": listed, "by_stock": by_stock, "loaded_at": time.time()})
+        return index
+
+async def async_get_corp_code(api_key, company_name):
+    """회사명을 입력받아 DART corp_code를 반환"""
+    corp_code = (await async_load_corp_code_index(api_key))["by_name"].get(company_name)
+    if corp_code is None:
+        raise Exception(f"Company '{company_name}' not found in corpCode.xml.")
+    return corp_code
+
+async def async_get_disclosures(api_key, corp_code, bgn_de='20240101', end_de=None, page_count=10, page_no=1):
+    """dart_api.get_disclosures의 비동기 버전"""
+    params = {"bgn_de": bgn_de, "page_count": page_count, "page_no": page_no}
+    if corp_code:
+        params["corp_code"] = corp_code
+    if end_de:
+        params["end_de"] = end_de
+    status, content = await _dart_get_bytes(api_key, f"{DART_BASE_URL}/list.json", params)
+    if status != 200:
+        raise Exception(f"Failed to get disclosures: {status}")
+    from financial import _loads_json_bytes
+    return _loads_json_bytes(content)
+
+async def async_fetch_financial_statements(api_key, corp_code, year, fs_div="CFS"):
+    """financial.fetch_financial_statements의 비동기 버전 (실패 시 None)"""
+    from financial import _loads_json_bytes
+    params = {"corp_code": corp_code, "bsns_year": year, "reprt_code": "11011", "fs_div": fs_div}
+    status, content = await _dart_get_bytes(api_key, f"{DART_BASE_URL}/fnlttSinglAcntAll.json", params)
+    if status != 200:
+        print(f"Failed to get financials for year {year} ({fs_div}): {status}")
+        return None
+    try:
+        return _loads_json_bytes(content)
+    except Exception as e:
+        print(f"[ERROR] JSON decode 실패: {e}")
+        print(f"[DEBUG] 응답 일부: {content[:200]}")
+        return None
+
+async def async_get_recent_filings(api_key, corp_code, since_date, count=40, log=print):
+    """dart_api.get_recent_filings의 비동기 버전 (페이지는 앞 페이지 결과를 보고 순차 조회)"""
+    from dart_api import collect_recent_filings, warn_short_filings
+    filings = []
+    used = set()
+    page = 1
+    while len(filings) < count:
+        disclosures = await async_get_disclosures(api_key, corp_code, bgn_de=since_date, page_count=100, page_no=page)
+        if not collect_recent_filings(disclosures, filings, used, count):
+            break
+        page += 1
+    warn_short_filings(filings, count, log)
+    return filings
+
+async def async_fetch_audit_sections(api_key, rcept_no, max_chars=6000):
+    """dart_api.fetch_audit_sections의 비동기 버전 (같은 rcept_no 캐시 사용, zip 파싱은 워커 스레드)"""
+    from dart_api import audit_section_cache
+    cached = audit_section_cache.get(rcept_no)
+    if cached is not None:
+        return cached
+    from singleflight import get_async_flight
+    from credentials import resolve_pool
+    pool = resolve_pool("dart", api_key)
+    sections = await get_async_flight("dart").do(("document.xml", pool.identity, rcept_no, max_chars), lambda: _async_download_audit_sections(pool, rcept_no, max_chars))
+    return list(sections)
+
+async def _async_download_audit_sections(api_key, rcept_no, max_chars):
+    from dart_api import audit_section_cache, read_audit_sections_spool, AUDIT_DOCUMENT_SPOOL_BYTES, dart_response_status, dart_key_outcome
+    from credentials import resolve_pool
+    pool = resolve_pool("dart", api_key)
+    try:
+        for attempt in range(max(1, len(pool))):
+            credential = pool.acquire()
+            async with get_async_session().get(f"{DART_BASE_URL}/document.xml", params={"crtfc_key": credential.secret, "rcept_no": rcept_no},
+                                               timeout=aiohttp.ClientTimeout(total=call_timeout(60))) as response:
+                if response.status != 200:
+                    pool.report(credential, "error")
+                    print(f"[DEBUG] 공시 원문 다운로드 실패 ({rcept_no}): {response.status}")
+                    return []
+                if any(t in response.content_type for t in ("json", "xml", "text")):
+                    # 오류 응답(status/message)만 body를 읽어 키 상태 확인
+                    body = await response.read()
+                    outcome = dart_key_outcome(response.status, dart_response_status(body))
+                    pool.report(credential, outcome)
+                    if outcome in ("quota", "auth") and attempt < len(pool) - 1:
+                        continue
+                    print(f"[DEBUG] 공시 원문 응답 오류 ({rcept_no}): {body[:200]}")
+                    return []
+                pool.report(credential, "ok")
+                with tempfile.SpooledTemporaryFile(max_size=AUDIT_DOCUMENT_SPOOL_BYTES) as buf:
+                    async for chunk in response.content.iter_chunked(64 * 1024):
+                        buf.write(chunk)
+                    sections = await asyncio.to_thread(read_audit_sections_spool, buf, rcept_no, max_chars)
+                break
+    except Exception as e:
+        print(f"[DEBUG] 공시 원문 파싱 실패 ({rcept_no}): {e}")
+        return []
+    if sections is None:
+        return []
+    audit_section_cache.set(rcept_no, sections)
+    return sections
+
+async def async_get_yearly_key_reports(api_key, corp_code, years, fetch_documents=True):
+    """dart_api.get_yearly_key_reports의 비동기 버전 (연도별 공시목록과 원문을 모두 동시에 조회, 결과 순서는 동일)"""
+    from dart_api import Filing, select_yearly_key_reports, needs_audit_sections
+
+    async def report_filing(report, item):
+        sections = await async_fetch_audit_sections(api_key, item['rcept_no']) if fetch_documents and needs_audit_sections(report, item) else []
+        return Filing.from_item(item, sections)
+
+    async def year_reports(year):
+        disclosures = await async_get_disclosures(api_key, corp_code, bgn_de=f'{year}0101', end_de=f'{year}1231', page_count=100)
+        return await asyncio.gather(*(report_filing(report, item) for report, item in select_yearly_key_reports(disclosures)))
+
+    per_year = await asyncio.gather(*(year_reports(year) for year in years))
+    return [filing for filings in per_year for filing in filings]
+
+# ---------------------------------------------------------------- 네이버
+async def _async_fetch_news_page(credentials, company_name, start, display):
+    from naver_api import NAVER_NEWS_URL
+    from singleflight import get_async_flight, request_key
+    params = {"query": company_name, "sort": "date", "display": display, "start": start}
+    items = await get_async_flight("naver").do(request_key(NAVER_NEWS_URL, params, credentials.identity), lambda: _async_naver_news_items(credentials, params))
+    # 병합된 호출자끼리 같은 list를 공유하지 않도록 복사
+    return None if items is None else [dict(item) for item in items]
+
+async def _async_naver_news_items(credentials, params):
+    from naver_api import NAVER_NEWS_URL, naver_request_headers, naver_key_outcome
+    for attempt in range(max(1, len(credentials))):
+        credential = credentials.acquire()
+        headers = naver_request_headers(credential)
+        try:
+            status, content = await async_hedged_call(NAVER_NEWS_URL, lambda: _get_bytes(NAVER_NEWS_URL, params=params, headers=headers, timeout=10),
+                                                      on_hedge=lambda: credentials.count_extra(credential))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            credentials.report(credential, "error")
+            print("네이버 뉴스 API 호출 실패", e)
+            return None
+        outcome = naver_key_outcome(status)
+        credentials.report(credential, outcome)
+        if outcome not in ("quota", "auth"):
+            break
+    if status != 200:
+        print("네이버 뉴스 API 호출 실패", status)
+        return None
+    try:
+        from financial import _loads_json_bytes
+        return _loads_json_bytes(content).get('items', [])
+    except Exception as e:
+        print('response.text:', content[:500].decode('utf-8', 'replace'))
+        print('JSON decode error:', e)
+        return None
+
+async def async_iter_news_from_naver(company_name, since_date, max_news=None, naver_client_id=None, naver_client_secret=None, concurrency=3, max_calls=10, naver_pool=None):
+    """naver_api.iter_news_from_naver의 비동기 generator 버전 (wave 안의 페이지를 동시에 호출)"""
+    from naver_api import naver_credentials, plan_news_pages, NewsPageStream
+    credentials = naver_credentials(naver_client_id, naver_client_secret, naver_pool)
+    waves, display = plan_news_pages(max_news, concurrency, max_calls)
+    stream = NewsPageStream(since_date, max_news, display)
+    for wave in waves:
+        pages = await asyncio.gather(*(_async_fetch_news_page(credentials, company_name, start, display) for start in wave))
+        for items in pages:
+            for item in stream.feed(items):
+                yield item
+            if stream.finished:
+                return
+
+async def async_get_news_from_naver(company_name, since_date, max_news=10, naver_client_id=None, naver_client_secret=None, naver_pool=None):
+    """naver_api.get_news_from_naver의 비동기 버전 (NewsItem 목록)"""
+    return [item async for item in async_iter_news_from_naver(company_name, since_date, max_news=max_news, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, naver_pool=naver_pool)]
+
+# ---------------------------------------------------------------- LLM
+class _AsyncLLMGate:
+    """
+    이벤트 루프용 LLM 동시 실행 제한 (llm_utils.LLMDispatcher의 asyncio 버전)
+    - 최대 limit개까지 동시 호출, 대기 요청은 priority 순으로 진행
+    - 429 응답 시 Retry-After/x-ratelimit-reset-requests 시각까지 새 호출을 멈춤
+    """
+    def __init__(self, limit):
+        self.limit = max(1, limit)
+        self.active = 0
+        self.waiters = []  # heap of (priority, seq, future)
+        self.seq = 0
+        self.paused_until = 0.0
+
+    async def acquire(self, priority):
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+        else:
+            self.seq += 1
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiters, (priority, self.seq, future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release()  # 슬롯을 받은 직후 취소됨 → 다음 대기 요청에 넘김
+                raise
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.release()
+                raise
+
+    def release(self):
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)  # 슬롯을 그대로 넘김 (active 유지)
+                return
+        self.active -= 1
+
+    def pause(self, headers):
+        from llm_utils import _parse_reset_seconds
+        wait = _parse_reset_seconds(headers.get("retry-after")) or _parse_reset_seconds(headers.get("x-ratelimit-reset-requests")) or 1.0
+        self.paused_until = max(self.paused_until, time.monotonic() + wait)
+
+    def metrics(self):
+        return {"active": self.active, "queue_depth": sum(1 for _, _, f in self.waiters if not f.done()), "limit": self.limit}
+
+def get_llm_gate():
+    from llm_utils import LLM_MAX_CONCURRENCY
+    state = _loop_state()
+    if state["llm_gate"] is None:
+        state["llm_gate"] = _AsyncLLMGate(LLM_MAX_CONCURRENCY)
+    return state["llm_gate"]
+
+async def _async_openai_complete(llm_api_key, prompt, route, priority):
+    from llm_utils import build_openai_request, openai_key_outcome, LLM_MAX_RETRIES
+    from credentials import resolve_pool, CredentialsExhausted
+    pool = resolve_pool("openai", llm_api_key)
+    gate = get_llm_gate()
+    max_attempts = LLM_MAX_RETRIES + max(1, len(pool))
+    for attempt in range(max_attempts):
+        try:
+            credential = await _acquire_credential(pool)
+        except CredentialsExhausted as e:
+            print(f"[LLM API ERROR] {e}")
+            return ""
+        url, headers, payload = build_openai_request(credential.secret, prompt, route)
+        await gate.acquire(priority)
+        outcome, retry_after = "error", None
+        try:
+            async with get_async_session().post(url, headers=headers, json=payload, timeout=aiohttp.ClientTimeout(total=call_timeout(30, "LLM 호출"))) as response:
+                status = response.status
+                response_headers = {k.lower(): v for k, v in response.headers.items()}
+                outcome, retry_after = openai_key_outcome(status, response_headers)
+                if status == 200:
+                    body = await response.json(content_type=None)
+                    return body["choices"][0]["message"]["content"]
+                text = await response.text()
+                if status == 429 and len(pool) <= 1:
+                    # 키 1개면 루프 전체를 멈추고, 여러 개면 해당 키만 제외(credentials)
+                    gate.pause(response_headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError) as e:
+            print(f"[LLM API EXCEPTION] {e}")
+            return ""
+        finally:
+            gate.release()
+            pool.report(credential, outcome, retry_after)
+        if outcome in ("quota", "auth") and attempt < max_attempts - 1:
+            continue
+        print(f"[LLM API ERROR] status={status}, body={text[:200]}")
+        return ""
+    return ""
+
+async def async_query_llm(llm_api_key, prompt, temperature=None, priority=None, task="default"):
+    """llm_utils.query_llm의 비동기 버전 (같은 라우트/응답 캐시 사용, openai 외 백엔드는 워커 스레드에서 실행)"""
+    from llm_utils import resolve_llm_route, llm_cache_key, llm_cache_get, llm_cache_put, get_llm_backend, llm_flight_scope, PRIORITY_NORMAL
+    priority = PRIORITY_NORMAL if priority is None else priority
+    route = resolve_llm_route(task, temperature)
+    cache_key = llm_cache_key(route, prompt)
+    cached = llm_cache_get(cache_key)
+    if cached is not None:
+        return cached
+    from singleflight import get_async_flight
+
+    async def complete():
+        if route["backend"] == "openai":
+            content = await _async_openai_complete(llm_api_key, prompt, route, priority)
+        else:
+            content = await asyncio.to_thread(get_llm_backend(route["backend"]).complete, llm_api_key, prompt, route, priority)
+        llm_cache_put(cache_key, content)
+        return content
+
+    # 마감 초과(DeadlineExceeded)는 동기 버전과 같이 빈 응답으로 처리
+    try:
+        return await get_async_flight("llm").do((llm_flight_scope(llm_api_key, route), cache_key), complete)
+    except DeadlineExceeded as e:
+        print(f"[LLM API ERROR] {e}")
+        return ""
+
+async def async_summarize_texts_in_chunks(texts, llm_api_key, chunk_size=5, max_chunk_chars=1500, priority=None):
+    """llm_utils.summarize_texts_in_chunks의 비동기 버전 (chunk를 모두 동시에 요청, 동시 실행 수는 LLM gate가 제한)"""
+    from llm_utils import split_chunks, chunk_summary_prompt, PRIORITY_BULK, LLM_EMPTY_SUMMARY
+    priority = PRIORITY_BULK if priority is None else priority
+
+    async def summarize_chunk(chunk):
+        summary = await async_query_llm(llm_api_key, chunk_summary_prompt(chunk, max_chunk_chars), priority=priority, task="summary")
+        return summary.strip() if summary.strip() else LLM_EMPTY_SUMMARY
+
+    return list(await asyncio.gather(*(summarize_chunk(chunk) for chunk in split_chunks(texts, chunk_size))))
+
+async def async_summarize_articles(articles, llm_api_key):
+    """news.summarize_articles의 비동기 버전 (같은 기사 요약 캐시 사용)"""
+    from news import lookup_article_summaries, store_article_summaries, article_summary_prompt, NEWS_FALLBACK_PREFIX
+    from llm_utils import PRIORITY_BULK
+    summaries, unseen = lookup_article_summaries(articles)
+    if unseen:
+        results = await asyncio.gather(*(async_query_llm(llm_api_key, article_summary_prompt(text), priority=PRIORITY_BULK, task="summary") for _, text in unseen))
+        store_article_summaries(unseen, results, summaries)
+    print(f"[INFO] 뉴스 기사 요약: {len(articles)}건 중 신규 {len(unseen)}건 LLM 호출")
+    return [summaries.get(key) or f"{NEWS_FALLBACK_PREFIX} {text[:200]}" for key, text in articles]
+
+async def async_news_search_and_summary_with_risk(company_name, since_date, financial_summary, llm_api_key=None, naver_client_id=None, naver_client_secret=None, min_news=40, max_news=40, naver_pool=None, log=print):
+    """news.news_search_and_summary_with_risk의 비동기 버전"""
+    from news import news_since_date, collect_news_articles, warn_short_news, plan_news_chunks, merge_article_summaries, select_news_chunks
+    since_date = news_since_date(since_date)
+    articles = collect_news_articles([item async for item in async_iter_news_from_naver(company_name, since_date, max_news=max_news, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, naver_pool=naver_pool)])
+    warn_short_news(articles, min_news, log)
+    news_list_limited, news_chunk_size = plan_news_chunks([text for _, text in articles], max_news)
+    if not news_list_limited:
+        return []
+    article_summaries = await async_summarize_articles(articles[:len(news_list_limited)], llm_api_key)
+    return select_news_chunks(merge_article_summaries(article_summaries, news_chunk_size))
+
+# ---------------------------------------------------------------- 리포트
+class _MemoryCheckpoint:
+    """run_stage용 get/put 체크포인트 (외부 체크포인트가 있으면 함께 기록)"""
+    def __init__(self, outer=None):
+        self.outer = outer
+        self.values = {}
+        # 이번 리포트에만 쓰고 외부 체크포인트에 저장하지 않은 단계 (summarize_company_risks가 하위 단계도 저장하지 않음)
+        self.incomplete = set()
+
+    def get(self, stage):
+        if stage in self.values:
+            return self.values[stage]
+        return self.outer.get(stage) if self.outer is not None else None
+
+    def put(self, stage, value):
+        self.values[stage] = value
+        if self.outer is not None:
+            self.outer.put(stage, value)
+
+    def hold(self, stage, value):
+        """불완전한 단계 결과: 이번 리포트에서만 사용"""
+        self.values[stage] = value
+        self.incomplete.add(stage)
+
+async def async_summarize_company_risks(company_name, api_key, llm_api_key, since_date, financial_summary, naver_client_id=None, naver_client_secret=None, save=True, checkpoint=None, peer_summary=None, tier=None, budget=None, naver_pool=None, log=print):
+    """
+    risk_summary.summarize_company_risks의 비동기 버전
+    네트워크 비중이 큰 단계(최근 공시, 연도별 보고서 원문, 뉴스 수집+chunk 요약)를 이벤트 루프에서 동시에 실행해 체크포인트에 넣고,
+    나머지 조립/분석 단계는 같은 체크포인트로 동기 함수를 워커 스레드에서 실행 (리포트 내용은 동기 버전과 동일)
+    리포트 모드(tier)에서 실행하지 않는 단계는 미리 가져오지 않음 (동시 실행이므로 시간 예산 축약/생략은 동기 단계에서만 판단)
+    리포트 마감(예산 × REPORT_DEADLINE_FACTOR)이 지나면 진행 중인 미리 가져오기를 모두 취소하고, 가져온 단계만으로 리포트 생성
+    """
+    from report_tiers import ReportBudget
+    budget = budget or ReportBudget(tier)
+    with report_deadline(budget.deadline_seconds()):
+        return await _async_summarize_company_risks(company_name, api_key, llm_api_key, since_date, financial_summary, naver_client_id, naver_client_secret, save, checkpoint, peer_summary, budget, naver_pool, log)
+
+async def _async_summarize_company_risks(company_name, api_key, llm_api_key, since_date, financial_summary, naver_client_id, naver_client_secret, save, checkpoint, peer_summary, budget, naver_pool, log):
+    from risk_summary import summarize_company_risks, encode_stage_value, saved_stage_value, StageIncomplete, STAGE_RESULT_CHECKS
+    checkpoint = _MemoryCheckpoint(checkpoint)
+    corp_code = await async_get_corp_code(api_key, company_name)
+    current_year = int(time.strftime('%Y'))
+    years = [current_year - 1 - i for i in range(5)]
+    stages = {
+        "filings": lambda: async_get_recent_filings(api_key, corp_code, since_date, count=budget.option("filings_count", 40), log=log),
+        "yearly_reports": lambda: async_get_yearly_key_reports(api_key, corp_code, years),
+        "news": lambda: async_news_search_and_summary_with_risk(company_name, since_date, financial_summary, llm_api_key, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, min_news=budget.option("news_count", 40), max_news=budget.option("news_count", 40), naver_pool=naver_pool, log=log),
+    }
+    pending = {stage: make for stage, make in stages.items() if budget.enabled(stage) and saved_stage_value(checkpoint, stage) is None}
+
+    async def prefetch(stage, make):
+        value = await make()
+        try:
+            STAGE_RESULT_CHECKS.get(stage, lambda v: v)(value)
+        except StageIncomplete as e:
+            print(f"[경고] {stage} 결과 불완전({e}), 체크포인트에 저장하지 않음")
+            checkpoint.hold(stage, encode_stage_value(stage, e.value))
+            return
+        checkpoint.put(stage, encode_stage_value(stage, value))
+
+    tasks = [asyncio.ensure_future(prefetch(stage, make)) for stage, make in pending.items()]
+    if tasks:
+        done, not_done = await asyncio.wait(tasks, timeout=remaining())
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            await asyncio.gather(*not_done, return_exceptions=True)
+            print(f"[경고] 리포트 마감 시간 초과로 미리 가져오기 {len(not_done)}건 취소")
+        # 마감 초과로 끝난 단계는 건너뛰고(동기 단계에서 예산에 따라 생략), 그 밖의 오류는 그대로 전달
+        errors = [task.exception() for task in done if task.exception() is not None]
+        errors = [e for e in errors if not isinstance(e, DeadlineExceeded)]
+        if errors:
+            raise errors[0]
+    return await asyncio.to_thread(summarize_company_risks, company_name, api_key, llm_api_key, since_date, financial_summary,
+                                   naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, save=save,
+                                   checkpoint=checkpoint, peer_summary=peer_summary, budget=budget, naver_pool=naver_pool, log=log)
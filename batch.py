@@ -0,0 +1,82 @@
+# [배치 실행 모듈] 여러 회사의 리포트를 한 프로세스에서 한 곳씩 순차 생성하며, 회사별 상태를 즉시 해제해 메모리 사용량을 일정하게 유지합니다.
+# 회사별/단계별 메모리(peak/retained)와 RSS를 results/batch_memory.jsonl에 기록합니다.
+import os
+import gc
+import sys
+import json
+import time
+from contextlib import nullcontext
+from memory_utils import MemoryTracker, MemoryBudgetExceeded, current_rss_mb, MEMORY_COMPANY_BUDGET_MB, MEMORY_STAGE_BUDGET_MB, MEMORY_BUDGET_MODE
+
+BATCH_MEMORY_REPORT = os.path.join("results", "batch_memory.jsonl")
+
+def iter_company_names(path):
+    """회사 목록 파일을 한 줄씩 읽음 (목록 전체를 메모리에 올리지 않음, # 주석/빈 줄 무시)"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            name = line.strip()
+            if name and not name.startswith("#"):
+                yield name
+
+def release_company_state():
+    """회사 1곳 처리 후 남은 임시 객체 해제 (열린 그래프, 순환 참조)"""
+    if "matplotlib.pyplot" in sys.modules:
+        sys.modules["matplotlib.pyplot"].close("all")
+    gc.collect()
+
+def _generate(company_name):
+    from run import generate_report
+    return generate_report(company_name)
+
+def run_batch(company_names, generate=_generate, trace_memory=True, company_budget_mb=MEMORY_COMPANY_BUDGET_MB,
+              stage_budget_mb=MEMORY_STAGE_BUDGET_MB, budget_mode=MEMORY_BUDGET_MODE, report_path=BATCH_MEMORY_REPORT):
+    """
+    company_names(iterable)를 한 곳씩 처리하며 회사별 결과를 yield (결과 목록을 누적하지 않음)
+    yield 값: {'company', 'status', 'seconds', 'rss_mb', 'peak_mb', 'retained_mb', 'stages', 'error'}
+    """
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    for company_name in company_names:
+        tracker = MemoryTracker(company_name, company_budget_mb, stage_budget_mb, budget_mode)
+        started = time.time()
+        status, error = "done", None
+        try:
+            with tracker.track() if trace_memory else nullcontext():
+                generate(company_name)
+        except MemoryBudgetExceeded as e:
+            status, error = "budget_exceeded", str(e)
+        except Exception as e:
+            status, error = "failed", str(e)
+        release_company_state()
+        record = {
+            "company": company_name,
+            "status": status,
+            "seconds": round(time.time() - started, 1),
+            "rss_mb": round(current_rss_mb(), 1) if current_rss_mb() is not None else None,
+            "peak_mb": tracker.total["peak_mb"] if tracker.total else None,
+            "retained_mb": tracker.total["retained_mb"] if tracker.total else None,
+            "stages": tracker.stages,
+            "error": error,
+        }
+        if trace_memory:
+            print(tracker.report())
+        with open(report_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        yield record
+
+if __name__ == "__main__":
+    # 사용법: python batch.py companies.txt [--no-trace] [--budget-mb 800] [--stage-budget-mb 300] [--fail-on-budget]
+    args = sys.argv[1:]
+    if not args:
+        print("사용법: python batch.py companies.txt [--no-trace] [--budget-mb 800] [--stage-budget-mb 300] [--fail-on-budget]")
+        sys.exit(1)
+    budget = float(args[args.index("--budget-mb") + 1]) if "--budget-mb" in args else MEMORY_COMPANY_BUDGET_MB
+    stage_budget = float(args[args.index("--stage-budget-mb") + 1]) if "--stage-budget-mb" in args else MEMORY_STAGE_BUDGET_MB
+    mode = "fail" if "--fail-on-budget" in args else MEMORY_BUDGET_MODE
+    counts = {}
+    for record in run_batch(iter_company_names(args[0]), trace_memory="--no-trace" not in args,
+                            company_budget_mb=budget, stage_budget_mb=stage_budget, budget_mode=mode):
+        counts[record["status"]] = counts.get(record["status"], 0) + 1
+        print(f"[INFO] {record['company']}: {record['status']} ({record['seconds']}s, RSS {record['rss_mb']}MB)" + (f" - {record['error']}" if record["error"] else ""))
+    print(f"[INFO] 배치 완료: {counts}")
+    from credentials import print_pools_usage
+    print_pools_usage()
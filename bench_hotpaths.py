@@ -0,0 +1,224 @@
+# [핫패스 벤치마크] CPU 위주 헬퍼 함수의 실행 시간을 합성 데이터(1×/10×/100×)로 측정하고, 저장된 기준값 대비 성능 저하를 검사합니다.
+# 기준값은 bench_baseline.json에 저장되며, 머신 속도 차이는 고정 보정 루프(calibration) 시간으로 나눠 보정합니다.
+import os
+import sys
+import json
+import time
+import random
+import platform
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+SCALES = (1, 10, 100)
+REGRESSION_TOLERANCE = 0.5   # 기준값보다 50% 이상 느려지면 실패
+MIN_REPEAT_SECONDS = 0.2     # 케이스별 최소 측정 시간
+MAX_REPEAT = 50
+RECHECK_ROUNDS = 2           # 기준 초과 케이스는 다시 측정해 최솟값으로 판정 (일시적인 부하로 인한 오탐 방지)
+
+_KO_WORDS = ["매출", "영업이익", "부채", "소송", "충당부채", "환율", "손상", "감사", "리스크", "유동성",
+             "차입금", "재고자산", "반도체", "배터리", "수주", "규제", "공정위", "과징금", "적자", "흑자"]
+_ACCOUNTS = ["유동자산", "비유동자산", "자산총계", "유동부채", "비유동부채", "부채총계", "자본금", "이익잉여금", "자본총계",
+             "매출액", "매출원가", "매출총이익", "판매비와관리비", "영업이익(손실)", "금융수익", "금융비용", "이자비용",
+             "법인세비용차감전순이익", "법인세비용", "당기순이익(손실)", "기타포괄손익", "총포괄손익"]
+_REPORTS = ["사업보고서", "감사보고서", "반기보고서", "분기보고서", "주요사항보고서(유상증자결정)", "임원ㆍ주요주주특정증권등소유상황보고서",
+            "기업설명회(IR)개최", "연결재무제표기준영업(잠정)실적(공정공시)", "단일판매ㆍ공급계약체결", "타법인주식및출자증권취득결정"]
+
+# ---------------------------------------------------------------- 합성 데이터 생성기
+def make_statement_payload(scale, seed=0):
+    """fnlttSinglAcntAll.json 형태의 재무제표 list (scale=1 ≈ 실제 1개년 약 200행)"""
+    rng = random.Random(seed)
+    items = []
+    for sj_div, sj_nm in [("BS", "재무상태표"), ("CIS", "포괄손익계산서"), ("CF", "현금흐름표"), ("SCE", "자본변동표")]:
+        for i in range(50 * scale):
+            base = _ACCOUNTS[i % len(_ACCOUNTS)]
+            name = base if i < len(_ACCOUNTS) else f"{base}_{i}"
+            amount = rng.randint(-10 ** 12, 10 ** 13)
+            items.append({
+                "rcept_no": "20240312000736", "reprt_code": "11011", "bsns_year": "2023", "corp_code": "00126380",
+                "sj_div": sj_div, "sj_nm": sj_nm, "account_id": f"ifrs-full_{base}{i}", "account_nm": name,
+                "account_detail": "-", "thstrm_nm": "제 55 기", "thstrm_amount": f"{amount:,}" if rng.random() > 0.05 else "",
+                "frmtrm_nm": "제 54 기", "frmtrm_amount": f"{amount // 2:,}", "bfefrmtrm_nm": "제 53 기", "bfefrmtrm_amount": "-",
+                "ord": str(i), "currency": "KRW",
+            })
+    return items
+
+def make_news_batch(scale, seed=0):
+    """네이버 뉴스 검색 결과 형태의 HTML 엔티티/태그가 섞인 뉴스 본문 (scale=1 → 40건)"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(40 * scale):
+        words = [rng.choice(_KO_WORDS) for _ in range(rng.randint(20, 60))]
+        body = " ".join(f"<b>{w}</b>" if rng.random() < 0.1 else w for w in words)
+        texts.append(f"{body} &quot;인용&quot; &amp; &#8200; 기사\r\n\t  원문   보기\n\n")
+    return texts
+
+def make_disclosure_list(scale, seed=0):
+    """list.json 형태의 공시목록 (scale=1 → 100건)"""
+    rng = random.Random(seed)
+    return {"status": "000", "list": [{
+        "corp_code": "00126380", "corp_name": "삼성전자", "stock_code": "005930", "corp_cls": "Y",
+        "report_nm": rng.choice(_REPORTS), "rcept_no": f"2024{i:010d}", "flr_nm": "삼성전자",
+        "rcept_dt": f"{rng.randint(2019, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}", "rm": "",
+    } for i in range(100 * scale)]}
+
+def make_chunk_summaries(scale, seed=0):
+    """뉴스/공시 chunk 요약 목록 (scale=1 → 20개)"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_KO_WORDS) for _ in range(rng.randint(15, 40))) + "." for _ in range(20 * scale)]
+
+# ---------------------------------------------------------------- 벤치마크 케이스
+def _case_statement_frame(scale):
+    from financial import financial_statements_to_frame
+    items = make_statement_payload(scale)
+    return lambda: financial_statements_to_frame(items)
+
+def _case_get_account(scale):
+    from financial import financial_statements_to_frame, normalize_account_name, find_account_amount
+    df = financial_statements_to_frame(make_statement_payload(scale))
+    groups = dict(tuple(df.groupby("sj_nm", observed=True)))
+    aliases = [["유동자산", "유동 자산"], ["자산총계", "총자산"], ["부채총계", "총부채"], ["자본총계", "총자본"],
+               ["당기순이익", "순이익"], ["매출액", "매출", "수익"], ["영업이익", "영업손익"], ["이자비용", "금융비용"]]
+
+    def run():
+        norms = [normalize_account_name(c) for c in df["account_nm"].cat.categories]
+        for subdf in (groups["재무상태표"], groups["포괄손익계산서"], df):
+            for names in aliases:
+                find_account_amount(subdf, names, norms)
+    return run
+
+def _case_clean_news_text(scale):
+    from utils import clean_news_text
+    texts = make_news_batch(scale)
+    return lambda: [clean_news_text(t) for t in texts]
+
+def _case_extract_risk_chunks(scale):
+    from llm_utils import extract_risk_related_chunks
+    chunks = make_chunk_summaries(scale)
+    keywords = ["소송", "충당부채", "손상", "과징금", "유동성", "리스크"]
+    return lambda: extract_risk_related_chunks(chunks, keywords, max_count=10)
+
+def _case_filter_disclosures(scale):
+    from dart_api import filter_disclosures
+    disclosures = make_disclosure_list(scale)
+    return lambda: filter_disclosures(disclosures, [2022, 2023], max_count=20 * scale)
+
+def _case_wrap_lines(scale):
+    from risk_summary import wrap_lines
+    text = "\n".join(make_news_batch(scale))
+    return lambda: wrap_lines(text, width=45)
+
+BENCHMARKS = {
+    "statement_frame": _case_statement_frame,
+    "get_account": _case_get_account,
+    "clean_news_text": _case_clean_news_text,
+    "extract_risk_chunks": _case_extract_risk_chunks,
+    "filter_disclosures": _case_filter_disclosures,
+    "wrap_lines": _case_wrap_lines,
+}
+
+# ---------------------------------------------------------------- 측정/비교
+def calibrate():
+    """머신 속도 보정용 고정 작업 시간(초, 5회 중 최솟값)"""
+    def work():
+        total = 0
+        for i in range(200000):
+            total += i % 7
+        return "".join(str(i) for i in range(20000)).count("7") + total
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        work()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def measure(fn):
+    """최소 MIN_REPEAT_SECONDS 동안 반복 실행한 뒤 1회 실행 시간 최솟값(초)"""
+    fn()  # warm-up (import, 캐시)
+    timings = []
+    deadline = time.perf_counter() + MIN_REPEAT_SECONDS
+    while len(timings) < 3 or (time.perf_counter() < deadline and len(timings) < MAX_REPEAT):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run_benchmarks(names=None, scales=SCALES):
+    results = {}
+    for name in names or BENCHMARKS:
+        for scale in scales:
+            fn = BENCHMARKS[name](scale)
+            results[f"{name}@{scale}x"] = measure(fn)
+    return results
+
+def compare(results, calibration, baseline, tolerance=REGRESSION_TOLERANCE):
+    """기준값 대비 (보정된) 시간 비율. 반환값: [(케이스, 현재ms, 기준ms(보정), 비율, 실패여부)]"""
+    scale_factor = calibration / baseline["calibration"] if baseline.get("calibration") else 1.0
+    rows = []
+    for key, seconds in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            rows.append((key, seconds * 1000, None, None, False))
+            continue
+        expected = base * scale_factor
+        ratio = seconds / expected if expected else 1.0
+        rows.append((key, seconds * 1000, expected * 1000, ratio, ratio > 1 + tolerance))
+    return rows
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_baseline(results, calibration, path=BASELINE_PATH):
+    baseline = load_baseline(path) or {}
+    baseline.setdefault("results", {}).update(results)
+    baseline.update({"calibration": calibration, "python": platform.python_version(), "machine": platform.machine()})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    # 사용법:
+    #   python bench_hotpaths.py                     # 기준값과 비교 (저하 시 종료코드 1)
+    #   python bench_hotpaths.py --save-baseline     # 현재 측정값을 기준값으로 저장
+    #   python bench_hotpaths.py [--tolerance 0.3] [--scales 1,10] [케이스 ...]
+    args = sys.argv[1:]
+    tolerance = float(args[args.index("--tolerance") + 1]) if "--tolerance" in args else REGRESSION_TOLERANCE
+    scales = tuple(int(s) for s in args[args.index("--scales") + 1].split(",")) if "--scales" in args else SCALES
+    option_values = {args[i + 1] for i, a in enumerate(args[:-1]) if a in ("--tolerance", "--scales")}
+    names = [a for a in args if not a.startswith("--") and a not in option_values] or None
+    unknown = [n for n in names or [] if n not in BENCHMARKS]
+    if unknown:
+        print(f"[ERROR] 알 수 없는 케이스: {unknown} (가능: {', '.join(BENCHMARKS)})")
+        sys.exit(2)
+    calibration = calibrate()
+    results = run_benchmarks(names, scales)
+    if "--save-baseline" in args:
+        save_baseline(results, calibration)
+        for key, seconds in results.items():
+            print(f"{key:<28} {seconds * 1000:10.3f} ms")
+        print(f"[INFO] 기준값 저장: {BASELINE_PATH}")
+        sys.exit(0)
+    baseline = load_baseline()
+    if baseline is None:
+        print("[ERROR] 기준값이 없습니다. 먼저 --save-baseline으로 저장하세요.")
+        sys.exit(2)
+    for _ in range(RECHECK_ROUNDS):
+        suspects = [key for key, _, _, _, regressed in compare(results, calibration, baseline, tolerance) if regressed]
+        if not suspects:
+            break
+        calibration = min(calibration, calibrate())
+        for key in suspects:
+            name, scale = key.rsplit("@", 1)
+            results[key] = min(results[key], measure(BENCHMARKS[name](int(scale.rstrip("x")))))
+    failed = 0
+    for key, current_ms, expected_ms, ratio, regressed in compare(results, calibration, baseline, tolerance):
+        if expected_ms is None:
+            print(f"{key:<28} {current_ms:10.3f} ms   (기준값 없음)")
+            continue
+        status = "FAIL" if regressed else "ok"
+        failed += regressed
+        print(f"{key:<28} {current_ms:10.3f} ms   기준 {expected_ms:10.3f} ms   x{ratio:5.2f}  {status}")
+    if failed:
+        print(f"[ERROR] 성능 저하 {failed}건 (허용 {tolerance:.0%} 초과)")
+        sys.exit(1)
+    print("[INFO] 성능 저하 없음")
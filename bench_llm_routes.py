@@ -0,0 +1,136 @@
+# [LLM 라우팅 벤치마크] 작업 유형별 라우트(LLM_ROUTES)와 기본 라우트의 응답 지연/출력 크기를 비교합니다.
+# 기본은 프로세스 내 로컬 대체 서버(OpenAI 호환 /chat/completions)로 측정하며, --base-url로 실제 API도 측정할 수 있습니다.
+import os
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 로컬 대체 서버의 모델별 지연 모델: 첫 토큰까지 시간(초) + 출력 토큰당 시간(초)
+STUB_MODEL_LATENCY = {
+    "gpt-4o-mini": (0.05, 0.004),
+    "gpt-3.5-turbo": (0.08, 0.006),
+}
+STUB_DEFAULT_LATENCY = (0.1, 0.008)
+STUB_NATURAL_TOKENS = 400  # max_tokens 제한이 없을 때 대체 서버가 생성하는 출력 길이
+
+# 라우트별 대표 프롬프트 (실제 호출부의 프롬프트 형태)
+SAMPLE_PROMPTS = {
+    "classify": "'2차전지 제조업'을(를) 아래 카테고리 중 가장 적합한 하나로 분류해줘. 반드시 한 단어만 반환.\n카테고리 후보: 에너지, 철강, 바이오, 제조, 금융, IT, 전자, 화학, 반도체, 자동차",
+    "industry": "'LG에너지솔루션'의 주요 산업(업종)명을 한글로 최대 4개까지, 쉼표로 구분해서 추정해줘. 반드시 산업명만 답변해줘.",
+    "keywords": "아래 텍스트에서 리스크와 관련된 핵심 키워드만 한글로 5개 이내로 추출해줘. 키워드만 콤마로 구분해서 답변해줘.\n" + "매출채권 대손충당금 증가, 소송 관련 충당부채 인식, 환율 변동에 따른 손실 " * 5,
+    "kam_match": "다음은 감사보고서의 핵심감사사항 내용입니다:\n재고자산 평가의 적정성...\n이 내용이 '전자부품' 산업과 연관이 있는지 판단해주세요.",
+    "summary": "아래 텍스트들을 2~3문장으로 요약해줘:\n" + "회사는 당기 중 신규 설비 투자를 확대하였으며 차입금이 증가하였다. " * 10,
+    "industry_risk": "반도체 산업의 주요 회계리스크 이슈를 4-5개 나열해줘.",
+    "analysis": "[재무비율]\n부채비율(%) 21:45.1 22:43.2 23:48.0 24:52.3 ↑\n\n위 정보를 종합해 5문장 이내로 통합 분석해줘.",
+}
+
+class _StubOpenAIHandler(BaseHTTPRequestHandler):
+    """OpenAI 호환 응답을 돌려주는 로컬 대체 서버 (max_tokens만큼 출력하고 모델별 지연을 흉내냄)"""
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        first, per_token = STUB_MODEL_LATENCY.get(body.get("model"), STUB_DEFAULT_LATENCY)
+        n_tokens = min(int(body.get("max_tokens") or STUB_NATURAL_TOKENS), STUB_NATURAL_TOKENS)
+        time.sleep(first + per_token * n_tokens)
+        content = ("리스크" * n_tokens)[:n_tokens]  # 한글 1글자 ≈ 1토큰
+        data = json.dumps({
+            "model": body.get("model"),
+            "choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "length"}],
+            "usage": {"completion_tokens": n_tokens},
+        }, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def start_stub_server(host="127.0.0.1", port=0):
+    """로컬 대체 서버를 백그라운드 스레드로 실행하고 (server, base_url) 반환"""
+    server = ThreadingHTTPServer((host, port), _StubOpenAIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def benchmark_route(llm_api_key, task, prompt, repeat=5):
+    """같은 프롬프트를 task 라우트로 repeat회 호출 (응답 캐시는 매번 비움)"""
+    import llm_utils
+    latencies, sizes = [], []
+    for _ in range(repeat):
+        with llm_utils._llm_cache_lock:
+            llm_utils._llm_response_cache.clear()
+        start = time.perf_counter()
+        response = llm_utils.query_llm(llm_api_key, prompt, task=task)
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(response))
+    route = llm_utils.resolve_llm_route(task)
+    return {
+        "task": task,
+        "model": route["model"],
+        "max_tokens": route["max_tokens"],
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "avg_chars": sum(sizes) / len(sizes),
+    }
+
+def run_benchmark(base_url=None, llm_api_key=None, repeat=5, tasks=None):
+    """라우트별 결과와 같은 프롬프트를 기본 라우트로 보낸 결과를 함께 반환"""
+    import llm_utils
+    server = None
+    if base_url is None:
+        server, base_url = start_stub_server()
+        llm_api_key = llm_api_key or "stub"
+    original_base_url = llm_utils.OPENAI_BASE_URL
+    llm_utils.OPENAI_BASE_URL = base_url.rstrip("/")
+    rows = []
+    try:
+        for task in tasks or SAMPLE_PROMPTS:
+            prompt = SAMPLE_PROMPTS[task]
+            routed = benchmark_route(llm_api_key, task, prompt, repeat)
+            baseline = benchmark_route(llm_api_key, "default", prompt, repeat)
+            routed["default_p50_ms"] = baseline["p50_ms"]
+            routed["default_avg_chars"] = baseline["avg_chars"]
+            rows.append(routed)
+    finally:
+        llm_utils.OPENAI_BASE_URL = original_base_url
+        if server is not None:
+            server.shutdown()
+    return rows
+
+def format_report(rows):
+    headers = ["task", "model", "max_tokens", "p50(ms)", "p95(ms)", "출력(자)", "default p50(ms)", "default 출력(자)", "속도 향상"]
+    table = [[
+        r["task"], r["model"], str(r["max_tokens"]),
+        f"{r['p50_ms']:.0f}", f"{r['p95_ms']:.0f}", f"{r['avg_chars']:.0f}",
+        f"{r['default_p50_ms']:.0f}", f"{r['default_avg_chars']:.0f}",
+        f"{r['default_p50_ms'] / r['p50_ms']:.1f}x" if r["p50_ms"] else "-",
+    ] for r in rows]
+    widths = [max(len(str(row[i])) for row in [headers] + table) for i in range(len(headers))]
+    lines = ["  ".join(str(cell).ljust(w) for cell, w in zip(row, widths)) for row in [headers] + table]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # 사용법: python bench_llm_routes.py [--repeat N] [--base-url https://api.openai.com/v1] [task ...]
+    args = sys.argv[1:]
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 5
+    base_url = args[args.index("--base-url") + 1] if "--base-url" in args else None
+    option_values = {args[i + 1] for i, a in enumerate(args[:-1]) if a in ("--repeat", "--base-url")}
+    tasks = [a for a in args if not a.startswith("--") and a not in option_values] or None
+    unknown = [t for t in tasks or [] if t not in SAMPLE_PROMPTS]
+    if unknown:
+        print(f"[ERROR] 알 수 없는 task: {unknown} (가능: {', '.join(SAMPLE_PROMPTS)})")
+        sys.exit(1)
+    api_key = os.getenv("OPENAI_API_KEY") if base_url else None
+    print(f"[INFO] 대상: {base_url or '로컬 대체 서버'}, 반복 {repeat}회")
+    print(format_report(run_benchmark(base_url, api_key, repeat, tasks)))
@@ -0,0 +1,95 @@
+# [재무제표 일괄 사전조회 모듈] 상장사 전체의 연간 주요계정을 DART 다중회사 주요계정 API(1회 최대 100개사)로 미리 받아 재무제표 저장소에 넣습니다.
+# 회사별 전체 재무제표(fnlttSinglAcntAll) 조회는 주요계정만으로 비율을 계산할 수 없는 회사에만 사용하므로,
+# 야간 전체 갱신의 DART 호출 수가 (회사 수 × 연도 수 × 1~2회)에서 (회사 수 / 100 × 연도 수 + 일부 회사)로 줄어듭니다.
+import os
+import sys
+import time
+from dart_api import fetch_multi_company_accounts, load_corp_code_index, DART_MULTI_ACCOUNT_MAX_CORPS
+from financial import (store_statement, load_stored_statement, fetch_full_statement, financial_statements_to_frame,
+                       extract_ratio_accounts, mark_statement_missing, statement_known_missing, KEY_RATIO_ACCOUNTS)
+
+def _group_accounts_by_corp(items, by_stock):
+    """다중회사 응답 행을 {corp_code: {fs_div: [행]}}으로 묶음 (corp_code가 없는 응답은 종목코드로 매핑)"""
+    grouped = {}
+    for item in items:
+        corp_code = item.get("corp_code") or by_stock.get((item.get("stock_code") or "").strip())
+        if not corp_code:
+            continue
+        grouped.setdefault(corp_code, {}).setdefault(item.get("fs_div") or "CFS", []).append(item)
+    return grouped
+
+def needs_detailed_statement(items):
+    """주요계정만으로 동종업계 비율(KEY_RATIO_ACCOUNTS)을 계산할 수 없으면 True"""
+    df = financial_statements_to_frame(items)
+    if df is None:
+        return True
+    accounts = extract_ratio_accounts(df)
+    return any(accounts[key] is None for key in KEY_RATIO_ACCOUNTS)
+
+def prefetch_statements(api_key, years, corp_codes=None, limit=None, refresh=False, detail_fallback=True):
+    """
+    상장사 전체(또는 corp_codes)의 연간 주요계정을 재무제표 저장소에 적재
+    - 이미 저장된 (회사, 연도)와 최근 사업보고서가 없다고 확인된 (회사, 연도)는 건너뜀 (refresh=True면 다시 조회)
+    - 주요계정이 부족한 회사만 전체 재무제표로 보완 (detail_fallback=False면 생략)
+    반환값: {'multi_calls', 'single_calls', 'stored', 'detailed', 'missing', 'stopped'}
+    (stopped: 호출 실패로 중간에 멈췄으면 True, 남은 회사는 적재되지 않음)
+    """
+    index = load_corp_code_index(api_key)
+    corp_codes = list(corp_codes or index["listed"])[:limit]
+    by_stock = index.get("by_stock", {})
+    stats = {"multi_calls": 0, "single_calls": 0, "stored": 0, "detailed": 0, "missing": 0, "stopped": False}
+    started = time.time()
+    for year in sorted(int(y) for y in years):
+        targets = [c for c in corp_codes if refresh or (load_stored_statement(c, year, detail=False) is None and not statement_known_missing(c, year))]
+        if not targets:
+            continue
+        print(f"[INFO] {year}년 주요계정 사전조회: {len(targets)}개사 ({-(-len(targets) // DART_MULTI_ACCOUNT_MAX_CORPS)}회 호출)")
+        fallback = []
+        for i in range(0, len(targets), DART_MULTI_ACCOUNT_MAX_CORPS):
+            batch = targets[i:i + DART_MULTI_ACCOUNT_MAX_CORPS]
+            items = fetch_multi_company_accounts(api_key, batch, year)
+            stats["multi_calls"] += 1
+            if items is None:
+                # 한도 초과 등 호출 실패: 이후 호출도 실패할 가능성이 높으므로 중단 (다음 실행에서 이어서 적재)
+                print(f"[경고] 사전조회 중단 ({year}년, {i}/{len(targets)}개사 처리)")
+                stats["stopped"] = True
+                stats["seconds"] = round(time.time() - started, 1)
+                return stats
+            grouped = _group_accounts_by_corp(items, by_stock)
+            for corp_code in batch:
+                by_fs_div = grouped.get(corp_code)
+                if not by_fs_div:
+                    stats["missing"] += 1  # 해당 연도 사업보고서 없음 (신규상장/미제출 등): 다음 실행에서 다시 조회하지 않도록 기록
+                    mark_statement_missing(corp_code, year)
+                    continue
+                fs_div = "CFS" if "CFS" in by_fs_div else next(iter(by_fs_div))
+                rows = by_fs_div[fs_div]
+                if detail_fallback and needs_detailed_statement(rows):
+                    fallback.append(corp_code)
+                    continue
+                store_statement(corp_code, year, rows, fs_div, detail=False)
+                stats["stored"] += 1
+        for corp_code in fallback:
+            fetched = fetch_full_statement(api_key, corp_code, year)
+            stats["single_calls"] += 1 if fetched is not None and fetched[1] == "CFS" else 2
+            if fetched is not None:
+                stats["detailed"] += 1
+    stats["seconds"] = round(time.time() - started, 1)
+    return stats
+
+if __name__ == "__main__":
+    # 사용법: python bulk_prefetch.py [--years 3] [--limit N] [--refresh] [--no-detail]
+    args = sys.argv[1:]
+    n_years = int(args[args.index("--years") + 1]) if "--years" in args else 3
+    limit = int(args[args.index("--limit") + 1]) if "--limit" in args else None
+    api_key = os.getenv("DART_API_KEY")
+    if not api_key:
+        from run import DART_API_KEY as api_key
+    from credentials import credential_pool, print_pools_usage
+    api_key = credential_pool("dart", api_key)
+    current_year = int(time.strftime('%Y'))
+    # 매출액증가율 계산을 위해 대상 연도 직전 연도까지 적재
+    years = [current_year - 1 - i for i in range(n_years + 1)]
+    stats = prefetch_statements(api_key, years, limit=limit, refresh="--refresh" in args, detail_fallback="--no-detail" not in args)
+    print(f"[INFO] 사전조회 완료: {stats}")
+    print_pools_usage()
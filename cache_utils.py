@@ -0,0 +1,81 @@
+# [캐시 모듈] 실행 간 재사용되는 로컬 디스크 캐시(SQLite 기반 key-value)를 관리합니다.
+import os
+import json
+import time
+import sqlite3
+import threading
+
+CACHE_DIR = os.getenv("RISK_CACHE_DIR", "cache")
+CACHE_DB = os.path.join(CACHE_DIR, "cache.sqlite3")
+
+_local = threading.local()
+
+def _connect():
+    """스레드별 SQLite 연결 반환 (여러 프로세스/스레드가 동시에 사용 가능)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(CACHE_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+class DiskCache:
+    """
+    namespace 단위 JSON key-value 캐시
+    - ttl(초)이 지정되면 만료된 값은 없는 것으로 취급
+    """
+    def __init__(self, namespace, ttl=None):
+        self.namespace = namespace
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        row = _connect().execute(
+            "SELECT value, updated_at FROM kv WHERE namespace=? AND key=?",
+            (self.namespace, str(key)),
+        ).fetchone()
+        if row is None:
+            return default
+        if self.ttl is not None and time.time() - row[1] > self.ttl:
+            return default
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, str(key), json.dumps(value, ensure_ascii=False), time.time()),
+        )
+        conn.commit()
+
+    def delete(self, key):
+        conn = _connect()
+        conn.execute("DELETE FROM kv WHERE namespace=? AND key=?", (self.namespace, str(key)))
+        conn.commit()
+
+    def incr(self, key, amount=1):
+        """정수 값에 amount를 더하고 새 값 반환 (여러 프로세스가 동시에 호출해도 누락 없음, 없거나 만료된 값은 0에서 시작)"""
+        conn = _connect()
+        now = time.time()
+        expired_before = now - self.ttl if self.ttl is not None else None
+        with conn:
+            conn.execute(
+                "INSERT INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET "
+                "value = CASE WHEN ? IS NOT NULL AND updated_at < ? THEN excluded.value ELSE CAST(value AS INTEGER) + ? END, "
+                "updated_at = excluded.updated_at",
+                (self.namespace, str(key), json.dumps(amount), now, expired_before, expired_before, amount),
+            )
+            row = conn.execute("SELECT value FROM kv WHERE namespace=? AND key=?", (self.namespace, str(key))).fetchone()
+        return json.loads(row[0])
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+_MISSING = object()
@@ -0,0 +1,310 @@
+# [API 키 풀 모듈] DART/네이버/OpenAI 키를 여러 개 등록해 가중치 라운드로빈으로 나눠 쓰고, 키별 사용량/한도를 관리합니다.
+# - 키별 일일 호출 수를 세어 한도(DART 20,000건 등)에 닿은 키는 다음 날까지 제외
+#   (일일 한도가 있는 provider는 (날짜, 키) 사용량을 로컬 캐시 DB에 함께 기록해 여러 프로세스가 같은 한도를 나눠 씀)
+# - 한도 초과 응답(DART 020, HTTP 429)을 받은 키는 해제 시각까지, 인증 오류 키는 프로세스가 끝날 때까지 제외
+# - 등록: 환경변수 DART_API_KEYS / OPENAI_API_KEYS / NAVER_CREDENTIALS (쉼표 구분, 키*가중치, 네이버는 id:secret)
+#   예) DART_API_KEYS="key1,key2*2"  NAVER_CREDENTIALS="id1:secret1,id2:secret2"
+import os
+import sys
+import time
+import hashlib
+import threading
+
+CREDENTIAL_COOLDOWN = float(os.getenv("CREDENTIAL_COOLDOWN_SECONDS", "60"))  # 해제 시각을 알 수 없는 429 후 대기(초)
+CREDENTIAL_MAX_WAIT = float(os.getenv("CREDENTIAL_MAX_WAIT_SECONDS", "120"))  # 모든 키가 잠시 제외됐을 때 기다릴 최대 시간(초)
+CREDENTIAL_USAGE_SHARED = os.getenv("CREDENTIAL_USAGE_SHARED", "1") != "0"  # 일일 사용량을 프로세스 간 공유(cache_utils DB)
+
+# provider별 설정: 키 목록 환경변수, 단일 키 환경변수, 키당 일일 한도(0이면 없음), 한도 초과 시 해제 방식
+PROVIDER_SETTINGS = {
+    "dart": {"env": "DART_API_KEYS", "single_env": ("DART_API_KEY",), "daily_limit": int(os.getenv("DART_DAILY_LIMIT_PER_KEY", "20000")), "quota_reset": "daily"},
+    "naver": {"env": "NAVER_CREDENTIALS", "single_env": ("NAVER_CLIENT_ID", "NAVER_CLIENT_SECRET"), "daily_limit": int(os.getenv("NAVER_DAILY_LIMIT_PER_KEY", "25000")), "quota_reset": "cooldown"},
+    "openai": {"env": "OPENAI_API_KEYS", "single_env": ("OPENAI_API_KEY",), "daily_limit": 0, "quota_reset": "cooldown"},
+}
+
+class CredentialsExhausted(Exception):
+    """사용 가능한 키가 없음 (retry_at: 가장 빨리 다시 쓸 수 있는 시각, 없으면 None)"""
+    def __init__(self, message, retry_at=None):
+        super().__init__(message)
+        self.retry_at = retry_at
+
+def _today():
+    return time.strftime("%Y%m%d")
+
+_usage_store = None
+
+def _shared_usage():
+    """(provider, 날짜, 키) → 오늘 사용량 저장소 (이틀 지난 값은 무시)"""
+    global _usage_store
+    if _usage_store is None:
+        from cache_utils import DiskCache
+        _usage_store = DiskCache("credential_usage", ttl=2 * 24 * 3600)
+    return _usage_store
+
+def _next_midnight(now):
+    t = time.localtime(now)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+class Credential:
+    """키 1개와 사용량 (secret: DART/OpenAI는 키 문자열, 네이버는 (client_id, client_secret))"""
+    __slots__ = ("secret", "weight", "label", "usage_id", "current", "requests", "ok", "quota_hits", "auth_errors", "errors",
+                 "day", "used_today", "sidelined_until", "disabled")
+
+    def __init__(self, secret, weight=1):
+        self.secret = secret
+        self.weight = max(1, int(weight))
+        key = secret[0] if isinstance(secret, tuple) else secret
+        self.label = f"…{key[-4:]}" if len(key) > 4 else "…"
+        # 공유 사용량 key (키 값은 해시만 저장)
+        self.usage_id = hashlib.sha1(repr(secret).encode("utf-8")).hexdigest()[:16]
+        self.current = 0
+        self.requests = self.ok = self.quota_hits = self.auth_errors = self.errors = 0
+        self.day = _today()
+        self.used_today = 0
+        self.sidelined_until = 0.0
+        self.disabled = False
+
+class CredentialPool:
+    """provider 1개의 키 풀 (스레드 안전, asyncio 코드에서도 acquire/report는 잠깐만 잠금)"""
+    def __init__(self, provider, credentials, daily_limit=None, quota_reset=None):
+        settings = PROVIDER_SETTINGS.get(provider, {})
+        self.provider = provider
+        self.credentials = list(credentials)
+        self.daily_limit = settings.get("daily_limit", 0) if daily_limit is None else daily_limit
+        self.quota_reset = quota_reset or settings.get("quota_reset", "cooldown")
+        self._lock = threading.Lock()
+        # 요청 병합(singleflight) key에 넣는 풀 식별값: 키가 다른 호출자(테넌트)끼리 응답/오류를 공유하지 않도록 (키 값은 해시만 사용)
+        self.identity = hashlib.sha1(repr(sorted(repr(c.secret) for c in self.credentials)).encode("utf-8")).hexdigest()[:16]
+        self.shared_usage = CREDENTIAL_USAGE_SHARED and bool(self.daily_limit)
+        for credential in self.credentials:
+            self._load_usage(credential)
+
+    def _usage_key(self, credential, day):
+        return f"{self.provider}:{day}:{credential.usage_id}"
+
+    def _load_usage(self, credential):
+        """다른 프로세스가 기록한 오늘 사용량 반영"""
+        if not self.shared_usage:
+            return
+        import sqlite3
+        try:
+            credential.used_today = max(credential.used_today, int(_shared_usage().get(self._usage_key(credential, credential.day), 0)))
+        except (sqlite3.Error, ValueError) as e:
+            print(f"[경고] {self.provider} API 키 사용량 조회 실패: {e}")
+
+    def _count_use(self, credential):
+        """키 사용량 +1 (공유 사용량이 있으면 다른 프로세스 사용분까지 합친 값으로 갱신)"""
+        credential.requests += 1
+        credential.used_today += 1
+        if not self.shared_usage:
+            return
+        import sqlite3
+        try:
+            credential.used_today = int(_shared_usage().incr(self._usage_key(credential, credential.day)))
+        except (sqlite3.Error, ValueError) as e:
+            print(f"[경고] {self.provider} API 키 사용량 기록 실패: {e}")
+
+    def __len__(self):
+        return len(self.credentials)
+
+    def _available(self, credential, now, today):
+        if credential.day != today:
+            credential.day, credential.used_today = today, 0
+            self._load_usage(credential)
+        if credential.disabled or credential.sidelined_until > now:
+            return False
+        return not self.daily_limit or credential.used_today < self.daily_limit
+
+    def acquire(self):
+        """smooth weighted round-robin으로 사용 가능한 키 1개 선택 (없으면 CredentialsExhausted)"""
+        now, today = time.time(), _today()
+        with self._lock:
+            if not self.credentials:
+                raise CredentialsExhausted(f"{self.provider} API 키가 없습니다. run.py 또는 환경변수({PROVIDER_SETTINGS.get(self.provider, {}).get('env')})에 입력하세요.")
+            while True:
+                candidates = [c for c in self.credentials if self._available(c, now, today)]
+                if not candidates:
+                    raise CredentialsExhausted(f"{self.provider} API 키를 모두 사용할 수 없습니다: {self.summary()}", self._retry_at(now))
+                total = 0
+                for c in candidates:
+                    c.current += c.weight
+                    total += c.weight
+                chosen = max(candidates, key=lambda c: c.current)
+                chosen.current -= total
+                self._count_use(chosen)
+                # 다른 프로세스가 먼저 한도를 채웠으면 이 키는 오늘 제외하고 다시 선택
+                if not self.daily_limit or chosen.used_today <= self.daily_limit:
+                    return chosen
+
+    def count_extra(self, credential):
+        """acquire 없이 같은 키로 한 번 더 보낸 요청(hedge 중복 요청 등)을 사용량과 일일 한도에 반영"""
+        with self._lock:
+            self._count_use(credential)
+
+    def acquire_wait(self, max_wait=CREDENTIAL_MAX_WAIT):
+        """acquire와 같지만, 모든 키가 잠시(max_wait와 리포트 마감까지 남은 시간 이내) 제외된 경우 해제될 때까지 기다림"""
+        from deadline import remaining
+        while True:
+            try:
+                return self.acquire()
+            except CredentialsExhausted as e:
+                left = remaining()
+                if e.retry_at is None or e.retry_at - time.time() > (max_wait if left is None else min(max_wait, left)):
+                    raise
+                time.sleep(max(0.05, e.retry_at - time.time()))
+
+    def _retry_at(self, now):
+        times = []
+        for c in self.credentials:
+            if c.disabled:
+                continue
+            if self.daily_limit and c.used_today >= self.daily_limit:
+                times.append(_next_midnight(now))
+            else:
+                times.append(c.sidelined_until)
+        return min(times) if times else None
+
+    def report(self, credential, outcome, retry_after=None):
+        """
+        호출 결과 반영
+        - 'ok' / 'error': 집계만
+        - 'quota': 한도 초과 → retry_after초(없으면 provider 방식: daily=자정, cooldown=CREDENTIAL_COOLDOWN) 동안 제외
+        - 'exhausted': 성공했지만 남은 한도가 0 → retry_after초 동안 제외 (quota 횟수에는 포함하지 않음)
+        - 'auth': 인증 오류 → 프로세스가 끝날 때까지 제외
+        """
+        now = time.time()
+        with self._lock:
+            if outcome in ("ok", "exhausted"):
+                credential.ok += 1
+            elif outcome == "quota":
+                credential.quota_hits += 1
+            elif outcome == "auth":
+                credential.auth_errors += 1
+                if not credential.disabled:
+                    print(f"[경고] {self.provider} API 키 {credential.label} 인증 오류로 제외")
+                credential.disabled = True
+            else:
+                credential.errors += 1
+            if outcome in ("quota", "exhausted"):
+                if retry_after:
+                    until = now + retry_after
+                elif outcome == "quota" and self.quota_reset == "daily":
+                    until = _next_midnight(now)
+                else:
+                    until = now + (CREDENTIAL_COOLDOWN if outcome == "quota" else 1.0)
+                if outcome == "quota" and credential.sidelined_until < now:
+                    print(f"[경고] {self.provider} API 키 {credential.label} 한도 초과로 {time.strftime('%m-%d %H:%M:%S', time.localtime(until))}까지 제외")
+                credential.sidelined_until = max(credential.sidelined_until, until)
+
+    def usable(self):
+        """지금 사용할 수 있는 키 수"""
+        now, today = time.time(), _today()
+        with self._lock:
+            return sum(self._available(c, now, today) for c in self.credentials)
+
+    def usage(self):
+        """키별 사용량 (키 값은 마지막 4자리만)"""
+        now = time.time()
+        with self._lock:
+            rows = []
+            for c in self.credentials:
+                status = "disabled" if c.disabled else "sidelined" if c.sidelined_until > now else "limit" if self.daily_limit and c.used_today >= self.daily_limit else "active"
+                rows.append({"key": c.label, "weight": c.weight, "status": status, "requests": c.requests, "ok": c.ok, "quota_hits": c.quota_hits,
+                             "auth_errors": c.auth_errors, "errors": c.errors, "used_today": c.used_today, "daily_limit": self.daily_limit or None})
+            return rows
+
+    def summary(self):
+        counts = {}
+        for c in self.credentials:
+            status = "disabled" if c.disabled else "sidelined" if c.sidelined_until > time.time() else "active"
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def usage_report(self):
+        lines = [f"[CREDENTIALS] {self.provider}: 키 {len(self.credentials)}개"]
+        for row in self.usage():
+            limit = f"/{row['daily_limit']:,}" if row["daily_limit"] else ""
+            lines.append(f"  - {row['key']:<8} w={row['weight']} {row['status']:<9} 요청 {row['requests']:>7,} (오늘 {row['used_today']:,}{limit})  "
+                         f"한도초과 {row['quota_hits']}  인증오류 {row['auth_errors']}  기타오류 {row['errors']}")
+        return "\n".join(lines)
+
+def parse_credentials(value, provider):
+    """'key1,key2*2' (네이버: 'id1:secret1,id2:secret2*2') → [Credential]"""
+    credentials = []
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        weight = 1
+        if "*" in entry:
+            entry, _, w = entry.rpartition("*")
+            weight = int(w)
+        if provider == "naver":
+            client_id, _, client_secret = entry.partition(":")
+            if not client_secret:
+                raise Exception(f"NAVER_CREDENTIALS 항목은 client_id:client_secret 형식이어야 합니다: {client_id}")
+            credentials.append(Credential((client_id.strip(), client_secret.strip()), weight))
+        else:
+            credentials.append(Credential(entry, weight))
+    return credentials
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def credential_pool(provider, default=None):
+    """
+    provider의 프로세스 공용 키 풀
+    - <PROVIDER>_KEYS 환경변수(네이버: NAVER_CREDENTIALS)가 있으면 그 키 목록
+    - 없으면 default(run.py에 입력한 단일 키, 네이버는 (id, secret)) 또는 단일 키 환경변수
+    """
+    settings = PROVIDER_SETTINGS[provider]
+    configured = os.getenv(settings["env"])
+    if not configured:
+        if not default:
+            single = tuple(os.getenv(name) for name in settings["single_env"])
+            default = single if len(single) > 1 else single[0]
+        return resolve_pool(provider, default)
+    with _pools_lock:
+        key = (provider, None)
+        if key not in _pools:
+            _pools[key] = CredentialPool(provider, parse_credentials(configured, provider))
+        return _pools[key]
+
+def resolve_pool(provider, value):
+    """
+    API 함수의 키 인자 → CredentialPool
+    - CredentialPool이면 그대로, 키 문자열(네이버: (id, secret))이면 키 1개짜리 공용 풀(사용량 집계 공유)
+    - 비어 있으면 credential_pool(provider)
+    """
+    if isinstance(value, CredentialPool):
+        return value
+    if not value or (isinstance(value, tuple) and not all(value)):
+        if os.getenv(PROVIDER_SETTINGS[provider]["env"]):
+            return credential_pool(provider)
+        return CredentialPool(provider, [])
+    with _pools_lock:
+        key = (provider, value)
+        if key not in _pools:
+            _pools[key] = CredentialPool(provider, [Credential(value)])
+        return _pools[key]
+
+def pools_usage():
+    """지금까지 사용한 모든 풀의 키별 사용량 {provider: [row]} (service /metrics 등)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    usage = {}
+    for pool in pools:
+        usage.setdefault(pool.provider, []).extend(pool.usage())
+    return usage
+
+def print_pools_usage():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        if any(c.requests for c in pool.credentials):
+            print(pool.usage_report())
+
+if __name__ == "__main__":
+    # 사용법: python credentials.py   (등록된 키 풀 확인, 키 값은 마지막 4자리만 표시)
+    for provider in sys.argv[1:] or list(PROVIDER_SETTINGS):
+        pool = credential_pool(provider)
+        print(pool.usage_report() if len(pool) else f"[CREDENTIALS] {provider}: 등록된 키 없음")
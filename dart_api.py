@@ -1,56 +1,180 @@
 # [DART API 모듈] DART 연동, 기업정보/공시/재무데이터 수집 기능을 담당합니다.
-import requests
+from http_utils import http_get
+from deadline import hedged_call
 import os
 from dotenv import load_dotenv
 import zipfile
+import io
+import time
+import tempfile
+import threading
 import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from cache_utils import DiskCache
 
 load_dotenv()
 DART_API_KEY = os.getenv("DART_API_KEY")
 
+# corpCode.xml 메모리 인덱스 (프로세스 내 재사용)
+CORP_CODE_TTL = 24 * 3600
+_corp_code_index = {}
+_corp_code_lock = threading.Lock()
+
+# 감사보고서/핵심감사사항 섹션 캐시 (rcept_no 단위, 공시 원문은 변경되지 않으므로 TTL 없음)
+audit_section_cache = DiskCache("dart_audit_sections")
+AUDIT_SECTION_KEYWORDS = ["핵심감사사항", "핵심 감사사항", "감사보고서", "감사의견", "외부감사"]
+
+# DART 오류 status: 020 요청 제한 초과(키당 일일 한도), 010/011/012/901 미등록·사용불가·IP 불허·만료 키
+DART_QUOTA_STATUS = {"020"}
+DART_AUTH_STATUS = {"010", "011", "012", "901"}
+
+# 중복(hedge) 요청을 보내지 않는 엔드포인트: 응답이 큰 다운로드는 느린 게 정상이고 중복 요청이 한도와 대역폭을 그대로 씀
+DART_UNHEDGED_ENDPOINTS = ("corpCode.xml", "document.xml")
+
+def dart_hedge_allowed(url):
+    return not url.endswith(DART_UNHEDGED_ENDPOINTS)
+
+def dart_response_status(content):
+    """DART 응답 body(bytes)의 status 코드. zip 등 status가 없는 응답이면 None"""
+    import re
+    head = content[:512].lstrip()
+    if head.startswith(b"{"):
+        match = re.search(rb'"status"\s*:\s*"(\d+)"', head)
+    elif head.startswith(b"<"):
+        match = re.search(rb"<status>(\d+)</status>", head)
+    else:
+        return None
+    return match.group(1).decode() if match else None
+
+def dart_key_outcome(status_code, dart_status):
+    """HTTP 상태 + DART status → 키 풀 report 결과 ('ok'/'quota'/'auth'/'error')"""
+    if dart_status in DART_QUOTA_STATUS:
+        return "quota"
+    if dart_status in DART_AUTH_STATUS:
+        return "auth"
+    return "ok" if status_code == 200 else "error"
+
+def dart_get(api_key, url, params, stream=False, **kwargs):
+    """
+    crtfc_key를 키 풀(api_key: 키 문자열 또는 CredentialPool)에서 골라 GET
+    - 한도 초과/인증 오류 응답이면 해당 키를 제외하고 다른 키로 다시 호출 (키마다 최대 1회)
+    - stream=True(zip 원문)면 오류 응답(JSON/XML)일 때만 body를 읽어 확인
+    - stream이 아니면 동시에 들어온 같은 키 풀의 같은 요청(url+파라미터)은 호출 1회로 합쳐 같은 응답 내용을 공유
+      (호출자마다 새 Response 객체를 받음)
+    """
+    if not stream:
+        from singleflight import dart_flight, request_key
+        from credentials import resolve_pool
+        from http_utils import response_snapshot, response_from_snapshot
+        pool = resolve_pool("dart", api_key)
+        snapshot = dart_flight.do(request_key(url, params, pool.identity), lambda: response_snapshot(_dart_get(pool, url, params, False, **kwargs)))
+        return response_from_snapshot(snapshot)
+    return _dart_get(api_key, url, params, stream, **kwargs)
+
+def _dart_get(api_key, url, params, stream, **kwargs):
+    from credentials import resolve_pool
+    pool = resolve_pool("dart", api_key)
+    for attempt in range(max(1, len(pool))):
+        credential = pool.acquire()
+        request_params = dict(params, crtfc_key=credential.secret)
+        if stream or not dart_hedge_allowed(url):
+            r = http_get(url, params=request_params, stream=stream, **kwargs)
+        else:
+            # 읽기 전용 조회: 엔드포인트 p95보다 늦으면 같은 요청을 한 번 더 보내 먼저 온 응답 사용 (중복 요청도 키 사용량에 반영)
+            r = hedged_call(url, lambda: http_get(url, params=request_params, **kwargs), discard=lambda response: response.close(),
+                            on_hedge=lambda: pool.count_extra(credential))
+        content_type = r.headers.get("Content-Type", "")
+        if stream and "json" not in content_type and "xml" not in content_type and "text" not in content_type:
+            dart_status = None
+        else:
+            dart_status = dart_response_status(r.content)
+        outcome = dart_key_outcome(r.status_code, dart_status)
+        pool.report(credential, outcome)
+        if outcome not in ("quota", "auth") or attempt == len(pool) - 1:
+            return r
+        r.close()
+    return r
+
+def load_corp_code_index(api_key, refresh=False):
+    """
+    corpCode.xml을 내려받아 메모리 인덱스로 유지 (TTL 24시간, 작업 폴더에 압축 해제하지 않음)
+    반환값: {'by_name': {회사명: corp_code}, 'listed': [상장사 corp_code], 'by_stock': {종목코드: corp_code}}
+    """
+    with _corp_code_lock:
+        if not refresh and _corp_code_index and time.time() - _corp_code_index["loaded_at"] < CORP_CODE_TTL:
+            return _corp_code_index
+        url = "https://opendart.fss.or.kr/api/corpCode.xml"
+        r = dart_get(api_key, url, {}, timeout=60)
+        if r.status_code != 200:
+            raise Exception(f"Failed to download corpCode.xml: {r.status_code}")
+        by_name, listed, by_stock = parse_corp_code_zip(r.content)
+        _corp_code_index.update({"by_name": by_name, "listed": listed, "by_stock": by_stock, "loaded_at": time.time()})
+        return _corp_code_index
+
+def parse_corp_code_zip(content):
+    """corpCode.xml zip(bytes)을 스트리밍 파싱해 ({회사명: corp_code}, [상장사 corp_code], {종목코드: corp_code}) 반환"""
+    by_name = {}
+    listed = []
+    by_stock = {}
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        for name in zf.namelist():
+            with zf.open(name) as member:
+                for _, elem in ET.iterparse(member):
+                    if elem.tag != 'list':
+                        continue
+                    corp_code = elem.findtext('corp_code')
+                    by_name.setdefault(elem.findtext('corp_name'), corp_code)
+                    stock_code = (elem.findtext('stock_code') or '').strip()
+                    if stock_code:
+                        listed.append(corp_code)
+                        by_stock[stock_code] = corp_code
+                    elem.clear()
+    return by_name, listed, by_stock
+
 def get_corp_code(api_key, company_name):
     """회사명을 입력받아 DART corp_code를 반환"""
-    url = "https://opendart.fss.or.kr/api/corpCode.xml"
-    
-    r = requests.get(url, params={"crtfc_key": api_key})
-    if r.status_code != 200:
-        raise Exception(f"Failed to download corpCode.xml: {r.status_code}")
-    with open("corpCode.zip", "wb") as f:
-        f.write(r.content)
-    with zipfile.ZipFile("corpCode.zip", 'r') as zip_ref:
-        zip_ref.extractall(".")
-    tree = ET.parse("CORPCODE.xml")
-    root = tree.getroot()
-    for corp in root.findall('list'):
-        if corp.find('corp_name').text == company_name:
-            return corp.find('corp_code').text
-    raise Exception(f"Company '{company_name}' not found in corpCode.xml.")
+    corp_code = load_corp_code_index(api_key)["by_name"].get(company_name)
+    if corp_code is None:
+        raise Exception(f"Company '{company_name}' not found in corpCode.xml.")
+    return corp_code
 
 def get_company_info(api_key, corp_code):
     """corp_code로 DART에서 회사 기본정보 조회"""
     url = "https://opendart.fss.or.kr/api/company.json"
-    params = {"crtfc_key": api_key, "corp_code": corp_code}
-    r = requests.get(url, params=params)
+    params = {"corp_code": corp_code}
+    r = dart_get(api_key, url, params)
     if r.status_code != 200:
         raise Exception(f"Failed to get company info: {r.status_code}")
     return r.json()
 
-def get_disclosures(api_key, corp_code, bgn_de='20240101', end_de=None, page_count=10):
-    """corp_code로 DART에서 최근 공시목록 조회"""
+def get_disclosures(api_key, corp_code, bgn_de='20240101', end_de=None, page_count=10, page_no=1):
+    """corp_code로 DART에서 최근 공시목록 조회 (corp_code=None이면 기간 내 전체 회사 공시)"""
     url = "https://opendart.fss.or.kr/api/list.json"
     params = {
-        "crtfc_key": api_key,
-        "corp_code": corp_code,
         "bgn_de": bgn_de,
-        "page_count": page_count
+        "page_count": page_count,
+        "page_no": page_no
     }
+    if corp_code:
+        params["corp_code"] = corp_code
     if end_de:
         params["end_de"] = end_de
-    r = requests.get(url, params=params)
+    r = dart_get(api_key, url, params)
     if r.status_code != 200:
         raise Exception(f"Failed to get disclosures: {r.status_code}")
     return r.json()
 
+def iter_disclosures(api_key, bgn_de, end_de=None, corp_code=None, page_count=100):
+    """기간 내 공시목록을 page_no 순으로 모두 조회하는 generator (corp_code=None이면 전체 회사, 최대 3개월)"""
+    page_no = 1
+    while True:
+        disclosures = get_disclosures(api_key, corp_code, bgn_de=bgn_de, end_de=end_de, page_count=page_count, page_no=page_no)
+        yield from disclosures.get('list', [])
+        if page_no >= int(disclosures.get('total_page') or 1):
+            break
+        page_no += 1
+
 def filter_disclosures(disclosures, years, max_count=20):
     import re
     year_set = set(str(y) for y in years)
@@ -77,70 +201,298 @@ def filter_disclosures(disclosures, years, max_count=20):
 def fetch_financial_statements(api_key, corp_code, year):
     url = "https://opendart.fss.or.kr/api/fnlttSinglAcntAll.json"
     params = {
-        "crtfc_key": api_key,
         "corp_code": corp_code,
         "bsns_year": year,
         "reprt_code": "11011",
         "fs_div": "CFS"
     }
-    r = requests.get(url, params=params)
+    r = dart_get(api_key, url, params)
     if r.status_code != 200:
         print(f"Failed to get financials for year {year}: {r.status_code}")
         return None
     return r.json()
 
-def get_recent_filings(api_key, corp_code, since_date, count=40, max_length=600, return_count=False):
+DART_MULTI_ACCOUNT_MAX_CORPS = 100  # 다중회사 주요계정 1회 호출당 최대 회사 수
+
+def fetch_multi_company_accounts(api_key, corp_codes, year, reprt_code="11011"):
     """
-    종류 무관 최신순 공시 count개 반환
+    다중회사 주요계정(fnlttMultiAcnt.json) 조회: 최대 100개 회사의 주요 계정(자산/부채/자본/매출/영업이익/순이익 등)을 1회 호출로 조회
+    반환값: 계정 행 list (데이터 없음이면 []), 호출 실패(한도 초과 등)면 None
+    """
+    corp_codes = list(corp_codes)
+    if len(corp_codes) > DART_MULTI_ACCOUNT_MAX_CORPS:
+        raise Exception(f"fnlttMultiAcnt는 1회 최대 {DART_MULTI_ACCOUNT_MAX_CORPS}개 회사만 조회할 수 있습니다: {len(corp_codes)}개")
+    url = "https://opendart.fss.or.kr/api/fnlttMultiAcnt.json"
+    params = {"corp_code": ",".join(corp_codes), "bsns_year": year, "reprt_code": reprt_code}
+    r = dart_get(api_key, url, params, timeout=60)
+    if r.status_code != 200:
+        print(f"[ERROR] 다중회사 주요계정 조회 실패 ({year}): {r.status_code}")
+        return None
+    data = r.json()
+    if data.get("status") == "013":  # 조회된 데이터 없음
+        return []
+    if data.get("status") != "000":
+        print(f"[ERROR] 다중회사 주요계정 조회 실패 ({year}): {data.get('status')} {data.get('message')}")
+        return None
+    return data.get("list", [])
+
+@dataclass(slots=True, frozen=True)
+class Filing:
+    """공시 1건 (sections: 원문에서 추출한 감사보고서/핵심감사사항 섹션)"""
+    rcept_no: str
+    date: str
+    report_nm: str
+    flr_nm: str = ""
+    sections: tuple = ()
+
+    @classmethod
+    def from_item(cls, item, sections=()):
+        """list.json 공시 항목 → Filing"""
+        return cls(item.get('rcept_no', ''), item.get('rcept_dt', ''), item.get('report_nm', ''), item.get('flr_nm', ''), tuple(sections))
+
+    @property
+    def year(self):
+        return int(self.date[:4]) if self.date[:4].isdigit() else None
+
+    def line(self):
+        """프롬프트/리포트용 한 줄 표기: [접수일] 보고서명"""
+        return f"[{self.date}] {self.report_nm}"
+
+    def document(self):
+        """한 줄 표기 + 원문 섹션"""
+        return "\n".join((self.line(),) + self.sections)
+
+def encode_filings(filings):
+    """Filing 목록 → JSON 저장용 list (체크포인트)"""
+    return [[f.rcept_no, f.date, f.report_nm, f.flr_nm, list(f.sections)] for f in filings]
+
+def decode_filings(rows):
+    return [Filing(rcept_no, date, report_nm, flr_nm, tuple(sections)) for rcept_no, date, report_nm, flr_nm, sections in rows]
+
+def get_recent_filings(api_key, corp_code, since_date, count=40, log=print):
+    """
+    종류 무관 최신순 공시 count개를 Filing 목록으로 반환 (같은 날짜/보고서명 중복 제외)
+    count개 미만이면 log로 경고 출력
     """
     filings = []
     used = set()
     page = 1
     while len(filings) < count:
-        disclosures = get_disclosures(api_key, corp_code, bgn_de=since_date, page_count=100, end_de=None)
-        for item in disclosures.get('list', []):
-            key = (item.get('rcept_dt',''), item.get('report_nm',''))
-            if key in used:
-                continue
-            date = item.get('rcept_dt', '')
-            title = item.get('report_nm', '')
-            summary = item.get('title', '') if 'title' in item else ''
-            text = f"[{date}] {title} {summary}"
-            filings.append(text[:max_length])
-            used.add(key)
-            if len(filings) >= count:
-                break
-        if len(disclosures.get('list', [])) < 100:
+        disclosures = get_disclosures(api_key, corp_code, bgn_de=since_date, page_count=100, end_de=None, page_no=page)
+        if not collect_recent_filings(disclosures, filings, used, count):
             break
         page += 1
-    warn = ''
+    warn_short_filings(filings, count, log)
+    return filings
+
+def collect_recent_filings(disclosures, filings, used, count):
+    """공시목록 1페이지를 filings에 추가 (중복 제외). 다음 페이지가 필요하면 True"""
+    for item in disclosures.get('list', []):
+        key = (item.get('rcept_dt',''), item.get('report_nm',''))
+        if key in used:
+            continue
+        filings.append(Filing.from_item(item))
+        used.add(key)
+        if len(filings) >= count:
+            return False
+    return len(disclosures.get('list', [])) >= 100
+
+def warn_short_filings(filings, count, log=print):
     if len(filings) < count:
-        warn = f"[경고] 최근 공시가 {len(filings)}건으로 {count}건 미만입니다."
-    result = ('\n'.join(filings), len(filings)) if return_count else '\n'.join(filings)
-    if warn:
-        if return_count:
-            return (warn + '\n' + result[0], len(filings))
-        else:
-            return warn + '\n' + result
-    return result
+        log(f"[경고] 최근 공시가 {len(filings)}건으로 {count}건 미만입니다.")
 
-def get_yearly_key_reports(api_key, corp_code, years, max_length=1000):
+def get_yearly_key_reports(api_key, corp_code, years, fetch_documents=True):
     """
     각 연도별 사업보고서/감사보고서/재무제표만 추출(최대 3*len(years))
-    반환값: [(연도, 보고서명, 텍스트)]
+    fetch_documents=True이면 사업보고서/감사보고서 원문의 감사보고서·핵심감사사항 섹션을 sections에 포함
+    반환값: [Filing] (연도 순)
     """
-    wanted_reports = ['사업보고서', '감사보고서', '재무제표']
     result = []
     for year in years:
         disclosures = get_disclosures(api_key, corp_code, bgn_de=f'{year}0101', end_de=f'{year}1231', page_count=100)
-        for report in wanted_reports:
-            for item in disclosures.get('list', []):
-                if report in item.get('report_nm', ''):
-                    date = item.get('rcept_dt', '')
-                    title = item.get('report_nm', '')
-                    summary = item.get('title', '') if 'title' in item else ''
-                    text = f"[{date}] {title} {summary}"
-                    result.append((year, title, text[:max_length]))
-                    break  # 연도별 각 보고서 1개만
+        for report, item in select_yearly_key_reports(disclosures):
+            sections = fetch_audit_sections(api_key, item['rcept_no']) if fetch_documents and needs_audit_sections(report, item) else []
+            result.append(Filing.from_item(item, sections))
     return result
 
+YEARLY_KEY_REPORTS = ['사업보고서', '감사보고서', '재무제표']
+
+def select_yearly_key_reports(disclosures):
+    """1개 연도 공시목록에서 보고서 종류별 첫 공시만 [(보고서 종류, 공시 항목)]으로 반환"""
+    selected = []
+    for report in YEARLY_KEY_REPORTS:
+        for item in disclosures.get('list', []):
+            if report in item.get('report_nm', ''):
+                selected.append((report, item))
+                break  # 연도별 각 보고서 1개만
+    return selected
+
+def needs_audit_sections(report, item):
+    return report in ('사업보고서', '감사보고서') and bool(item.get('rcept_no'))
+
+class _AuditSectionCollector:
+    """공시 원문 텍스트 흐름에서 감사보고서/핵심감사사항 섹션만 모음"""
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.sections = []
+        self.buf = None
+
+    def title(self, text):
+        text = " ".join(text.split())
+        if any(kw in text for kw in AUDIT_SECTION_KEYWORDS):
+            self._flush()
+            self.buf = [text]
+        elif self.buf is not None:
+            # 감사 관련이 아닌 다음 제목이 나오면 섹션 종료
+            self._flush()
+
+    def text(self, text):
+        text = " ".join(text.split())
+        if not text:
+            return
+        if self.buf is None and "핵심감사사항" in text.replace(" ", ""):
+            # 감사보고서 첨부문서에서는 핵심감사사항이 TITLE이 아닌 본문 제목으로 등장
+            self.buf = []
+        if self.buf is not None:
+            self.buf.append(text)
+            if sum(len(t) for t in self.buf) >= self.max_chars:
+                self._flush()
+
+    def _flush(self):
+        if self.buf:
+            self.sections.append("\n".join(self.buf)[:self.max_chars])
+        self.buf = None
+
+    def result(self):
+        self._flush()
+        return self.sections
+
+class _AuditSectionHTMLParser(HTMLParser):
+    """XML로 파싱되지 않는 공시 원문용 fallback (HTMLParser 점진 파싱)"""
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+        self.title_buf = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self.title_buf = []
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self.title_buf is not None:
+            self.collector.title("".join(self.title_buf))
+            self.title_buf = None
+
+    def handle_data(self, data):
+        if self.title_buf is not None:
+            self.title_buf.append(data)
+        else:
+            self.collector.text(data)
+
+def _iter_audit_sections_xml(stream, max_chars):
+    collector = _AuditSectionCollector(max_chars)
+    title_depth = 0
+    stack = []  # [요소, text 처리 여부]
+    pending = None  # tail이 아직 확정되지 않은 직전 종료 요소
+    pending_parent = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if pending is not None:
+            # 다음 이벤트 시점에 직전 요소의 tail이 확정됨
+            if title_depth == 0:
+                if pending.tail:
+                    collector.text(pending.tail)
+                pending.clear()  # 처리한 요소는 즉시 해제하여 문서 전체가 메모리에 남지 않도록 함
+                if pending_parent is not None:
+                    pending_parent.remove(pending)
+            pending = None
+        is_title = elem.tag.upper() == "TITLE"
+        if event == "start":
+            if stack and not stack[-1][1]:
+                if title_depth == 0 and stack[-1][0].text:
+                    collector.text(stack[-1][0].text)
+                stack[-1][1] = True
+            stack.append([elem, False])
+            title_depth += is_title
+            continue
+        _, text_done = stack.pop()
+        if is_title:
+            title_depth -= 1
+            collector.title("".join(elem.itertext()))
+        elif not text_done and title_depth == 0 and elem.text:
+            collector.text(elem.text)
+        pending = elem
+        pending_parent = stack[-1][0] if stack else None
+    return collector.result()
+
+def _iter_audit_sections_html(stream, max_chars):
+    collector = _AuditSectionCollector(max_chars)
+    parser = _AuditSectionHTMLParser(collector)
+    reader = io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+    while True:
+        chunk = reader.read(64 * 1024)
+        if not chunk:
+            break
+        parser.feed(chunk)
+    parser.close()
+    return collector.result()
+
+def extract_audit_sections_from_zip(fileobj, max_chars=6000):
+    """document.xml zip(파일 객체)에서 감사보고서/핵심감사사항 섹션 텍스트 목록 추출 (작업 폴더에 압축 해제하지 않음)"""
+    sections = []
+    with zipfile.ZipFile(fileobj) as zf:
+        for name in zf.namelist():
+            try:
+                with zf.open(name) as member:
+                    sections.extend(_iter_audit_sections_xml(member, max_chars))
+            except ET.ParseError:
+                # DART 원문은 정형 XML이 아닌 경우가 많아 HTML 파서로 재시도
+                with zf.open(name) as member:
+                    sections.extend(_iter_audit_sections_html(member, max_chars))
+    return sections
+
+def fetch_audit_sections(api_key, rcept_no, max_chars=6000):
+    """
+    공시 원문(document.xml zip)을 스트리밍으로 받아 감사보고서/핵심감사사항 섹션만 반환
+    - 결과는 rcept_no 단위로 캐시
+    - zip은 SpooledTemporaryFile에 받아 일정 크기 이상은 임시 디렉터리로만 넘김
+    """
+    cached = audit_section_cache.get(rcept_no)
+    if cached is not None:
+        return cached
+    from singleflight import dart_flight
+    from credentials import resolve_pool
+    pool = resolve_pool("dart", api_key)
+    # 결과(섹션 문자열 list)는 호출자마다 복사해 반환
+    return list(dart_flight.do(("document.xml", pool.identity, rcept_no, max_chars), lambda: tuple(_fetch_audit_sections(pool, rcept_no, max_chars))))
+
+def _fetch_audit_sections(api_key, rcept_no, max_chars):
+    url = "https://opendart.fss.or.kr/api/document.xml"
+    try:
+        with dart_get(api_key, url, {"rcept_no": rcept_no}, stream=True, timeout=60) as r:
+            if r.status_code != 200:
+                print(f"[DEBUG] 공시 원문 다운로드 실패 ({rcept_no}): {r.status_code}")
+                return []
+            with tempfile.SpooledTemporaryFile(max_size=AUDIT_DOCUMENT_SPOOL_BYTES) as buf:
+                for chunk in r.iter_content(chunk_size=64 * 1024):
+                    buf.write(chunk)
+                sections = read_audit_sections_spool(buf, rcept_no, max_chars)
+    except Exception as e:
+        print(f"[DEBUG] 공시 원문 파싱 실패 ({rcept_no}): {e}")
+        return []
+    if sections is None:
+        return []
+    audit_section_cache.set(rcept_no, sections)
+    return sections
+
+AUDIT_DOCUMENT_SPOOL_BYTES = 4 * 1024 * 1024
+
+def read_audit_sections_spool(buf, rcept_no, max_chars=6000):
+    """다운로드한 공시 원문 zip(파일 객체)에서 섹션 추출. 응답이 zip이 아니면 None"""
+    buf.seek(0)
+    if not zipfile.is_zipfile(buf):
+        # 오류 시 DART는 zip 대신 status/message XML을 반환
+        buf.seek(0)
+        print(f"[DEBUG] 공시 원문 응답 오류 ({rcept_no}): {buf.read(200)}")
+        return None
+    buf.seek(0)
+    return extract_audit_sections_from_zip(buf, max_chars=max_chars)
@@ -0,0 +1,236 @@
+# [마감 시간 모듈] 리포트 1회의 마감 시각을 모든 외부 호출에 남은 시간 timeout으로 전달하고, 느린 읽기 호출은 중복(hedge) 호출합니다.
+# - report_deadline(seconds): 이 블록 안(같은 스레드/Task, bind_deadline으로 넘긴 스레드 풀 작업 포함)의 HTTP 호출 timeout을 남은 시간으로 제한
+#   마감이 지나면 이후 호출은 네트워크에 나가지 않고 곧바로 DeadlineExceeded
+# - hedged_call / async_hedged_call: 엔드포인트별 최근 지연시간 p95가 지나도 응답이 없으면 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+#   (DART/네이버 조회처럼 읽기 전용 GET에만 사용, asyncio는 늦은 쪽 Task를 취소)
+#   중복 요청도 API 일일 한도를 쓰므로 호출하는 쪽이 on_hedge로 키 사용량에 반영 (대용량 다운로드는 hedge하지 않음)
+# 스레드에서 진행 중인 requests 호출은 중단할 수 없으므로, 마감 후에도 남은 호출은 자신의 timeout(남은 시간 이내)까지만 실행됩니다.
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))  # timeout을 지정하지 않은 호출의 기본값(초)
+HEDGE_ENABLED = os.getenv("HTTP_HEDGE", "1") != "0"
+HEDGE_PERCENTILE = float(os.getenv("HTTP_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HTTP_HEDGE_MIN_SAMPLES", "20"))  # 이보다 표본이 적은 엔드포인트는 hedge하지 않음
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MAX_WORKERS = int(os.getenv("HTTP_HEDGE_MAX_WORKERS", "64"))
+
+# 마감 시각 (time.monotonic 기준, 없으면 None)
+_deadline = contextvars.ContextVar("report_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """리포트 마감 시간 초과"""
+
+@contextmanager
+def report_deadline(seconds):
+    """지금부터 seconds초 뒤를 마감으로 설정 (바깥에 더 이른 마감이 있으면 그대로 유지, seconds=None이면 변경 없음)"""
+    current = _deadline.get()
+    deadline = current if seconds is None else time.monotonic() + seconds
+    if current is not None:
+        deadline = min(current, deadline)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+def remaining():
+    """마감까지 남은 시간(초), 마감이 없으면 None"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+def check_deadline(what="호출"):
+    if expired():
+        raise DeadlineExceeded(f"리포트 마감 시간 초과로 {what} 중단")
+
+def call_timeout(timeout=None, what="HTTP 호출"):
+    """외부 호출 timeout = min(지정값(없으면 HTTP_DEFAULT_TIMEOUT), 남은 시간), 마감이 지났으면 DeadlineExceeded"""
+    timeout = HTTP_DEFAULT_TIMEOUT if timeout is None else timeout
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded(f"리포트 마감 시간 초과로 {what} 중단")
+    if isinstance(timeout, tuple):
+        # requests (connect, read) timeout
+        return tuple(min(t, left) for t in timeout)
+    return min(timeout, left)
+
+def bind_deadline(fn):
+    """스레드 풀에 넘길 함수에 현재 마감을 묶음 (contextvars는 executor 스레드로 전달되지 않으므로)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return fn
+
+    def bound(*args, **kwargs):
+        token = _deadline.set(deadline)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+    return bound
+
+class LatencyTracker:
+    """엔드포인트 1개의 최근 성공 응답 지연시간과 hedge 통계"""
+    def __init__(self, name, size=200):
+        self.name = name
+        self.samples = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.stats = {"calls": 0, "hedged": 0, "hedge_wins": 0}
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def hedge_delay(self):
+        """표본이 충분하면 HEDGE_PERCENTILE 지연시간, 아니면 None(hedge 안 함)"""
+        with self.lock:
+            if len(self.samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return max(HEDGE_MIN_DELAY, ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE))])
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def metrics(self):
+        delay = self.hedge_delay()
+        with self.lock:
+            return dict(self.stats, samples=len(self.samples), hedge_delay=round(delay, 3) if delay is not None else None)
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+def latency_tracker(name):
+    with _trackers_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker(name)
+        return _trackers[name]
+
+def hedge_metrics():
+    """엔드포인트별 호출/hedge 횟수와 현재 hedge 지연 (service /metrics)"""
+    with _trackers_lock:
+        trackers = list(_trackers.values())
+    return {t.name: t.metrics() for t in trackers}
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+def _get_hedge_executor():
+    global _hedge_executor
+    import concurrent.futures
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        return _hedge_executor
+
+def _timed(tracker, fn):
+    started = time.monotonic()
+    result = fn()
+    tracker.record(time.monotonic() - started)
+    return result
+
+def _discard_later(future, discard):
+    """늦게 끝난 쪽 결과 정리 (requests 응답이면 커넥션 반환)"""
+    def done(f):
+        if discard is not None and not f.cancelled() and f.exception() is None:
+            discard(f.result())
+    future.add_done_callback(done)
+
+def hedged_call(name, fn, discard=None, on_hedge=None):
+    """
+    읽기 전용 호출 fn()을 실행하되, name 엔드포인트의 p95 지연이 지나도 응답이 없으면 fn()을 한 번 더 실행해 먼저 성공한 결과 반환
+    - 둘 다 실패하면 마지막 예외, 마감이 지나면 DeadlineExceeded
+    - discard(result): 버리는 쪽 결과 정리 (예: response.close)
+    - on_hedge(): 중복 요청을 보낼 때 호출 (예: 키 사용량 +1)
+    """
+    import concurrent.futures
+    tracker = latency_tracker(name)
+    tracker.count("calls")
+    delay = tracker.hedge_delay() if HEDGE_ENABLED else None
+    left = remaining()
+    if delay is None or (left is not None and left <= delay):
+        return _timed(tracker, fn)
+    executor = _get_hedge_executor()
+    run = bind_deadline(lambda: _timed(tracker, fn))
+    primary = executor.submit(run)
+    futures = [primary]
+    done, _ = concurrent.futures.wait(futures, timeout=delay)
+    if not done:
+        tracker.count("hedged")
+        if on_hedge is not None:
+            on_hedge()
+        futures.append(executor.submit(run))
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = concurrent.futures.wait(pending, timeout=remaining(), return_when=concurrent.futures.FIRST_COMPLETED)
+        if not done:
+            for future in pending:
+                _discard_later(future, discard)
+            raise DeadlineExceeded(f"리포트 마감 시간 초과로 {name} 응답 대기 중단")
+        winner = next((f for f in futures if f in done and f.exception() is None), None)
+        if winner is None:
+            error = next(f.exception() for f in futures if f in done)
+            continue
+        if winner is not primary:
+            tracker.count("hedge_wins")
+        for future in futures:
+            if future is not winner:
+                _discard_later(future, discard)
+        return winner.result()
+    raise error
+
+async def async_hedged_call(name, coro_fn, on_hedge=None):
+    """hedged_call의 asyncio 버전 (coro_fn: 호출할 때마다 새 코루틴 반환, 늦은 쪽 Task는 취소)"""
+    tracker = latency_tracker(name)
+    tracker.count("calls")
+    delay = tracker.hedge_delay() if HEDGE_ENABLED else None
+    left = remaining()
+
+    async def run():
+        started = time.monotonic()
+        result = await coro_fn()
+        tracker.record(time.monotonic() - started)
+        return result
+    if delay is None or (left is not None and left <= delay):
+        return await run()
+    primary = asyncio.ensure_future(run())
+    tasks = [primary]
+    pending = set(tasks)
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if not done:
+            tracker.count("hedged")
+            if on_hedge is not None:
+                on_hedge()
+            tasks.append(asyncio.ensure_future(run()))
+            pending.add(tasks[-1])
+        error = None
+        while True:
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    if task is not primary:
+                        tracker.count("hedge_wins")
+                    return task.result()
+                if task.done() and not task.cancelled():
+                    error = task.exception()
+            if not pending:
+                raise error
+            done, pending = await asyncio.wait(pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"리포트 마감 시간 초과로 {name} 응답 대기 중단")
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
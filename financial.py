@@ -1,144 +1,216 @@
 # [재무분석 모듈] 재무비율 분석, 계산 및 시각화 기능을 담당합니다.
 
 import os
+import threading
 import pandas as pd
 import numpy as np
-from dart_api import fetch_financial_statements
+from dart_api import fetch_financial_statements, dart_get
 from utils import ensure_korean_font
+from cache_utils import DiskCache
+from deadline import bind_deadline
+
+try:
+    import orjson as _fast_json  # 선택 설치: 있으면 bytes를 바로 파싱 (json 대비 수 배 빠름)
+except ImportError:
+    _fast_json = None
+
+# 재무제표 DataFrame에 남기는 컬럼 (나머지 문자열 컬럼은 버려 연도별 메모리 절감)
+FS_CATEGORY_COLUMNS = ['sj_div', 'sj_nm', 'account_id', 'account_nm', 'currency']
+FS_AMOUNT_COLUMNS = ['thstrm_amount', 'frmtrm_amount', 'bfefrmtrm_amount']
+FS_STORE_COLUMNS = FS_CATEGORY_COLUMNS + FS_AMOUNT_COLUMNS + ['ord']
+
+# 연간 재무제표 로컬 저장소 ("corp_code:연도" → {'fs_div', 'detail', 'list'})
+# - detail=True: 전체 재무제표(fnlttSinglAcntAll), False: 다중회사 주요계정(fnlttMultiAcnt, bulk_prefetch.py)
+# - 정정공시 반영을 위해 FS_STORE_TTL_DAYS(기본 30일)가 지나면 다시 조회
+FS_STORE_TTL = int(os.getenv("FS_STORE_TTL_DAYS", "30")) * 24 * 3600
+statement_store = DiskCache("dart_statements", ttl=FS_STORE_TTL)
+# 사업보고서가 없는 (회사, 연도) 기록 (신규상장/미제출 등): FS_MISSING_TTL_DAYS(기본 7일) 동안 다시 조회하지 않음
+FS_MISSING_TTL = int(os.getenv("FS_MISSING_TTL_DAYS", "7")) * 24 * 3600
+missing_statement_store = DiskCache("dart_statements_missing", ttl=FS_MISSING_TTL)
+
+def _loads_json_bytes(content):
+    """응답 bytes를 한 번만 파싱 (UTF-8 실패 시에만 euc-kr로 디코딩 후 재시도)"""
+    import json
+    try:
+        return _fast_json.loads(content) if _fast_json else json.loads(content)
+    except (UnicodeDecodeError, ValueError):
+        return json.loads(content.decode('euc-kr'))
 
 def fetch_financial_statements(api_key, corp_code, year, fs_div="CFS"):
     url = "https://opendart.fss.or.kr/api/fnlttSinglAcntAll.json"
     params = {
-        "crtfc_key": api_key,
         "corp_code": corp_code,
         "bsns_year": year,
         "reprt_code": "11011",
         "fs_div": fs_div
     }
-    import requests
-    import json
-    r = requests.get(url, params=params)
+    r = dart_get(api_key, url, params)
     if r.status_code != 200:
         print(f"Failed to get financials for year {year} ({fs_div}): {r.status_code}")
         return None
     try:
-        return json.loads(r.content.decode('utf-8'))
-    except UnicodeDecodeError:
-        try:
-            return json.loads(r.content.decode('euc-kr'))
-        except Exception as e:
-            print(f"[ERROR] JSON decode 실패(euc-kr): {e}")
-            print(f"[DEBUG] 응답 일부: {r.content[:200]}")
-            return None
+        return _loads_json_bytes(r.content)
     except Exception as e:
         print(f"[ERROR] JSON decode 실패: {e}")
         print(f"[DEBUG] 응답 일부: {r.content[:200]}")
         return None
 
-def analyze_financial_ratios_multi_year(api_key, corp_code, years):
+def parse_amounts(values):
+    """
+    금액 문자열 목록('1,234', '-567', '', '-')을 한 번에 nullable Int64 배열로 변환
+    숫자가 아닌 값은 결측(mask)으로 처리
+    """
+    cleaned = pd.Series(values, dtype=object).fillna('').astype(str).str.replace(',', '', regex=False).str.strip()
+    valid = cleaned.str.fullmatch(r'-?\d+').to_numpy(dtype=bool)
+    parsed = np.zeros(len(cleaned), dtype=np.int64)
+    if valid.any():
+        parsed[valid] = cleaned.to_numpy()[valid].astype(np.int64)
+    return pd.arrays.IntegerArray(parsed, ~valid)
+
+def financial_statements_to_frame(items):
+    """
+    fnlttSinglAcntAll.json의 list를 타입이 지정된 DataFrame으로 변환
+    - 금액 컬럼: nullable Int64 (일괄 변환)
+    - 표구분/계정ID/계정명 등 반복 문자열: category
+    """
+    if not items:
+        return None
+    data = {}
+    for col in FS_CATEGORY_COLUMNS:
+        data[col] = pd.Categorical([item.get(col) for item in items])
+    for col in FS_AMOUNT_COLUMNS:
+        data[col] = parse_amounts([item.get(col) for item in items])
+    data['ord'] = pd.to_numeric(pd.Series([item.get('ord') for item in items], dtype=object), errors='coerce').astype('Int32')
+    return pd.DataFrame(data)
+
+def store_statement(corp_code, year, items, fs_div, detail=True):
+    """재무제표 계정 행을 저장소에 기록 (프레임 변환에 쓰는 컬럼만 저장)"""
+    statement_store.set(f"{corp_code}:{year}", {
+        "fs_div": fs_div,
+        "detail": bool(detail),
+        "list": [{col: item.get(col) for col in FS_STORE_COLUMNS} for item in items],
+    })
+
+def load_stored_statement(corp_code, year, detail=True):
+    """저장소의 재무제표 (detail=True면 전체 재무제표만 인정). 없으면 None"""
+    entry = statement_store.get(f"{corp_code}:{year}")
+    if entry is None or not entry.get("list") or (detail and not entry.get("detail")):
+        return None
+    return entry
+
+def mark_statement_missing(corp_code, year):
+    missing_statement_store.set(f"{corp_code}:{year}", True)
+
+def statement_known_missing(corp_code, year):
+    """최근 FS_MISSING_TTL 안에 재무제표가 없다고 확인된 (회사, 연도)면 True"""
+    return missing_statement_store.get(f"{corp_code}:{year}") is not None
+
+def fetch_full_statement(api_key, corp_code, year):
+    """
+    전체 재무제표를 CFS(연결) → OFS(별도) 순으로 조회해 저장소에 기록. 반환값: (계정 행 list, fs_div) 또는 None
+    두 구분 모두 '조회된 데이터 없음'(013)이면 없는 연도로 기록 (호출 실패는 기록하지 않음)
+    """
+    no_data = True
+    for fs_div in ("CFS", "OFS"):
+        fin = fetch_financial_statements(api_key, corp_code, year, fs_div=fs_div)
+        if fin and fin.get('list'):
+            store_statement(corp_code, year, fin['list'], fs_div, detail=True)
+            return fin['list'], fs_div
+        no_data = no_data and bool(fin) and fin.get('status') == "013"
+    if no_data:
+        mark_statement_missing(corp_code, year)
+    return None
+
+def load_financial_statements_multi_year(api_key, corp_code, years, max_workers=4, detail=True, fetch=True):
+    """
+    여러 연도 재무제표를 병렬로 조회해 {연도: (DataFrame, 사용한 fs_div)} 반환
+    저장소(bulk_prefetch.py 사전조회 포함)에 있으면 API를 호출하지 않음
+    detail=False면 다중회사 주요계정만 저장된 연도도 사용 (이자비용 등 세부 계정 없음)
+    fetch=False면 저장소에 있는 연도만 사용 (API 호출 없음), 최근 없다고 확인된 연도도 조회하지 않음
+    연도별로 CFS(연결)를 먼저 시도하고, 없으면 OFS(별도)로 fallback. 데이터가 없는 연도는 제외
+    """
+    import concurrent.futures
+
+    def load_year(year):
+        stored = load_stored_statement(corp_code, year, detail=detail)
+        if stored is not None:
+            return financial_statements_to_frame(stored['list']), stored['fs_div']
+        fetched = fetch_full_statement(api_key, corp_code, year) if fetch and not statement_known_missing(corp_code, year) else None
+        if fetched is None:
+            return None
+        items, fs_div = fetched
+        return financial_statements_to_frame(items), fs_div
+
+    years = list(years)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(years)))) as executor:
+        loaded = dict(zip(years, executor.map(bind_deadline(load_year), years)))
+    return {year: result for year, result in loaded.items() if result is not None}
+
+def normalize_account_name(name):
+    """계정명 비교용 정규화 (공백/괄호 제거, 소문자)"""
+    import re
+    return re.sub(r'[\s\(\)]', '', str(name)).lower()
+
+def find_account_amount(subdf, names, account_norms):
+    """
+    계정명 후보(names) 순서대로, 정규화 계정명에 후보가 포함된 첫 행의 당기 금액 반환
+    account_norms: subdf['account_nm'] category 값별 정규화 계정명 (category 순서와 동일)
+    """
+    if isinstance(names, str):
+        names = [names]
+    if 'account_nm' not in subdf:
+        print(f"[경고] account_nm 컬럼 없음")
+        return None
+    codes = subdf['account_nm'].cat.codes
+    for name in names:
+        name_norm = normalize_account_name(name)
+        matched_codes = [i for i, norm in enumerate(account_norms) if name_norm in norm]
+        if not matched_codes:
+            continue
+        matched = subdf['thstrm_amount'][codes.isin(matched_codes).to_numpy()]
+        if not matched.empty and not pd.isna(matched.iloc[0]):
+            return float(matched.iloc[0])
+    return None
+
+# 비율 계산에 쓰는 계정별 후보 계정명 (앞쪽 후보 우선)
+RATIO_ACCOUNT_NAMES = {
+    'ca': ['유동자산','유동 자산'],
+    'cl': ['유동부채','유동 부채'],
+    'ta': ['자산총계','총자산','자산 총계','총 자산'],
+    'tl': ['부채총계','총부채','부채 총계','총 부채'],
+    'eq': ['자본총계','총자본','자본 총계','총 자본'],
+    'ni': [
+        '당기순이익','순이익','당기순이익(손실)','당기순손실','지배기업의 소유주에게 귀속되는 당기순이익(손실)',
+        '지배기업 소유주지분', '지배기업의 소유주에게 귀속되는 당기순이익', '비지배지분에 귀속되는 당기순이익(손실)'],
+    'sales': [
+        '매출액','매출','수익','영업수익','영업매출','매출총액','수익(매출액)','영업수익(손실)','영업수익(매출액)','영업수익(영업매출)','영업수익(수익)','영업수익(매출총액)'],
+    'op_profit': [
+        '영업이익','영업손익','영업이익(손실)','영업손실','영업이익(이익)','영업이익(영업손실)','영업이익(영업이익)'],
+    'int_exp': ['이자비용','이자 비용','금융비용','이자'],
+}
+# 다중회사 주요계정만으로 동종업계 비율을 계산하려면 있어야 하는 계정 (없으면 전체 재무제표 조회)
+KEY_RATIO_ACCOUNTS = ('ta', 'tl', 'eq', 'ni', 'sales')
+
+def extract_ratio_accounts(df):
+    """재무제표 DataFrame에서 비율 계산용 계정 금액 추출: {'ca', 'cl', 'ta', 'tl', 'eq', 'ni', 'sales', 'op_profit', 'int_exp'}"""
+    # 계정명 정규화는 category 값(고유 계정명)에 대해서만 1회 수행
+    account_norms = [normalize_account_name(c) for c in df['account_nm'].cat.categories]
+    return {key: find_account_amount(df, names, account_norms) for key, names in RATIO_ACCOUNT_NAMES.items()}
+
+def analyze_financial_ratios_multi_year(api_key, corp_code, years, detail=True, fetch=True):
+    # detail=False: 저장소의 다중회사 주요계정도 사용 (동종업계 인덱스 적재용, 이자보상배율은 비어 있을 수 있음)
+    # fetch=False: 저장소에 있는 연도만 사용 (사전조회 후 API 호출 없이 계산)
     results = {}
     prev_sales = None
-    import difflib
+    frames = load_financial_statements_multi_year(api_key, corp_code, years, detail=detail, fetch=fetch)
     for year in years:
-        # 1차: CFS(연결) 시도
-        fin = fetch_financial_statements(api_key, corp_code, year, fs_div="CFS")
-        used_fs_div = "CFS"
-        if not fin or 'list' not in fin or not fin['list']:
-            # 2차: OFS(별도) fallback
-            fin = fetch_financial_statements(api_key, corp_code, year, fs_div="OFS")
-            used_fs_div = "OFS"
-        if not fin or 'list' not in fin or not fin['list']:
+        if year not in frames:
             # 해당 연도 데이터가 없으면 결과에 포함하지 않고 건너뜀 (경고 출력도 생략)
             continue
-        
-        if len(fin['list']) > 0:
-            sample_accounts = list({item.get('account_nm','') for item in fin['list'] if 'account_nm' in item})[:20]
-            
-        df = pd.DataFrame(fin['list'])
-        import re
-        # 표구분별 계정명 후보군 설정
-        account_candidates_by_sj = {
-            '재무상태표': {
-                'ca': ['유동자산','유동 자산','유동자산계','유동자산총계','CurrentAssets','TotalCurrentAssets'],
-                'cl': ['유동부채','유동 부채','유동부채계','유동부채총계','CurrentLiabilities','TotalCurrentLiabilities'],
-                'ta': ['자산총계','총자산','자산 총계','총 자산','자산총액','TotalAssets','AssetsTotal'],
-                'tl': ['부채총계','총부채','부채 총계','총 부채','부채총액','TotalLiabilities','LiabilitiesTotal'],
-                'eq': ['자본총계','총자본','자본 총계','총 자본','자본총액','TotalEquity','EquityTotal'],
-            },
-            '포괄손익계산서': {
-                'ni': ['당기순이익','순이익','당기순이익(손실)','당기순손실','NetIncome','NetProfit','분기순이익','반기순이익','분기순손익','반기순손익'],
-                'sales': ['매출액','매출','수익','영업수익','영업매출','매출총액','Revenue','Sales'],
-                'op_profit': ['영업이익','영업손익','영업이익(손실)','영업손실','OperatingProfit','OperatingIncome'],
-                'int_exp': ['이자비용','이자 비용','금융비용','이자','InterestExpense','Interest'],
-            },
-            '손익계산서': {
-                'ni': ['당기순이익','순이익','당기순이익(손실)','당기순손실','NetIncome','NetProfit','분기순이익','반기순이익','분기순손익','반기순손익'],
-                'sales': ['매출액','매출','수익','영업수익','영업매출','매출총액','Revenue','Sales'],
-                'op_profit': ['영업이익','영업손익','영업이익(손실)','영업손실','OperatingProfit','OperatingIncome'],
-                'int_exp': ['이자비용','이자 비용','금융비용','이자','InterestExpense','Interest'],
-            },
-        }
-        # 표구분별 데이터 분리
-        sj_groups = dict(tuple(df.groupby('sj_nm')))
-        # get_account 함수(표별 적용)
-        def get_account(subdf, names):
-            if isinstance(names, str):
-                names = [names]
-            def normalize(s):
-                return re.sub(r'[\s\(\)]', '', str(s)).lower()
-            if 'account_nm' not in subdf:
-                print(f"[경고] account_nm 컬럼 없음")
-                return None
-            subdf['account_nm_norm'] = subdf['account_nm'].apply(normalize)
-            for name in names:
-                name_norm = normalize(name)
-                matched = subdf[subdf['account_nm_norm'].str.contains(name_norm)]
-                if not matched.empty:
-                    try:
-                        val = matched.iloc[0]['thstrm_amount']
-                        return float(str(val).replace(",", ""))
-                    except Exception as e:
-                        continue
-            # 유사 계정명 추천
-            candidates = list(subdf['account_nm'].unique())
-            close_matches = []
-            for name in names:
-                close_matches += difflib.get_close_matches(name, candidates, n=3, cutoff=0.6)
-            
-            return None
-        # 표별로 계정 추출
-        ca = cl = ta = tl = eq = ni = sales = op_profit = int_exp = None
-        # 재무상태표
-        for sj in ['재무상태표']:
-            if sj in sj_groups:
-                subdf = sj_groups[sj]
-                ca = get_account(subdf, account_candidates_by_sj[sj]['ca'])
-                cl = get_account(subdf, account_candidates_by_sj[sj]['cl'])
-                ta = get_account(subdf, account_candidates_by_sj[sj]['ta'])
-                tl = get_account(subdf, account_candidates_by_sj[sj]['tl'])
-                eq = get_account(subdf, account_candidates_by_sj[sj]['eq'])
-        # 포괄손익계산서/손익계산서
-        for sj in ['포괄손익계산서','손익계산서']:
-            if sj in sj_groups:
-                subdf = sj_groups[sj]
-                ni = get_account(subdf, account_candidates_by_sj[sj]['ni'])
-                sales = get_account(subdf, account_candidates_by_sj[sj]['sales'])
-                op_profit = get_account(subdf, account_candidates_by_sj[sj]['op_profit'])
-                int_exp = get_account(subdf, account_candidates_by_sj[sj]['int_exp'])
-
-        ca = get_account(df, ['유동자산','유동 자산'])
-        cl = get_account(df, ['유동부채','유동 부채'])
-        ta = get_account(df, ['자산총계','총자산','자산 총계','총 자산'])
-        tl = get_account(df, ['부채총계','총부채','부채 총계','총 부채'])
-        eq = get_account(df, ['자본총계','총자본','자본 총계','총 자본'])
-        ni = get_account(df, [
-            '당기순이익','순이익','당기순이익(손실)','당기순손실','지배기업의 소유주에게 귀속되는 당기순이익(손실)',
-            '지배기업 소유주지분', '지배기업의 소유주에게 귀속되는 당기순이익', '비지배지분에 귀속되는 당기순이익(손실)'])
-        sales = get_account(df, [
-            '매출액','매출','수익','영업수익','영업매출','매출총액','수익(매출액)','영업수익(손실)','영업수익(매출액)','영업수익(영업매출)','영업수익(수익)','영업수익(매출총액)'])
-        op_profit = get_account(df, [
-            '영업이익','영업손익','영업이익(손실)','영업손실','영업이익(이익)','영업이익(영업손실)','영업이익(영업이익)'])
-        int_exp = get_account(df, ['이자비용','이자 비용','금융비용','이자'])
+        df, used_fs_div = frames[year]
+        accounts = extract_ratio_accounts(df)
+        ca, cl, ta, tl, eq = (accounts[k] for k in ('ca', 'cl', 'ta', 'tl', 'eq'))
+        ni, sales, op_profit, int_exp = (accounts[k] for k in ('ni', 'sales', 'op_profit', 'int_exp'))
         current_ratio = ca / cl * 100 if ca and cl else None
         debt_ratio = tl / eq * 100 if tl and eq else None
         roa = ni / ta * 100 if ni and ta else None
@@ -186,11 +258,22 @@ def export_to_csv(df, company_name, filename):
         if '연도' in df.columns:
             df = df.sort_values('연도', ascending=True)
         os.makedirs(f"results/{company_name}", exist_ok=True)
-        df.to_csv(f"results/{company_name}/{filename}", index=False, encoding='utf-8-sig')
     full_path = os.path.join("results", company_name, filename)
+    if df is not None:
+        from results_catalog import atomic_output, record_artifact
+        with atomic_output(full_path) as tmp_path:
+            df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        record_artifact(full_path, company_name)
     print(f"[Tableau용 CSV 저장 완료] {full_path}")
 
+# pyplot은 스레드 안전하지 않으므로 서비스 모드 등 동시 실행 시 그래프 생성을 직렬화
+_plot_lock = threading.Lock()
+
 def plot_financial_ratios(df, company_name, filename=None):
+    with _plot_lock:
+        _plot_financial_ratios(df, company_name, filename)
+
+def _plot_financial_ratios(df, company_name, filename=None):
     ensure_korean_font()
     import matplotlib.pyplot as plt
     import numpy as np
@@ -221,6 +304,11 @@ def plot_financial_ratios(df, company_name, filename=None):
         filename = f"results/{company_name}/{company_name}_재무비율.png"
     else:
         filename = f"results/{company_name}/{filename}"
-    plt.savefig(filename)
-    plt.close()
+    from results_catalog import atomic_output, record_artifact
+    try:
+        with atomic_output(filename) as tmp_path:
+            plt.savefig(tmp_path)
+    finally:
+        plt.close()
+    record_artifact(filename, company_name)
     print(f"[재무비율 그래프 저장 완료] {filename}")
@@ -0,0 +1,49 @@
+# [HTTP 모듈] DART/네이버/OpenAI 호출에 공통으로 사용하는 커넥션 풀 세션을 관리합니다.
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from deadline import call_timeout
+
+HTTP_POOL_MAXSIZE = 32
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """프로세스 공용 requests.Session 반환 (호스트별 keep-alive 커넥션 재사용)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def response_snapshot(response):
+    """requests.Response → 변경할 수 없는 (status, reason, url, headers, body bytes) (요청 병합 시 스레드 간 공유용)"""
+    return (response.status_code, response.reason, response.url, tuple(response.headers.items()), response.content)
+
+def response_from_snapshot(snapshot):
+    """response_snapshot → 호출자 전용 새 requests.Response (encoding 변경 등이 다른 호출자에 영향 없음)"""
+    from requests.structures import CaseInsensitiveDict
+    status_code, reason, url, headers, content = snapshot
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = reason
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+def http_get(url, **kwargs):
+    # timeout: 지정값(없으면 HTTP_DEFAULT_TIMEOUT)과 리포트 마감까지 남은 시간 중 작은 값 (deadline.py)
+    kwargs["timeout"] = call_timeout(kwargs.get("timeout"))
+    return get_session().get(url, **kwargs)
+
+def http_post(url, **kwargs):
+    kwargs["timeout"] = call_timeout(kwargs.get("timeout"))
+    return get_session().post(url, **kwargs)
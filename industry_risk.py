@@ -0,0 +1,73 @@
+# [산업 리스크 라이브러리 모듈] 산업별 주요 회계리스크 이슈를 1회 생성해 회사 간 공유합니다.
+import os
+import sys
+from cache_utils import DiskCache
+
+# 프롬프트를 수정하면 버전을 올려 기존 캐시를 무효화합니다.
+INDUSTRY_RISK_PROMPT_VERSION = "v1"
+INDUSTRY_RISK_TTL = 30 * 24 * 3600  # 30일
+INDUSTRY_RISK_FAIL_MESSAGE = "회계리스크 이슈 생성에 실패했습니다."
+
+industry_risk_cache = DiskCache("industry_risk", ttl=INDUSTRY_RISK_TTL)
+
+def _cache_key(industry_name):
+    return f"{INDUSTRY_RISK_PROMPT_VERSION}:{industry_name.strip()}"
+
+def _build_prompt(industry_name):
+    return f"""{industry_name} 산업의 주요 회계리스크 이슈를 4-5개 나열해줘.
+각 항목은 다음과 같은 형식으로 작성해줘:
+- (구체적인 회계리스크 이슈 설명)
+
+실제 {industry_name} 산업의 특성을 반영하여 구체적이고 전문적으로 작성해줘.
+예시: 매출 인식, 재고 평가, 자산 손상, 충당부채, 관계사 거래 등과 관련된 리스크"""
+
+def generate_accounting_risks_for_industry(industry_name, llm_api_key, refresh=False):
+    """특정 산업의 회계리스크 이슈를 산업 리스크 라이브러리에서 조회 (없으면 LLM으로 생성 후 저장)"""
+    key = _cache_key(industry_name)
+    if not refresh:
+        cached = industry_risk_cache.get(key)
+        if cached:
+            return cached
+    try:
+        from llm_utils import query_llm
+        # 산업 공통 정보이므로 낮은 temperature로 일관된 답변 유도 (LLM_ROUTES['industry_risk'])
+        response = query_llm(llm_api_key, _build_prompt(industry_name), task="industry_risk").strip()
+    except Exception as e:
+        print(f"[DEBUG] 회계리스크 생성 실패 ({industry_name}): {e}")
+        return INDUSTRY_RISK_FAIL_MESSAGE
+    if not response:
+        return INDUSTRY_RISK_FAIL_MESSAGE
+    industry_risk_cache.set(key, response)
+    return response
+
+def prewarm_industry_risks(llm_api_key, industries=None, refresh=False):
+    """
+    산업 리스크 라이브러리 사전 생성 (야간 배치용)
+    - industries 미지정 시 번들 KSIC 표의 모든 산업명과 카테고리를 대상으로 함
+    - 반환값: 새로 생성한 산업 수
+    """
+    if industries is None:
+        from industry_utils import load_ksic_index, INDUSTRY_CATEGORIES
+        _, by_name = load_ksic_index()
+        industries = list(by_name.keys()) + INDUSTRY_CATEGORIES
+    created = 0
+    for industry_name in dict.fromkeys(industries):
+        if not refresh and industry_risk_cache.get(_cache_key(industry_name)):
+            continue
+        if generate_accounting_risks_for_industry(industry_name, llm_api_key, refresh=True) != INDUSTRY_RISK_FAIL_MESSAGE:
+            created += 1
+            print(f"[INFO] 산업 리스크 생성 완료: {industry_name}")
+    return created
+
+if __name__ == "__main__":
+    # 사용법: python industry_risk.py [--refresh] [산업명 ...]
+    args = sys.argv[1:]
+    refresh = "--refresh" in args
+    names = [a for a in args if a != "--refresh"] or None
+    llm_api_key = os.getenv("OPENAI_API_KEY")
+    if not llm_api_key:
+        from run import OPENAI_API_KEY as llm_api_key
+    from credentials import credential_pool
+    llm_api_key = credential_pool("openai", llm_api_key)
+    created = prewarm_industry_risks(llm_api_key, industries=names, refresh=refresh)
+    print(f"[INFO] 산업 리스크 라이브러리 사전 생성 완료: {created}건")
@@ -1,6 +1,11 @@
 # [산업 추출 모듈] 산업/업종 추출 및 카테고리 매핑 기능을 담당합니다.
 from bs4 import BeautifulSoup
-import requests
+from http_utils import http_get
+import os
+import re
+import csv
+import functools
+from cache_utils import DiskCache
 
 INDUSTRY_CODE_MAP = {
     "28202": "이차전지 제조업",
@@ -23,10 +28,46 @@ INDUSTRY_CATEGORY_MAP = {
     "정보통신업": "IT",
 }
 
+# 카테고리 후보 (LLM 분류 시에도 이 목록 안에서만 선택)
+INDUSTRY_CATEGORIES = ["에너지", "철강", "바이오", "제조", "금융", "IT", "전자", "화학", "반도체", "자동차", "건설", "유통", "운송", "서비스"]
+
+# 번들 KSIC 코드표 (code, name, category)
+KSIC_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ksic_codes.csv")
+
+# 회사명 → 산업명 목록, 산업명 → 카테고리 영구 캐시
+company_industry_cache = DiskCache("company_industry")
+industry_category_cache = DiskCache("industry_category")
+
+@functools.lru_cache(maxsize=1)
+def load_ksic_index():
+    """번들 KSIC 표를 읽어 ({코드: (산업명, 카테고리)}, {산업명: 카테고리}) 인덱스 생성"""
+    by_code = {}
+    by_name = {}
+    with open(KSIC_TABLE_PATH, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            by_code[row["code"]] = (row["name"], row["category"])
+            by_name.setdefault(row["name"], row["category"])
+    for code, name in INDUSTRY_CODE_MAP.items():
+        by_code.setdefault(code, (name, by_name.get(name, "기타")))
+    return by_code, by_name
+
+def lookup_ksic(induty_code):
+    """
+    DART company.json의 induty_code를 최장 접두사 기준으로 KSIC 표에서 조회
+    반환값: (매칭된 코드, 산업명, 카테고리) 또는 None
+    """
+    code = re.sub(r"\D", "", str(induty_code or ""))
+    by_code, _ = load_ksic_index()
+    for length in range(len(code), 1, -1):
+        hit = by_code.get(code[:length])
+        if hit:
+            return (code[:length],) + hit
+    return None
+
 def search_ksic_industry_name(ksic_code):
     url = f"https://kssc.kostat.go.kr/spss/search/ksicSearch.do?searchWord={ksic_code}"
     try:
-        resp = requests.get(url, timeout=5)
+        resp = http_get(url, timeout=5)
         if resp.status_code == 200:
             soup = BeautifulSoup(resp.text, "html.parser")
             result = soup.find("td", class_="left")
@@ -36,62 +77,63 @@ def search_ksic_industry_name(ksic_code):
         print("KSIC 검색 실패:", e)
     return None
 
-def search_industries_by_company(company_name, naver_client_id=None, naver_client_secret=None, dart_api_key=None, llm_api_key=None):
+def search_industries_by_company(company_name, naver_client_id=None, naver_client_secret=None, dart_api_key=None, llm_api_key=None, corp_code=None, naver_pool=None):
     """
-    1. 네이버 백과사전에서 산업명 추출
-    2. DART 회사정보에서 업종명 추출 시도
-    3. KSIC 코드로 산업명 추출 시도
-    4. 그래도 없으면 LLM에 회사명+뉴스로 산업 추정 프롬프트 호출
+    0. 회사→산업 캐시 조회
+    1. DART 회사정보 induty_code로 번들 KSIC 표 조회 (로컬)
+    2. 번들 표에 없는 코드만 KSIC 사이트에서 산업명 조회
+    3. 네이버 백과사전에서 산업명 추출
+    4. 그래도 없으면 LLM에 회사명으로 산업 추정 프롬프트 호출
     """
-    import re
+    cached = company_industry_cache.get(company_name)
+    if cached:
+        return cached["industries"]
     industries = set()
-    # 1) 네이버 백과사전 시도
-    try:
-        headers = {"X-Naver-Client-Id": naver_client_id, "X-Naver-Client-Secret": naver_client_secret}
-        url = "https://openapi.naver.com/v1/search/encyc.json"
-        params = {"query": f"{company_name} 산업", "display": 3}
-        response = requests.get(url, headers=headers, params=params)
-        if response.status_code == 200:
-            items = response.json().get('items', [])
-            for item in items:
-                desc = item.get('description', '')
-                found = re.findall(r"([가-힣A-Za-z0-9 ]{2,}(제조업|업|서비스|산업|업종))", desc)
-                for (industry, _) in found:
-                    clean = industry.strip()
-                    if len(clean) > 3:
-                        industries.add(clean)
-    except Exception as e:
-        print("[DEBUG] 네이버 백과사전 산업 추출 예외:", e)
-    # 2) DART 회사정보 업종명 시도
-    if not industries and dart_api_key is not None:
-        try:
-            from dart_api import get_corp_code, get_company_info
-            corp_code = get_corp_code(dart_api_key, company_name)
-            info = get_company_info(dart_api_key, corp_code)
-            biz = info.get('company', {}).get('biz_name') or info.get('company', {}).get('industry')
-            if biz and isinstance(biz, str) and len(biz) > 2:
-                industries.add(biz.strip())
-        except Exception as e:
-            print("[DEBUG] DART 업종명 추출 예외:", e)
-    # 3) KSIC 코드로 산업명 시도
-    if not industries and dart_api_key is not None:
+    induty_code = None
+    # 1) DART induty_code → 로컬 KSIC 표
+    if dart_api_key is not None:
         try:
             from dart_api import get_corp_code, get_company_info
-            corp_code = get_corp_code(dart_api_key, company_name)
+            if corp_code is None:
+                corp_code = get_corp_code(dart_api_key, company_name)
             info = get_company_info(dart_api_key, corp_code)
-            ksic_code = info.get('company', {}).get('ksic_code')
-            if ksic_code:
-                industry_ksic = search_ksic_industry_name(ksic_code)
+            induty_code = info.get('induty_code')
+            hit = lookup_ksic(induty_code)
+            if hit and len(hit[0]) >= 3:
+                industries.add(hit[1])
+            # 2) 번들 표에 세부 코드가 없을 때만 KSIC 사이트 조회
+            elif induty_code:
+                industry_ksic = search_ksic_industry_name(induty_code)
                 if industry_ksic:
                     industries.add(industry_ksic)
+                elif hit:
+                    industries.add(hit[1])
+        except Exception as e:
+            print("[DEBUG] DART/KSIC 산업 추출 예외:", e)
+    # 3) 네이버 백과사전 시도
+    if not industries and (naver_pool is not None or (naver_client_id and naver_client_secret)):
+        try:
+            from naver_api import naver_credentials, naver_get
+            url = "https://openapi.naver.com/v1/search/encyc.json"
+            params = {"query": f"{company_name} 산업", "display": 3}
+            response = naver_get(naver_credentials(naver_client_id, naver_client_secret, naver_pool), url, params, timeout=10)
+            if response.status_code == 200:
+                items = response.json().get('items', [])
+                for item in items:
+                    desc = item.get('description', '')
+                    found = re.findall(r"([가-힣A-Za-z0-9 ]{2,}(제조업|업|서비스|산업|업종))", desc)
+                    for (industry, _) in found:
+                        clean = industry.strip()
+                        if len(clean) > 3:
+                            industries.add(clean)
         except Exception as e:
-            print("[DEBUG] KSIC 산업 추출 예외:", e)
+            print("[DEBUG] 네이버 백과사전 산업 추출 예외:", e)
     # 4) LLM 산업 추정 프롬프트 (최대 4개, 쉼표 구분)
     if not industries and llm_api_key is not None:
         try:
             from llm_utils import query_llm
             prompt = f"'{company_name}'의 주요 산업(업종)명을 한글로 최대 4개까지, 쉼표로 구분해서 추정해줘. 예시: 반도체, IT, 바이오, 제조, 전자, 금융, 화학, 철강, 에너지 등. 반드시 산업명만 답변해줘."
-            industry_llm = query_llm(llm_api_key, prompt, temperature=0.7).strip()
+            industry_llm = query_llm(llm_api_key, prompt, task="industry").strip()
             if industry_llm and len(industry_llm) > 1:
                 for ind in industry_llm.split(','):
                     clean = ind.strip()
@@ -110,20 +152,29 @@ def search_industries_by_company(company_name, naver_client_id=None, naver_clien
         return result
     if not industries:
         print("[DEBUG] 산업명 추출 실패. 모든 Fallback 경로 실패.")
-    return dedup_similar(list(industries))
+        return []
+    result = dedup_similar(sorted(industries))
+    company_industry_cache.set(company_name, {"corp_code": corp_code, "induty_code": induty_code, "industries": result})
+    return result
 
 def map_to_category(industry_name, llm_api_key=None):
     if industry_name in INDUSTRY_CATEGORY_MAP:
         return INDUSTRY_CATEGORY_MAP[industry_name]
+    _, by_name = load_ksic_index()
+    if industry_name in by_name:
+        return by_name[industry_name]
+    cached = industry_category_cache.get(industry_name)
+    if cached:
+        return cached
     if llm_api_key:
         from llm_utils import query_llm
         prompt = (
             f"'{industry_name}'을(를) 아래 카테고리 중 가장 적합한 하나로 분류해줘. 반드시 한 단어만 반환.\n"
-            f"카테고리 후보: 에너지, 철강, 바이오, 제조, 금융, IT, 전자, 화학, 반도체"
+            f"카테고리 후보: {', '.join(INDUSTRY_CATEGORIES)}"
         )
-        cat = query_llm(llm_api_key, prompt, temperature=0.8).strip()
-        for allowed in ["에너지", "철강", "바이오", "제조", "금융", "IT", "전자", "화학", "반도체"]:
-            if allowed in cat:
-                return allowed
-        return "기타"
+        cat = query_llm(llm_api_key, prompt, task="classify").strip()
+        category = next((allowed for allowed in INDUSTRY_CATEGORIES if allowed in cat), "기타")
+        if cat:
+            industry_category_cache.set(industry_name, category)
+        return category
     return "기타"
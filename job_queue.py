@@ -0,0 +1,241 @@
+# [작업 큐 모듈] 여러 워커 프로세스가 공유하는 SQLite 기반 내구성 리포트 작업 큐를 제공합니다.
+# - lease(가시성 타임아웃) 방식: 워커가 죽으면 lease 만료 후 다른 워커가 이어받음
+# - 실패 시 지수 backoff 재시도, 최대 시도 초과 시 dead-letter
+# - 단계별 체크포인트: 재시도 시 완료된 단계(재무비율, 공시, 뉴스, 요약 등)는 다시 호출하지 않음
+import os
+import sys
+import json
+import time
+import random
+import socket
+import sqlite3
+import threading
+
+QUEUE_DB = os.getenv("REPORT_QUEUE_DB", os.path.join("cache", "jobs.sqlite3"))
+VISIBILITY_TIMEOUT = 15 * 60     # lease 유지 시간(초), 하트비트로 연장
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 30                # 첫 재시도 대기(초), 이후 2배씩 증가
+BACKOFF_MAX = 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued',   -- queued / leased / done / dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    result TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+class JobQueue:
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, company_name, payload=None, max_attempts=MAX_ATTEMPTS, delay=0):
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO jobs (company, payload, max_attempts, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (company_name, json.dumps(payload or {}, ensure_ascii=False), max_attempts, now + delay, now, now),
+        )
+        return cur.lastrowid
+
+    def lease(self, worker_id, visibility_timeout=VISIBILITY_TIMEOUT):
+        """실행 가능한 작업 1건을 원자적으로 lease (만료된 lease도 회수). 없으면 None"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # lease가 만료된 작업 중 시도 횟수를 모두 쓴 작업은 dead-letter로 이동
+            conn.execute(
+                "UPDATE jobs SET status='dead', last_error=COALESCE(last_error, 'lease expired'), updated_at=? "
+                "WHERE status='leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status='queued' AND available_at <= ?) OR (status='leased' AND lease_expires < ?) "
+                "ORDER BY available_at, id LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status='leased', lease_owner=?, lease_expires=?, attempts=attempts+1, updated_at=? WHERE id=?",
+                (worker_id, now + visibility_timeout, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["attempts"] += 1
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def heartbeat(self, job_id, worker_id, visibility_timeout=VISIBILITY_TIMEOUT):
+        """lease 연장. lease를 잃었으면 False"""
+        cur = self._conn().execute(
+            "UPDATE jobs SET lease_expires=?, updated_at=? WHERE id=? AND status='leased' AND lease_owner=?",
+            (time.time() + visibility_timeout, time.time(), job_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job_id, worker_id, result=None):
+        cur = self._conn().execute(
+            "UPDATE jobs SET status='done', result=?, lease_owner=NULL, lease_expires=NULL, updated_at=? "
+            "WHERE id=? AND status='leased' AND lease_owner=?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id),
+        )
+        return cur.rowcount == 1
+
+    def fail(self, job_id, worker_id, error):
+        """실패 기록: 시도 횟수가 남아 있으면 backoff 후 재시도, 아니면 dead-letter"""
+        conn = self._conn()
+        row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id=? AND lease_owner=?", (job_id, worker_id)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row["attempts"] >= row["max_attempts"]:
+            status, available_at = "dead", now
+        else:
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (row["attempts"] - 1))
+            status, available_at = "queued", now + delay * random.uniform(0.8, 1.2)
+        conn.execute(
+            "UPDATE jobs SET status=?, available_at=?, last_error=?, lease_owner=NULL, lease_expires=NULL, updated_at=? WHERE id=?",
+            (status, available_at, str(error)[:2000], now, job_id),
+        )
+        return status
+
+    def requeue(self, job_id):
+        """dead-letter 작업을 시도 횟수 초기화 후 다시 대기열로 (체크포인트는 유지)"""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE jobs SET status='queued', attempts=0, available_at=?, updated_at=? WHERE id=? AND status='dead'",
+            (now, now, job_id),
+        )
+        return cur.rowcount == 1
+
+    def dead_letters(self):
+        rows = self._conn().execute("SELECT id, company, attempts, last_error, updated_at FROM jobs WHERE status='dead' ORDER BY id").fetchall()
+        return [dict(r) for r in rows]
+
+    def stats(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {r["status"]: r["n"] for r in rows}
+
+    def checkpoint(self, job_id):
+        return JobCheckpoint(self, job_id)
+
+class JobCheckpoint:
+    """summarize_company_risks/generate_report에 넘기는 단계별 체크포인트 (get/put)"""
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+
+    def get(self, stage):
+        row = self.queue._conn().execute("SELECT value FROM checkpoints WHERE job_id=? AND stage=?", (self.job_id, stage)).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def put(self, stage, value):
+        self.queue._conn().execute(
+            "INSERT OR REPLACE INTO checkpoints (job_id, stage, value, updated_at) VALUES (?, ?, ?, ?)",
+            (self.job_id, stage, json.dumps(value, ensure_ascii=False), time.time()),
+        )
+
+    def stages(self):
+        rows = self.queue._conn().execute("SELECT stage FROM checkpoints WHERE job_id=?", (self.job_id,)).fetchall()
+        return [r["stage"] for r in rows]
+
+def _run_report_job(company_name, checkpoint):
+    from run import generate_report
+    return generate_report(company_name, checkpoint=checkpoint)
+
+def run_worker(queue=None, worker_id=None, visibility_timeout=VISIBILITY_TIMEOUT, poll_interval=5, run_job=_run_report_job, once=False):
+    """
+    작업을 하나씩 lease하여 실행하는 워커 루프
+    - 실행 중에는 하트비트 스레드가 lease를 연장
+    - once=True이면 대기열이 비었을 때 종료
+    """
+    queue = queue or JobQueue()
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"[INFO] 워커 시작: {worker_id}")
+    while True:
+        job = queue.lease(worker_id, visibility_timeout)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        checkpoint = queue.checkpoint(job["id"])
+        done_stages = checkpoint.stages()
+        print(f"[INFO] 작업 {job['id']} ({job['company']}) 시작, 시도 {job['attempts']}/{job['max_attempts']}" + (f", 완료 단계: {done_stages}" if done_stages else ""))
+        stop = threading.Event()
+
+        def keep_alive(job_id=job["id"]):
+            while not stop.wait(visibility_timeout / 3):
+                if not queue.heartbeat(job_id, worker_id, visibility_timeout):
+                    print(f"[경고] 작업 {job_id}의 lease를 잃었습니다.")
+                    return
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            result = run_job(job["company"], checkpoint)
+            queue.complete(job["id"], worker_id, result)
+            print(f"[INFO] 작업 {job['id']} 완료")
+        except Exception as e:
+            status = queue.fail(job["id"], worker_id, e)
+            print(f"[ERROR] 작업 {job['id']} 실패 ({status}): {e}")
+        finally:
+            stop.set()
+            heartbeat.join()
+
+if __name__ == "__main__":
+    # 사용법:
+    #   python job_queue.py enqueue 삼성전자 LG에너지솔루션 ...
+    #   python job_queue.py worker [--once]
+    #   python job_queue.py stats | dead | requeue <job_id>
+    args = sys.argv[1:]
+    command = args[0] if args else "stats"
+    queue = JobQueue()
+    if command == "enqueue":
+        for name in args[1:]:
+            print(f"[INFO] 작업 등록: {name} (id={queue.enqueue(name)})")
+    elif command == "worker":
+        run_worker(queue, once="--once" in args)
+    elif command == "dead":
+        for job in queue.dead_letters():
+            print(f"{job['id']}\t{job['company']}\t시도 {job['attempts']}\t{job['last_error']}")
+    elif command == "requeue":
+        for job_id in args[1:]:
+            print(f"[INFO] 재등록 {'성공' if queue.requeue(int(job_id)) else '실패'}: {job_id}")
+    else:
+        print(json.dumps(queue.stats(), ensure_ascii=False))
@@ -0,0 +1,243 @@
+# [로컬 LLM 백엔드 모듈] llama.cpp(GGUF) 소형 모델을 CPU에서 실행하는 LLM 백엔드를 제공합니다.
+# 동시에 들어온 프롬프트를 짧은 시간 모아 프롬프트마다 시퀀스(seq_id)를 배정하고, llama_batch 하나로 모든 시퀀스를 함께 decode하는 배치 추론으로 생성합니다.
+# (프롬프트 prefill도 여러 시퀀스의 토큰을 한 batch에 넣고, 생성 단계는 step마다 진행 중인 시퀀스의 다음 토큰을 한 번에 계산)
+# 분류/키워드 같은 짧은 작업을 네트워크 왕복과 API 한도 없이 실행할 수 있습니다.
+# 필요 패키지(선택): pip install llama-cpp-python
+import os
+import heapq
+import threading
+
+LOCAL_LLM_CONTEXT = int(os.getenv("LLM_LOCAL_CONTEXT", "4096"))  # 배치 안의 모든 시퀀스가 나눠 쓰는 KV 캐시 토큰 수
+LOCAL_LLM_THREADS = int(os.getenv("LLM_LOCAL_THREADS", str(os.cpu_count() or 4)))
+LOCAL_LLM_MAX_BATCH = int(os.getenv("LLM_LOCAL_MAX_BATCH", "8"))  # 한 번에 함께 decode하는 최대 시퀀스 수
+LOCAL_LLM_DECODE_BATCH = 512  # llama_decode 1회에 넣는 최대 토큰 수 (긴 prefill은 나눠 decode)
+LOCAL_LLM_BATCH_WAIT = 0.02  # 첫 요청 이후 배치에 더 모을 시간(초)
+
+class _PendingCompletion:
+    def __init__(self, prompt, max_tokens, temperature):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.done = threading.Event()
+        self.result = ""
+        self.error = None
+
+class _Sequence:
+    """배치 안의 생성 1건 (KV 캐시의 seq_id 하나)"""
+    def __init__(self, seq_id, tokens, max_tokens, temperature):
+        self.seq_id = seq_id
+        self.tokens = tokens
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.output = []
+        self.done = False
+
+class LlamaCppBackend:
+    """
+    llama.cpp CPU 배치 추론 백엔드 (llm_utils.LLM_BACKENDS의 "local")
+    - 모델은 첫 호출 때 한 번만 로드하며, 추론은 전용 스레드 1개가 담당 (llama 컨텍스트는 스레드 안전하지 않음)
+    - 대기 중인 요청을 우선순위 순으로 최대 max_batch개 모아, 시퀀스별 seq_id로 한 llama_batch에 넣어 함께 decode
+    - 묶음 안의 동일 요청은 1회만 생성, KV 캐시(n_ctx)를 넘는 묶음은 여러 번에 나눠 생성
+    """
+    name = "local"
+
+    def __init__(self, model_path, n_ctx=LOCAL_LLM_CONTEXT, n_threads=LOCAL_LLM_THREADS, max_batch=LOCAL_LLM_MAX_BATCH, batch_wait=LOCAL_LLM_BATCH_WAIT):
+        self.model_path = model_path
+        self.n_ctx = n_ctx
+        self.n_threads = n_threads
+        self.max_batch = max(1, max_batch)
+        self.batch_wait = batch_wait
+        self.llm = None
+        self.ctx = None
+        self.batch = None
+        self.pending = []  # heap of (priority, seq, _PendingCompletion)
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.worker = None
+        self.stats = {"requests": 0, "batches": 0, "generated": 0, "decode_calls": 0}
+
+    def _load_model(self):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise Exception("로컬 LLM 백엔드에는 llama-cpp-python 패키지가 필요합니다. (pip install llama-cpp-python)")
+        if not os.path.exists(self.model_path):
+            raise Exception(f"로컬 LLM 모델 파일을 찾을 수 없습니다: {self.model_path}")
+        print(f"[INFO] 로컬 LLM 모델 로드: {self.model_path}")
+        # Llama 객체는 모델/토크나이저 핸들로만 사용 (생성은 _init_batch_context의 다중 시퀀스 컨텍스트에서)
+        return Llama(model_path=self.model_path, n_ctx=512, n_threads=self.n_threads, verbose=False)
+
+    def _init_batch_context(self):
+        """seq_id를 max_batch개까지 쓰는 llama 컨텍스트와 llama_batch 생성 (KV 캐시 n_ctx를 시퀀스들이 나눠 씀)"""
+        import llama_cpp
+        params = llama_cpp.llama_context_default_params()
+        params.n_ctx = self.n_ctx
+        params.n_batch = params.n_ubatch = LOCAL_LLM_DECODE_BATCH
+        params.n_seq_max = self.max_batch
+        params.n_threads = params.n_threads_batch = self.n_threads
+        params.kv_unified = True
+        self.ctx = llama_cpp.llama_init_from_model(self.llm.model, params)
+        if not self.ctx:
+            raise Exception("로컬 LLM 배치 컨텍스트 생성 실패")
+        self.batch = llama_cpp.llama_batch_init(LOCAL_LLM_DECODE_BATCH, 0, self.max_batch)
+        self.vocab = llama_cpp.llama_model_get_vocab(self.llm.model)
+        self.n_vocab = self.llm.n_vocab()
+        self.chat_template = llama_cpp.llama_model_chat_template(self.llm.model, None)
+
+    def complete(self, llm_api_key, prompt, route, priority=1):
+        # llm_api_key는 사용하지 않음 (OpenAIBackend와 같은 인터페이스 유지)
+        item = _PendingCompletion(prompt, route["max_tokens"], route["temperature"])
+        with self.cond:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, daemon=True, name="llm-local")
+                self.worker.start()
+            self.seq += 1
+            heapq.heappush(self.pending, (priority, self.seq, item))
+            self.stats["requests"] += 1
+            self.cond.notify_all()
+        item.done.wait()
+        if item.error is not None:
+            print(f"[LLM LOCAL ERROR] {item.error}")
+            return ""
+        return item.result
+
+    def metrics(self):
+        with self.cond:
+            batches = self.stats["batches"]
+            return dict(self.stats, queue_depth=len(self.pending), avg_batch=round(self.stats["requests"] / batches, 2) if batches else 0.0)
+
+    def _next_batch(self):
+        import time
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            # 첫 요청 이후 batch_wait 동안 동시 요청을 더 모음
+            deadline = time.time() + self.batch_wait
+            while len(self.pending) < self.max_batch:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            batch = [heapq.heappop(self.pending)[2] for _ in range(min(self.max_batch, len(self.pending)))]
+            self.stats["batches"] += 1
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                if self.llm is None:
+                    self.llm = self._load_model()
+                    self._init_batch_context()
+                self._generate_group(batch)
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            for item in batch:
+                item.done.set()
+
+    def _generate_group(self, batch):
+        """모은 요청을 중복 제거 후, KV 캐시에 들어가는 만큼씩 묶어 배치 추론"""
+        groups = {}
+        for item in batch:
+            groups.setdefault((item.prompt, item.max_tokens, item.temperature), []).append(item)
+        rounds, current, used = [], [], 0
+        for (prompt, max_tokens, temperature), items in groups.items():
+            tokens = self._tokenize_chat(prompt)
+            need = len(tokens) + max_tokens
+            if need > self.n_ctx:
+                for item in items:
+                    item.error = Exception(f"프롬프트가 로컬 LLM 컨텍스트보다 깁니다 ({len(tokens)}+{max_tokens} > {self.n_ctx} 토큰)")
+                continue
+            if current and used + need > self.n_ctx:
+                rounds.append(current)
+                current, used = [], 0
+            current.append((_Sequence(len(current), tokens, max_tokens, temperature), items))
+            used += need
+        if current:
+            rounds.append(current)
+        for entries in rounds:
+            self._decode_round([seq for seq, _ in entries])
+            self.stats["generated"] += len(entries)
+            for seq, items in entries:
+                content = self.llm.detokenize(seq.output).decode("utf-8", errors="ignore").strip()
+                for item in items:
+                    item.result = content
+
+    def _tokenize_chat(self, prompt):
+        """모델 채팅 템플릿(user 메시지 1개 + assistant 시작)을 적용해 토큰화 (템플릿이 없거나 지원하지 않으면 원문)"""
+        import ctypes
+        import llama_cpp
+        text = prompt
+        if self.chat_template:
+            content = prompt.encode("utf-8")
+            messages = (llama_cpp.llama_chat_message * 1)(llama_cpp.llama_chat_message(b"user", content))
+            size = len(content) * 2 + 256
+            buf = ctypes.create_string_buffer(size)
+            n = llama_cpp.llama_chat_apply_template(self.chat_template, messages, 1, True, buf, size)
+            if n > size:
+                buf = ctypes.create_string_buffer(n)
+                n = llama_cpp.llama_chat_apply_template(self.chat_template, messages, 1, True, buf, n)
+            if n >= 0:
+                text = buf.raw[:n].decode("utf-8", errors="ignore")
+        tokens = self.llm.tokenize(text.encode("utf-8"), add_bos=True, special=True)
+        # 템플릿에 BOS 문자열이 포함된 모델은 BOS가 두 번 붙으므로 하나만 남김
+        if len(tokens) > 1 and tokens[0] == tokens[1] == self.llm.token_bos():
+            tokens = tokens[1:]
+        return tokens
+
+    def _decode_round(self, seqs):
+        """seqs를 각자의 seq_id로 함께 decode: 프롬프트 prefill 후 step마다 진행 중인 시퀀스의 다음 토큰을 한 번에 계산"""
+        import llama_cpp
+        llama_cpp.llama_memory_clear(llama_cpp.llama_get_memory(self.ctx), True)
+        # prefill: 모든 시퀀스의 프롬프트 토큰을 LOCAL_LLM_DECODE_BATCH개씩 묶어 decode (각 시퀀스 마지막 토큰에서 첫 토큰 샘플)
+        prompt_tokens = [(seq, pos, token, pos == len(seq.tokens) - 1) for seq in seqs for pos, token in enumerate(seq.tokens)]
+        for start in range(0, len(prompt_tokens), LOCAL_LLM_DECODE_BATCH):
+            for seq, index in self._decode(prompt_tokens[start:start + LOCAL_LLM_DECODE_BATCH]):
+                self._accept(seq, self._sample(index, seq.temperature))
+        # 생성: 진행 중인 시퀀스마다 직전 토큰 1개씩 한 batch로 decode
+        while True:
+            active = [seq for seq in seqs if not seq.done]
+            if not active:
+                break
+            for seq, index in self._decode([(seq, len(seq.tokens) + len(seq.output) - 1, seq.output[-1], True) for seq in active]):
+                self._accept(seq, self._sample(index, seq.temperature))
+
+    def _decode(self, entries):
+        """entries: [(시퀀스, 위치, 토큰, logits 필요 여부)] → logits를 계산한 [(시퀀스, batch 내 index)]"""
+        import llama_cpp
+        batch = self.batch
+        batch.n_tokens = len(entries)
+        outputs = []
+        for i, (seq, pos, token, logits) in enumerate(entries):
+            batch.token[i] = token
+            batch.pos[i] = pos
+            batch.n_seq_id[i] = 1
+            batch.seq_id[i][0] = seq.seq_id
+            batch.logits[i] = logits
+            if logits:
+                outputs.append((seq, i))
+        code = llama_cpp.llama_decode(self.ctx, batch)
+        if code != 0:
+            raise Exception(f"llama_decode 실패 (code={code})")
+        self.stats["decode_calls"] += 1
+        return outputs
+
+    def _sample(self, index, temperature):
+        """batch index의 logits에서 다음 토큰 선택 (temperature 0이면 greedy)"""
+        import numpy as np
+        import llama_cpp
+        logits = np.ctypeslib.as_array(llama_cpp.llama_get_logits_ith(self.ctx, index), shape=(self.n_vocab,)).astype(np.float64)
+        if not temperature or temperature <= 0:
+            return int(np.argmax(logits))
+        probs = np.exp((logits - logits.max()) / temperature)
+        return int(np.random.choice(self.n_vocab, p=probs / probs.sum()))
+
+    def _accept(self, seq, token):
+        import llama_cpp
+        if llama_cpp.llama_vocab_is_eog(self.vocab, token):
+            seq.done = True
+            return
+        seq.output.append(token)
+        if len(seq.output) >= seq.max_tokens:
+            seq.done = True
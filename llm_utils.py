@@ -1,52 +1,349 @@
 # LLM 연동 및 텍스트 요약/분석 유틸리티
-import requests
 import os
+import threading
+from collections import OrderedDict
+from http_utils import http_post
+from deadline import bind_deadline, DeadlineExceeded, remaining
 from dotenv import load_dotenv
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# 동일 프롬프트 응답 메모리 캐시 (프로세스가 살아있는 동안 재사용, LRU)
+LLM_RESPONSE_CACHE_SIZE = 2048
+_llm_response_cache = OrderedDict()
+_llm_cache_lock = threading.Lock()
+
+# LLM 호출 우선순위 (숫자가 작을수록 먼저 실행)
+PRIORITY_HIGH = 0      # 최종 통합분석/재무비율 해설 등 사용자 대기 작업
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2      # 뉴스/공시 chunk 대량 요약
+
+# chunk 요약 LLM 호출이 실패(빈 응답)했을 때 넣는 표시 문구 (리포트 체크포인트에 저장하지 않는 기준)
+LLM_EMPTY_SUMMARY = '(LLM 요약 결과 없음)'
+
+LLM_MIN_CONCURRENCY = 1
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = 3
+
+# OpenAI 호환 API 주소 (로컬 대체 서버/프록시로 바꿀 때 환경변수로 지정)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gpt-4o-mini")        # 짧은 분류/추출용 (빠르고 저렴)
+LLM_DEFAULT_MODEL = os.getenv("LLM_DEFAULT_MODEL", "gpt-3.5-turbo")  # 요약/분석용
+
+# 작업 유형별 모델/최대 토큰/temperature 라우팅 표
+# - 한 단어 분류, 콤마 구분 키워드처럼 출력이 짧은 작업은 빠른 모델 + 작은 max_tokens
+# - 요약/분석처럼 문장 출력이 필요한 작업만 큰 max_tokens
+LLM_ROUTES = {
+    "classify":      {"model": LLM_FAST_MODEL,    "max_tokens": 10,   "temperature": 0.0},  # 카테고리 1개 분류
+    "industry":      {"model": LLM_FAST_MODEL,    "max_tokens": 40,   "temperature": 0.3},  # 산업명 1~4개 추정
+    "keywords":      {"model": LLM_FAST_MODEL,    "max_tokens": 60,   "temperature": 0.3},  # 콤마 구분 키워드
+    "kam_match":     {"model": LLM_FAST_MODEL,    "max_tokens": 150,  "temperature": 0.3},  # 핵심감사사항 연관성 판단
+    "summary":       {"model": LLM_DEFAULT_MODEL, "max_tokens": 300,  "temperature": 0.8},  # 2~3문장 요약
+    "industry_risk": {"model": LLM_DEFAULT_MODEL, "max_tokens": 700,  "temperature": 0.2},  # 산업 회계리스크 4~5개
+    "analysis":      {"model": LLM_DEFAULT_MODEL, "max_tokens": 800,  "temperature": 0.7},  # 재무비율/통합 분석
+    "default":       {"model": LLM_DEFAULT_MODEL, "max_tokens": 1024, "temperature": 0.8},
+}
+
+# LLM 백엔드 선택
+# - LLM_BACKEND=local: 모든 작업을 로컬 CPU 모델로 실행 (오프라인 테스트/벤치마크)
+# - LLM_LOCAL_MODEL_PATH가 있으면 LLM_LOCAL_TASKS의 짧은 작업만 로컬 모델로 실행
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_LOCAL_MODEL_PATH = os.getenv("LLM_LOCAL_MODEL_PATH")
+LLM_LOCAL_TASKS = [t.strip() for t in os.getenv("LLM_LOCAL_TASKS", "classify,industry,keywords").split(",") if t.strip()]
+if LLM_BACKEND == "local" and not LLM_LOCAL_MODEL_PATH:
+    # 모델 경로 없이 로컬 백엔드를 지정하면 호출마다 실패하므로 시작 시 알리고 OpenAI로 실행
+    print("[경고] LLM_BACKEND=local에는 LLM_LOCAL_MODEL_PATH(GGUF 모델 경로)가 필요합니다. OpenAI 백엔드로 실행합니다.")
+    LLM_BACKEND = "openai"
+
+def resolve_llm_route(task="default", temperature=None):
+    """작업 유형의 라우팅 설정 반환 (temperature를 직접 지정하면 표 값 대신 사용)"""
+    route = dict(LLM_ROUTES.get(task) or LLM_ROUTES["default"])
+    if temperature is not None:
+        route["temperature"] = temperature
+    if "backend" not in route:
+        if LLM_BACKEND != "openai":
+            route["backend"] = LLM_BACKEND
+        elif LLM_LOCAL_MODEL_PATH and task in LLM_LOCAL_TASKS:
+            route["backend"] = "local"
+        else:
+            route["backend"] = "openai"
+    if route["backend"] == "local" and not LLM_LOCAL_MODEL_PATH:
+        # LLM_ROUTES에서 직접 local을 지정했지만 모델 경로가 없으면 OpenAI로 실행
+        route["backend"] = "openai"
+    if route["backend"] == "local":
+        route["model"] = os.path.basename(LLM_LOCAL_MODEL_PATH or "local")
+    return route
+
+def _parse_reset_seconds(value):
+    """OpenAI x-ratelimit-reset-* 헤더('1s', '6m0s', '20ms') 또는 Retry-After(초)를 초 단위로 변환"""
+    import re
+    if not value:
+        return 0.0
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(num) * units[unit] for num, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value))
+
+class LLMDispatcher:
+    """
+    프로세스 공용 LLM 호출 제어기
+    - AIMD: 성공 시 동시 실행 한도를 조금씩 늘리고, 429 응답 시 절반으로 줄임
+    - OpenAI rate-limit 헤더의 남은 요청 수가 바닥나면 reset 시각까지 신규 호출을 멈춤
+    - 우선순위 대기열: 한도가 비면 우선순위가 높은(숫자가 작은) 호출부터 실행
+    """
+    def __init__(self, initial=LLM_INITIAL_CONCURRENCY, minimum=LLM_MIN_CONCURRENCY, maximum=LLM_MAX_CONCURRENCY):
+        import heapq
+        self._heapq = heapq
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.waiting = []  # heap of (priority, seq)
+        self.seq = 0
+        self.cond = threading.Condition()
+        self.stats = {"calls": 0, "rate_limited": 0, "errors": 0, "wait_seconds": 0.0}
+
+    def acquire(self, priority=PRIORITY_NORMAL):
+        """실행 순서가 올 때까지 대기 (리포트 마감이 지나면 대기열에서 빠지고 DeadlineExceeded)"""
+        import time
+        start = time.time()
+        with self.cond:
+            self.seq += 1
+            ticket = (priority, self.seq)
+            self._heapq.heappush(self.waiting, ticket)
+            while True:
+                now = time.time()
+                if self.waiting[0] == ticket and self.in_flight < int(self.limit) and now >= self.paused_until:
+                    break
+                left = remaining()
+                if left is not None and left <= 0:
+                    self.waiting.remove(ticket)
+                    self._heapq.heapify(self.waiting)
+                    self.cond.notify_all()
+                    raise DeadlineExceeded("리포트 마감 시간 초과로 LLM 호출 대기 중단")
+                timeout = self.paused_until - now if now < self.paused_until else None
+                if left is not None:
+                    timeout = left if timeout is None else min(timeout, left)
+                self.cond.wait(timeout)
+            self._heapq.heappop(self.waiting)
+            self.in_flight += 1
+            self.stats["wait_seconds"] += time.time() - start
+            self.cond.notify_all()
+
+    def release(self, status=None, headers=None, shared_quota=True):
+        """
+        호출 결과 반영: status(HTTP 상태 코드), headers(응답 헤더)
+        shared_quota=False(여러 키를 나눠 쓰는 경우): 429에도 AIMD로 동시 실행 한도는 줄이되, 전체 호출을 멈추지는 않음
+        (해당 키만 해제 시각까지 제외, credentials)
+        """
+        import time
+        now = time.time()
+        with self.cond:
+            self.in_flight -= 1
+            self.stats["calls"] += 1
+            if status == 429:
+                self.stats["rate_limited"] += 1
+                # 같은 혼잡 구간에서 연속된 429로 한도가 과도하게 줄지 않도록 1초에 한 번만 감소
+                if now - self.last_decrease > 1.0:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_decrease = now
+                if not shared_quota:
+                    self.cond.notify_all()
+                    return
+                retry_after = _parse_reset_seconds((headers or {}).get("retry-after") or (headers or {}).get("x-ratelimit-reset-requests"))
+                self.paused_until = max(self.paused_until, now + max(retry_after, 1.0))
+            elif status == 200:
+                self.limit = min(self.maximum, self.limit + 1.0 / max(self.limit, 1.0))
+                remaining = (headers or {}).get("x-ratelimit-remaining-requests")
+                if shared_quota and remaining is not None and remaining.isdigit() and int(remaining) <= self.in_flight:
+                    reset = _parse_reset_seconds(headers.get("x-ratelimit-reset-requests"))
+                    self.paused_until = max(self.paused_until, now + reset)
+            else:
+                self.stats["errors"] += 1
+            self.cond.notify_all()
+
+    def metrics(self):
+        with self.cond:
+            depth = {}
+            for priority, _ in self.waiting:
+                depth[priority] = depth.get(priority, 0) + 1
+            return dict(self.stats, limit=round(self.limit, 2), in_flight=self.in_flight, queue_depth=len(self.waiting), queue_depth_by_priority=depth)
+
+llm_dispatcher = LLMDispatcher()
+
+# chunk 요약 등 병렬 호출에 공용으로 쓰는 스레드 풀 (실제 동시 실행 수는 llm_dispatcher가 제어)
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+def _get_llm_executor():
+    global _llm_executor
+    import concurrent.futures
+    with _llm_executor_lock:
+        if _llm_executor is None:
+            _llm_executor = concurrent.futures.ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY * 2, thread_name_prefix="llm")
+        return _llm_executor
+
 def extract_risk_related_chunks(chunk_summaries, risk_keywords, max_count=10):
-    # chunk 요약에서 리스크 관련 chunk 우선 추출
-    def contains_risk(chunk):
-        chunk_l = chunk.lower()
-        return any(kw.lower() in chunk_l for kw in risk_keywords if kw.strip())
-    # 1. Select all risk-related chunks (no duplicates, preserve order)
-    risk_chunks = [c for c in chunk_summaries if contains_risk(c)]
+    # chunk 요약에서 리스크 관련 chunk 우선 추출 (BM25 점수 기준, 원래 순서 유지)
+    from retrieval import LexicalIndex
+    query = " ".join(kw for kw in risk_keywords if kw.strip())
+    index = LexicalIndex(chunk_summaries)
+    # 1. Select top risk-related chunks by BM25 score (no duplicates, preserve order)
+    risk_ids = sorted(i for i, _ in index.search(query, top_k=max_count))
+    selected = [chunk_summaries[i] for i in risk_ids]
     # 2. Fill up to max_count with non-risk chunks (preserve order, skip if already included)
-    rest_chunks = [c for c in chunk_summaries if c not in risk_chunks]
-    selected = risk_chunks[:max_count]
-    for c in rest_chunks:
+    for i, c in enumerate(chunk_summaries):
         if len(selected) >= max_count:
             break
-        selected.append(c)
+        if i not in risk_ids:
+            selected.append(c)
     return selected
 
-def query_llm(llm_api_key, prompt, temperature=0.8):
-    # OpenAI LLM 호출 (정상 동작 버전)
-    import requests
-    url = "https://api.openai.com/v1/chat/completions"
+def build_openai_request(llm_api_key, prompt, route):
+    """/chat/completions 요청 (url, headers, payload) (동기/비동기 공용)"""
+    url = f"{OPENAI_BASE_URL}/chat/completions"
     headers = {
         "Authorization": f"Bearer {llm_api_key}",
         "Content-Type": "application/json"
     }
     payload = {
-        "model": "gpt-3.5-turbo",
+        "model": route["model"],
         "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 1024,
-        "temperature": temperature
+        "max_tokens": route["max_tokens"],
+        "temperature": route["temperature"]
     }
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
-        if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
-        else:
+    return url, headers, payload
+
+def openai_key_outcome(status, headers):
+    """OpenAI 응답 → 키 풀 (report 결과, 제외 시간(초)). 200이어도 남은 요청 수가 0이면 reset까지 해당 키 제외"""
+    headers = headers or {}
+    if status == 429:
+        return "quota", _parse_reset_seconds(headers.get("retry-after") or headers.get("x-ratelimit-reset-requests")) or None
+    if status == 401:
+        return "auth", None
+    if status == 200:
+        if headers.get("x-ratelimit-remaining-requests") == "0":
+            return "exhausted", _parse_reset_seconds(headers.get("x-ratelimit-reset-requests")) or None
+        return "ok", None
+    return "error", None
+
+class OpenAIBackend:
+    """OpenAI 호환 /chat/completions HTTP 백엔드 (llm_dispatcher로 동시 실행 수/우선순위/429 제어)"""
+    name = "openai"
+
+    def complete(self, llm_api_key, prompt, route, priority=PRIORITY_NORMAL):
+        from credentials import resolve_pool, CredentialsExhausted
+        pool = resolve_pool("openai", llm_api_key)
+        # 429/인증 오류는 다른 키로 곧바로 재시도할 수 있으므로 키 수만큼 재시도 횟수를 늘림
+        max_attempts = LLM_MAX_RETRIES + max(1, len(pool))
+        for attempt in range(max_attempts):
+            try:
+                credential = pool.acquire_wait()
+            except CredentialsExhausted as e:
+                print(f"[LLM API ERROR] {e}")
+                return ""
+            url, headers, payload = build_openai_request(credential.secret, prompt, route)
+            llm_dispatcher.acquire(priority)
+            status, response_headers = None, None
+            try:
+                response = http_post(url, headers=headers, json=payload, timeout=30)
+                status, response_headers = response.status_code, {k.lower(): v for k, v in response.headers.items()}
+            except DeadlineExceeded:
+                # query_llm에서 처리 (같은 프롬프트를 기다리던 다른 리포트는 자신의 마감으로 다시 호출)
+                pool.report(credential, "error")
+                raise
+            except Exception as e:
+                print(f"[LLM API EXCEPTION] {e}")
+                pool.report(credential, "error")
+                return ""
+            finally:
+                llm_dispatcher.release(status, response_headers, shared_quota=len(pool) <= 1)
+            outcome, retry_after = openai_key_outcome(status, response_headers)
+            pool.report(credential, outcome, retry_after)
+            if response.status_code == 200:
+                try:
+                    return response.json()["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError, ValueError) as e:
+                    print(f"[LLM API EXCEPTION] 응답 파싱 실패: {e}, body={response.text[:200]}")
+                    return ""
+            if outcome in ("quota", "auth") and attempt < max_attempts - 1:
+                # 키 1개면 dispatcher가 reset 시각까지 대기시키고, 여러 개면 다른 키로 곧바로 재시도
+                continue
             print(f"[LLM API ERROR] status={response.status_code}, body={response.text[:200]}")
             return ""
-    except Exception as e:
-        print(f"[LLM API EXCEPTION] {e}")
         return ""
 
+# 백엔드 이름 → 인스턴스 (complete(llm_api_key, prompt, route, priority) -> str 를 제공하는 객체)
+LLM_BACKENDS = {"openai": OpenAIBackend()}
+_llm_backend_lock = threading.Lock()
+
+def register_llm_backend(name, backend):
+    with _llm_backend_lock:
+        LLM_BACKENDS[name] = backend
+
+def get_llm_backend(name):
+    with _llm_backend_lock:
+        if name not in LLM_BACKENDS and name == "local":
+            from llm_local import LlamaCppBackend
+            if not LLM_LOCAL_MODEL_PATH:
+                raise Exception("로컬 LLM 백엔드를 쓰려면 LLM_LOCAL_MODEL_PATH에 GGUF 모델 경로를 지정해야 합니다.")
+            LLM_BACKENDS["local"] = LlamaCppBackend(LLM_LOCAL_MODEL_PATH)
+        if name not in LLM_BACKENDS:
+            raise Exception(f"알 수 없는 LLM 백엔드: {name}")
+        return LLM_BACKENDS[name]
+
+def query_llm(llm_api_key, prompt, temperature=None, priority=PRIORITY_NORMAL, task="default"):
+    # LLM 호출 (task로 LLM_ROUTES의 백엔드/모델/max_tokens/temperature 선택)
+    route = resolve_llm_route(task, temperature)
+    cache_key = llm_cache_key(route, prompt)
+    cached = llm_cache_get(cache_key)
+    if cached is not None:
+        return cached
+    from singleflight import llm_flight
+
+    def complete():
+        content = get_llm_backend(route["backend"]).complete(llm_api_key, prompt, route, priority)
+        llm_cache_put(cache_key, content)
+        return content
+
+    # 캐시가 비어 있을 때 같은 키 풀로 같은 프롬프트를 동시에 요청하면 LLM 호출 1회의 결과를 공유
+    try:
+        return llm_flight.do((llm_flight_scope(llm_api_key, route), cache_key), complete)
+    except DeadlineExceeded as e:
+        print(f"[LLM API ERROR] {e}")
+        return ""
+
+def llm_flight_scope(llm_api_key, route):
+    """요청 병합 key에 넣는 키 풀 식별값 (다른 키의 호출끼리는 인증/한도 오류를 공유하지 않도록, 로컬 백엔드는 None)"""
+    if route["backend"] != "openai":
+        return None
+    from credentials import resolve_pool
+    return resolve_pool("openai", llm_api_key).identity
+
+def llm_cache_key(route, prompt):
+    return (route["backend"], route["model"], route["max_tokens"], route["temperature"], prompt)
+
+def llm_cache_get(cache_key):
+    with _llm_cache_lock:
+        if cache_key in _llm_response_cache:
+            _llm_response_cache.move_to_end(cache_key)
+            return _llm_response_cache[cache_key]
+    return None
+
+def llm_cache_put(cache_key, content):
+    if not content:
+        return
+    with _llm_cache_lock:
+        _llm_response_cache[cache_key] = content
+        if len(_llm_response_cache) > LLM_RESPONSE_CACHE_SIZE:
+            _llm_response_cache.popitem(last=False)
+
 def extract_risk_keywords_llm(disclosures, llm_api=None):
     # 공시에서 리스크 키워드 추출
     disclosure_texts = '\n'.join([
@@ -58,12 +355,12 @@ def extract_risk_keywords_llm(disclosures, llm_api=None):
     prompt_keywords = f"""
     아래는 최근 공시 내용입니다. 리스크 관련 키워드를 5개 이내로 추출해줘.\n[공시 텍스트]\n{disclosure_texts[:2000]}
     """
-    risk_keywords_str = query_llm(llm_api, prompt_keywords, temperature=0.7)
+    risk_keywords_str = query_llm(llm_api, prompt_keywords, task="keywords")
     risk_keywords = [kw.strip() for kw in risk_keywords_str.split(',') if kw.strip()]
     prompt_summary = f"""
     아래는 최근 공시 내용입니다. 위에서 추출한 리스크 키워드별로 실제 언급된 부분을 중심으로 요약해줘.\n키워드별로 소제목을 붙여서 정리해줘.\n\n[키워드]\n{', '.join(risk_keywords)}\n[공시 텍스트]\n{disclosure_texts[:2000]}
     """
-    summary = query_llm(llm_api, prompt_summary, temperature=0.8)
+    summary = query_llm(llm_api, prompt_summary, task="summary")
     return risk_keywords, summary
 
 def extract_risk_keywords_from_disclosures(disclosures, keywords=None):
@@ -80,20 +377,22 @@ def extract_risk_keywords_from_disclosures(disclosures, keywords=None):
         return "No risk-related keywords found in recent disclosures."
     return '\n'.join(report)
 
-def summarize_texts_in_chunks(texts, llm_api_key, chunk_size=5, max_chunk_chars=1500):
-    # 여러 텍스트를 chunk별 병렬 LLM 요약
-    import concurrent.futures
+def summarize_texts_in_chunks(texts, llm_api_key, chunk_size=5, max_chunk_chars=1500, priority=PRIORITY_BULK):
+    # 여러 텍스트를 chunk별 병렬 LLM 요약 (공용 스레드 풀 + llm_dispatcher 동시성 제어)
     def summarize_chunk(chunk):
-        joined_chunk = "\n".join(chunk)
-        if len(joined_chunk) > max_chunk_chars:
-            joined_chunk = joined_chunk[:max_chunk_chars]
-        prompt = f"아래 텍스트들을 2~3문장으로 요약해줘:\n{joined_chunk}"
-        summary = query_llm(llm_api_key, prompt, temperature=0.8)
-        return summary.strip() if summary.strip() else '(LLM 요약 결과 없음)'
-
-    summarized = []
-    chunks = [texts[i:i+chunk_size] for i in range(0, len(texts), chunk_size)]
-    with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(chunks))) as executor:
-        results = list(executor.map(summarize_chunk, chunks))
-    summarized.extend(results)
-    return summarized
+        summary = query_llm(llm_api_key, chunk_summary_prompt(chunk, max_chunk_chars), priority=priority, task="summary")
+        return summary.strip() if summary.strip() else LLM_EMPTY_SUMMARY
+
+    chunks = split_chunks(texts, chunk_size)
+    if not chunks:
+        return []
+    return list(_get_llm_executor().map(bind_deadline(summarize_chunk), chunks))
+
+def split_chunks(texts, chunk_size):
+    return [texts[i:i+chunk_size] for i in range(0, len(texts), max(1, chunk_size))]
+
+def chunk_summary_prompt(chunk, max_chunk_chars=1500):
+    joined_chunk = "\n".join(chunk)
+    if len(joined_chunk) > max_chunk_chars:
+        joined_chunk = joined_chunk[:max_chunk_chars]
+    return f"아래 텍스트들을 2~3문장으로 요약해줘:\n{joined_chunk}"
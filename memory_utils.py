@@ -0,0 +1,113 @@
+# [메모리 계측 모듈] tracemalloc으로 리포트 단계별/회사별 최대(peak)·잔존(retained) 메모리를 측정하고 메모리 예산을 검사합니다.
+import os
+import contextvars
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+MB = 1024 * 1024
+# 예산(MB, 0이면 미사용)과 초과 시 동작(warn: 경고 출력, fail: 예외)
+MEMORY_COMPANY_BUDGET_MB = float(os.getenv("MEMORY_COMPANY_BUDGET_MB", "0"))
+MEMORY_STAGE_BUDGET_MB = float(os.getenv("MEMORY_STAGE_BUDGET_MB", "0"))
+MEMORY_BUDGET_MODE = os.getenv("MEMORY_BUDGET_MODE", "warn")
+
+_active_tracker = contextvars.ContextVar("memory_tracker", default=None)
+
+class MemoryBudgetExceeded(Exception):
+    """메모리 예산 초과 (MEMORY_BUDGET_MODE=fail)"""
+
+def current_rss_mb():
+    """현재 프로세스 RSS(MB). 측정할 수 없는 환경이면 None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # Linux: KB, macOS: bytes (최대값)
+        return peak / MB if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return None
+
+class MemoryTracker:
+    """
+    회사 1곳 처리 동안 단계별 메모리 기록
+    - peak_mb: 단계 실행 중 시작 시점 대비 최대 증가량
+    - retained_mb: 단계 종료 후에도 남아 있는 증가량 (결과 객체 + 누수)
+    중첩 단계도 지원 (내부 단계의 peak는 바깥 단계 peak에 반영)
+    tracemalloc은 프로세스 전역이므로 회사를 하나씩 처리하는 배치에서 사용합니다.
+    """
+    def __init__(self, label, company_budget_mb=MEMORY_COMPANY_BUDGET_MB, stage_budget_mb=MEMORY_STAGE_BUDGET_MB, mode=MEMORY_BUDGET_MODE):
+        self.label = label
+        self.company_budget_mb = company_budget_mb
+        self.stage_budget_mb = stage_budget_mb
+        self.mode = mode
+        self.stages = []
+        self.total = None
+        self._stack = []
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name):
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        entry = {"start": current, "peak": current}
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            current_after, peak = tracemalloc.get_traced_memory()
+            entry["peak"] = max(entry["peak"], peak)
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], entry["peak"])
+            record = {
+                "stage": name,
+                "peak_mb": round((entry["peak"] - entry["start"]) / MB, 2),
+                "retained_mb": round((current_after - entry["start"]) / MB, 2),
+            }
+            if self._stack:
+                self.stages.append(record)
+            else:
+                self.total = record
+        budget = self.stage_budget_mb if self._stack else self.company_budget_mb
+        self._check_budget(record, budget)
+
+    def _check_budget(self, record, budget_mb):
+        if not budget_mb or record["peak_mb"] <= budget_mb:
+            return
+        message = f"메모리 예산 초과: {self.label}/{record['stage']} peak {record['peak_mb']:.1f}MB > {budget_mb:.0f}MB"
+        if self.mode == "fail":
+            raise MemoryBudgetExceeded(message)
+        print(f"[경고] {message}")
+
+    @contextmanager
+    def track(self):
+        """회사 전체를 하나의 바깥 단계로 측정하고, 그 안의 run_stage 호출을 단계별로 기록"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        token = _active_tracker.set(self)
+        try:
+            with self.stage("total"):
+                yield self
+        finally:
+            _active_tracker.reset(token)
+            if self._started_tracing:
+                tracemalloc.stop()
+
+    def report(self):
+        lines = [f"[MEMORY] {self.label}: peak {self.total['peak_mb']:.1f}MB, retained {self.total['retained_mb']:.1f}MB" if self.total else f"[MEMORY] {self.label}"]
+        for record in self.stages:
+            lines.append(f"  - {record['stage']:<20} peak {record['peak_mb']:8.2f}MB  retained {record['retained_mb']:8.2f}MB")
+        return "\n".join(lines)
+
+def track_stage(name):
+    """활성 MemoryTracker가 있으면 단계 측정 컨텍스트, 없으면 아무 것도 하지 않음 (run_stage에서 사용)"""
+    tracker = _active_tracker.get()
+    return tracker.stage(name) if tracker is not None else nullcontext()
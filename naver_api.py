@@ -1,33 +1,178 @@
 # [네이버 API 모듈] 네이버 오픈API(뉴스, 백과) 연동 기능을 담당합니다.
-import requests
+from http_utils import http_get
+from deadline import hedged_call, bind_deadline
 import os
+import datetime
+from dataclasses import dataclass
+import concurrent.futures
+from email.utils import parsedate_to_datetime
 from dotenv import load_dotenv
+from utils import clean_news_text
 
 load_dotenv()
-# run.py에서 직접 입력한 키를 import해서 사용합니다.
-def get_news_from_naver(company_name, since_date, max_news=10, max_length=600, return_count=False, naver_client_id=None, naver_client_secret=None):
+
+NAVER_NEWS_URL = "https://openapi.naver.com/v1/search/news.json"
+NAVER_NEWS_MAX_DISPLAY = 100  # 1회 호출당 최대 건수
+NAVER_NEWS_MAX_START = 1000   # start 파라미터 최대값
+
+@dataclass(slots=True, frozen=True)
+class NewsItem:
+    """정제된 뉴스 기사 1건 (title/description은 clean_news_text 적용, pub_date는 KST 기준 datetime 또는 None)"""
+    link: str
+    pub_date: datetime.datetime
+    title: str
+    description: str
+
+    @property
+    def text(self):
+        """제목 + 요약 본문"""
+        return f"{self.title} {self.description}".strip()
+
+def parse_since_date(since_date):
+    """'YYYYMMDD' 문자열을 KST 기준 datetime으로 변환 (실패 시 None)"""
+    try:
+        date = datetime.datetime.strptime(str(since_date), '%Y%m%d')
+    except (TypeError, ValueError):
+        return None
+    return date.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=9)))
+
+def parse_pub_date(pub_date):
+    """네이버 뉴스 pubDate(RFC 822)를 datetime으로 변환 (실패 시 None)"""
+    try:
+        published = parsedate_to_datetime(pub_date)
+    except (TypeError, ValueError):
+        return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=datetime.timezone(datetime.timedelta(hours=9)))
+    return published
+
+def naver_key_outcome(status_code):
+    """HTTP 상태 → 키 풀 report 결과 (429: 호출 한도 초과, 401/403: 인증 오류)"""
+    if status_code == 429:
+        return "quota"
+    if status_code in (401, 403):
+        return "auth"
+    return "ok" if status_code == 200 else "error"
+
+def naver_get(credentials, url, params, timeout=10):
+    """
+    키 풀에서 client id/secret을 골라 GET (한도 초과/인증 오류면 다른 키로 다시 호출, 키마다 최대 1회)
+    동시에 들어온 같은 키 풀의 같은 검색(url+파라미터)은 호출 1회로 합쳐 같은 응답 내용을 공유 (호출자마다 새 Response 객체를 받음)
+    """
+    from singleflight import naver_flight, request_key
+    from http_utils import response_snapshot, response_from_snapshot
+    snapshot = naver_flight.do(request_key(url, params, credentials.identity), lambda: response_snapshot(_naver_get(credentials, url, params, timeout)))
+    return response_from_snapshot(snapshot)
+
+def _naver_get(credentials, url, params, timeout):
+    for attempt in range(max(1, len(credentials))):
+        credential = credentials.acquire()
+        headers = naver_request_headers(credential)
+        # 읽기 전용 검색: 엔드포인트 p95보다 늦으면 같은 요청을 한 번 더 보내 먼저 온 응답 사용 (중복 요청도 키 사용량에 반영)
+        response = hedged_call(url, lambda: http_get(url, headers=headers, params=params, timeout=timeout), discard=lambda r: r.close(),
+                               on_hedge=lambda: credentials.count_extra(credential))
+        outcome = naver_key_outcome(response.status_code)
+        retry_after = response.headers.get("Retry-After")
+        credentials.report(credential, outcome, float(retry_after) if retry_after and retry_after.isdigit() else None)
+        if outcome not in ("quota", "auth"):
+            break
+    return response
+
+def _fetch_news_page(credentials, company_name, start, display):
+    params = {"query": company_name, "sort": "date", "display": display, "start": start}
+    response = naver_get(credentials, NAVER_NEWS_URL, params, timeout=10)
+    response.encoding = 'utf-8'  # 인코딩 명시
+    if response.status_code != 200:
+        print("네이버 뉴스 API 호출 실패", response.status_code)
+        return None
+    try:
+        return response.json().get('items', [])
+    except Exception as e:
+        print('response.text:', response.text[:500])
+        print('JSON decode error:', e)
+        return None
+
+def iter_news_from_naver(company_name, since_date, max_news=None, naver_client_id=None, naver_client_secret=None, concurrency=3, max_calls=10, naver_pool=None):
+    """
+    since_date 이후 뉴스를 최신순으로 정제하여 하나씩 반환하는 generator
+    - start 오프셋을 API 최대값까지 페이지 단위로 넘기며, concurrency개 페이지씩 병렬 호출
+    - pubDate가 since_date 이전인 기사가 나오면 즉시 중단 (불필요한 호출 방지)
+    - 반환 항목: NewsItem
+    - naver_pool: 네이버 키 풀(CredentialPool), 주면 naver_client_id/secret 대신 사용
+    """
+    credentials = naver_credentials(naver_client_id, naver_client_secret, naver_pool)
+    waves, display = plan_news_pages(max_news, concurrency, max_calls)
+    concurrency = max(1, concurrency)
+    stream = NewsPageStream(since_date, max_news, display)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for wave in waves:
+            pages = list(executor.map(bind_deadline(lambda s: _fetch_news_page(credentials, company_name, s, display)), wave))
+            for items in pages:
+                yield from stream.feed(items)
+                if stream.finished:
+                    return
+
+def naver_credentials(naver_client_id, naver_client_secret, naver_pool=None):
+    """네이버 키 인자 → CredentialPool (naver_pool을 주면 그대로 사용)"""
+    from credentials import resolve_pool
+    if naver_pool is not None:
+        return naver_pool
     if naver_client_id is None or naver_client_secret is None:
         raise ValueError("naver_client_id와 naver_client_secret을 반드시 인자로 전달해야 합니다.")
-    headers = {"X-Naver-Client-Id": naver_client_id, "X-Naver-Client-Secret": naver_client_secret}
-    url = "https://openapi.naver.com/v1/search/news.json"
-    params = {"query": company_name, "sort": "date", "display": max_news, "start": 1}
-    response = requests.get(url, headers=headers, params=params)
-    response.encoding = 'utf-8'  # 인코딩 명시
+    return resolve_pool("naver", (naver_client_id, naver_client_secret))
 
-    if response.status_code == 200:
-        # 인코딩 문제 진단용: response.text를 잠시 출력
-        try:
-            items = response.json().get('items', [])[:max_news]
-        except Exception as e:
-            print('response.text:', response.text[:500])
-            print('response.content:', response.content[:500])
-            print('JSON decode error:', e)
-            return ("(뉴스 응답 인코딩 오류)", 0) if return_count else "(뉴스 응답 인코딩 오류)"
-        texts = [(item['title'] + ' ' + item['description'])[:max_length] for item in items]
-        count = len(texts)
-        if not texts:
-            return ("(최근 1년 뉴스 없음)", 0) if return_count else "(최근 1년 뉴스 없음)"
-        return ("\n".join(texts), count) if return_count else "\n".join(texts)
-    else:
-        print("네이버 뉴스 API 호출 실패", response.status_code)
-        return ("", 0) if return_count else ""
\ No newline at end of file
+def naver_request_headers(credential):
+    client_id, client_secret = credential.secret
+    return {"X-Naver-Client-Id": client_id, "X-Naver-Client-Secret": client_secret}
+
+def plan_news_pages(max_news=None, concurrency=3, max_calls=10):
+    """호출할 start 오프셋을 wave(동시 호출 묶음) 단위로 나눠 (waves, display) 반환"""
+    starts = list(range(1, NAVER_NEWS_MAX_START + 1, NAVER_NEWS_MAX_DISPLAY))[:max_calls]
+    if max_news:
+        # 필요한 건수만큼만 페이지를 요청
+        pages_needed = -(-max_news // NAVER_NEWS_MAX_DISPLAY)
+        starts = starts[:pages_needed]
+    display = min(NAVER_NEWS_MAX_DISPLAY, max_news) if max_news else NAVER_NEWS_MAX_DISPLAY
+    # 첫 페이지는 단독 호출(기간이 짧으면 1회로 종료), 이후 concurrency개씩 병렬 호출
+    concurrency = max(1, concurrency)
+    waves = [starts[:1]] + [starts[i:i + concurrency] for i in range(1, len(starts), concurrency)]
+    return [wave for wave in waves if wave], display
+
+class NewsPageStream:
+    """start 순으로 받은 뉴스 페이지를 NewsItem으로 변환하며 since_date/max_news/마지막 페이지에서 종료 (동기/비동기 공용)"""
+    def __init__(self, since_date, max_news, display):
+        self.since = parse_since_date(since_date)
+        self.max_news = max_news
+        self.display = display
+        self.yielded = 0
+        self.finished = False
+
+    def feed(self, items):
+        if self.finished:
+            return
+        if items is None:
+            self.finished = True
+            return
+        for item in items:
+            published = parse_pub_date(item.get('pubDate'))
+            if self.since is not None and published is not None and published < self.since:
+                self.finished = True
+                return
+            yield NewsItem(
+                link=item.get('originallink') or item.get('link', ''),
+                pub_date=published,
+                title=clean_news_text(item.get('title', '')),
+                description=clean_news_text(item.get('description', '')),
+            )
+            self.yielded += 1
+            if self.max_news and self.yielded >= self.max_news:
+                self.finished = True
+                return
+        if len(items) < self.display:
+            # 마지막 페이지 도달
+            self.finished = True
+
+# run.py에서 직접 입력한 키를 import해서 사용합니다.
+def get_news_from_naver(company_name, since_date, max_news=10, naver_client_id=None, naver_client_secret=None, naver_pool=None):
+    """since_date 이후 뉴스 최대 max_news건을 NewsItem 목록으로 반환"""
+    return list(iter_news_from_naver(company_name, since_date, max_news=max_news, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, naver_pool=naver_pool))
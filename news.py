@@ -1,52 +1,124 @@
 # 뉴스 요약 모듈] 네이버 뉴스 수집 및 LLM 뉴스 요약 기능을 제공합니다.
-from naver_api import get_news_from_naver
+# 뉴스는 기사 단위로 1회만 요약해 캐시하고(링크/정규화 본문 해시 기준), 회사별 뉴스 섹션은 캐시된 기사 요약을 묶어 만듭니다.
+# 매일 다시 실행해도 새로 나온 기사만 LLM을 호출합니다.
+import os
+import re
+import hashlib
+from naver_api import iter_news_from_naver
 from llm_utils import query_llm
-from utils import clean_news_text
+from cache_utils import DiskCache
+from deadline import bind_deadline
 
-def news_search_and_summary_with_risk(company_name, since_date, financial_summary, llm_api_key=None, naver_client_id=None, naver_client_secret=None, min_news=40):
-    # 뉴스 검색 및 요약 (정상 동작 버전)
-    from naver_api import get_news_from_naver
+# 기사 요약 캐시 (요약 모델 + 기사 키 → 요약). 다른 디스크 캐시와 같이 NEWS_SUMMARY_TTL_DAYS(기본 30일)가 지나면 다시 요약
+NEWS_SUMMARY_TTL = int(os.getenv("NEWS_SUMMARY_TTL_DAYS", "30")) * 24 * 3600
+article_summary_cache = DiskCache("news_article_summaries", ttl=NEWS_SUMMARY_TTL)
+
+NEWS_MIN_CHUNKS = 7
+NEWS_MAX_CHUNKS = 10
+# 기사 요약이 실패해 원문 일부로 대신한 항목 표시 (리포트 체크포인트에 저장하지 않는 기준)
+NEWS_FALLBACK_PREFIX = "(원문 일부)"
+NEWS_RISK_KEYWORDS = ["리스크", "위험", "부정", "손실", "소송", "규제", "부실", "우려", "사고", "불법", "하락", "적자"]
+
+def news_since_date(since_date):
+    """since_date가 올바르지 않으면 최근 1년으로 대체"""
+    from naver_api import parse_since_date
     import datetime
-    news_list = []
-    warn = ''
-    cur_since = since_date
-    try:
-        cur_date = datetime.datetime.strptime(since_date, '%Y%m%d')
-    except Exception:
-        cur_date = datetime.datetime.now() - datetime.timedelta(days=365)
-        cur_since = cur_date.strftime('%Y%m%d')
-    for attempt in range(5):
-        raw_news = get_news_from_naver(company_name, cur_since, max_news=40, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret)
-        from utils import clean_news_text
-        cleaned_news = clean_news_text(raw_news)
-        news_list = [n.strip() for n in cleaned_news.split('\n') if n.strip()]
-        if len(news_list) >= 40:
-            break
-        cur_date = cur_date - datetime.timedelta(days=180)
-        cur_since = cur_date.strftime('%Y%m%d')
-    if len(news_list) < min_news:
-        warn = f"[경고] 최근 뉴스가 {len(news_list)}건으로 40건 미만입니다."
-    # LLM 뉴스 chunk 요약 적용
-    from llm_utils import summarize_texts_in_chunks, extract_risk_related_chunks
-    risk_keywords = ["리스크", "위험", "부정", "손실", "소송", "규제", "부실", "우려", "사고", "불법", "하락", "적자"]
-    if news_list:
-        news_min_chunks = 7
-        news_max_chunks = 10
-        news_list_limited = news_list[:40] if len(news_list) > 40 else news_list
-        if len(news_list_limited) < news_min_chunks:
-            news_chunk_size = 1
+    if parse_since_date(since_date) is None:
+        return (datetime.datetime.now() - datetime.timedelta(days=365)).strftime('%Y%m%d')
+    return since_date
+
+def article_key(link, text):
+    """기사 캐시 키: 링크가 있으면 링크, 없으면 정규화 본문(공백/기호 제거, 소문자)의 해시"""
+    basis = (link or '').strip() or re.sub(r'[\W_]+', '', text).lower()
+    return hashlib.sha1(basis.encode('utf-8')).hexdigest()
+
+def article_summary_cache_key(key):
+    """기사 요약 캐시 키: 요약 작업(task="summary")의 백엔드/모델이 바뀌면 다른 키"""
+    from llm_utils import resolve_llm_route
+    route = resolve_llm_route("summary")
+    return f"{route['backend']}:{route['model']}:{key}"
+
+def collect_news_articles(items):
+    """NewsItem 목록을 [(기사 키, 본문)]으로 변환 (같은 기사 중복 제거, 최신순 유지)"""
+    articles = []
+    seen = set()
+    for item in items:
+        text = item.text[:600]
+        if not text:
+            continue
+        key = article_key(item.link, text)
+        if key in seen:
+            continue
+        seen.add(key)
+        articles.append((key, text))
+    return articles
+
+def article_summary_prompt(text):
+    return f"아래 뉴스 기사를 1문장으로 요약해줘. 소송/규제/손실 등 리스크 관련 내용이 있으면 반드시 포함해줘:\n{text}"
+
+def lookup_article_summaries(articles):
+    """캐시된 기사 요약 {키: 요약}과 아직 요약하지 않은 기사 [(키, 본문)] 반환"""
+    summaries = {}
+    unseen = []
+    for key, text in articles:
+        cached = article_summary_cache.get(article_summary_cache_key(key))
+        if cached is not None:
+            summaries[key] = cached
         else:
-            news_chunk_size = max(1, len(news_list_limited) // news_max_chunks)
-        chunk_summaries = summarize_texts_in_chunks(news_list_limited, llm_api_key, chunk_size=news_chunk_size)
-        if chunk_summaries and len(chunk_summaries) < news_min_chunks:
-            chunk_summaries = summarize_texts_in_chunks(news_list_limited, llm_api_key, chunk_size=1)
-        chunk_summaries = chunk_summaries[:news_max_chunks] if chunk_summaries else []
-        selected_chunks = extract_risk_related_chunks(chunk_summaries, risk_keywords, max_count=news_max_chunks)
-        news_summary = "\n".join([f"[뉴스 chunk {i+1}] {s}" for i, s in enumerate(selected_chunks)])
+            unseen.append((key, text))
+    return summaries, unseen
+
+def store_article_summaries(unseen, results, summaries):
+    """새로 요약한 기사를 캐시에 저장 (빈 응답은 저장하지 않아 다음 실행에서 재시도)"""
+    for (key, _), summary in zip(unseen, results):
+        summary = (summary or '').strip()
+        if summary:
+            article_summary_cache.set(article_summary_cache_key(key), summary)
+            summaries[key] = summary
+
+def summarize_articles(articles, llm_api_key):
+    """기사별 요약 목록 (articles와 같은 순서). 캐시에 없는 기사만 병렬로 LLM 호출"""
+    from llm_utils import _get_llm_executor, PRIORITY_BULK
+    summaries, unseen = lookup_article_summaries(articles)
+    if unseen:
+        results = list(_get_llm_executor().map(bind_deadline(lambda article: query_llm(llm_api_key, article_summary_prompt(article[1]), priority=PRIORITY_BULK, task="summary")), unseen))
+        store_article_summaries(unseen, results, summaries)
+    print(f"[INFO] 뉴스 기사 요약: {len(articles)}건 중 신규 {len(unseen)}건 LLM 호출")
+    return [summaries.get(key) or f"{NEWS_FALLBACK_PREFIX} {text[:200]}" for key, text in articles]
+
+def merge_article_summaries(article_summaries, chunk_size):
+    """기사 요약을 chunk_size개씩 이어 붙여 뉴스 chunk로 만듦 (LLM 호출 없음)"""
+    from llm_utils import split_chunks
+    return [" ".join(chunk) for chunk in split_chunks(article_summaries, chunk_size)]
+
+def news_search_and_summary_with_risk(company_name, since_date, financial_summary, llm_api_key=None, naver_client_id=None, naver_client_secret=None, min_news=40, max_news=40, naver_pool=None, log=print):
+    """
+    since_date 기간 내 뉴스(최대 max_news건)를 기사별로 요약(캐시)해 chunk로 묶고, 리스크 관련 chunk 우선으로 최대 NEWS_MAX_CHUNKS개 반환 (list[str])
+    기사가 min_news건 미만이면 log로 경고 출력
+    """
+    since_date = news_since_date(since_date)
+    articles = collect_news_articles(iter_news_from_naver(company_name, since_date, max_news=max_news, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, naver_pool=naver_pool))
+    warn_short_news(articles, min_news, log)
+    news_list_limited, news_chunk_size = plan_news_chunks([text for _, text in articles], max_news)
+    if not news_list_limited:
+        return []
+    article_summaries = summarize_articles(articles[:len(news_list_limited)], llm_api_key)
+    return select_news_chunks(merge_article_summaries(article_summaries, news_chunk_size))
+
+def warn_short_news(articles, min_news=40, log=print):
+    if len(articles) < min_news:
+        log(f"[경고] 최근 뉴스가 {len(articles)}건으로 {min_news}건 미만입니다.")
+
+def plan_news_chunks(news_list, max_news=40):
+    """요약할 뉴스(최대 max_news건)와 chunk 크기 반환"""
+    news_list_limited = news_list[:max_news] if len(news_list) > max_news else news_list
+    if len(news_list_limited) < NEWS_MIN_CHUNKS:
+        news_chunk_size = 1
     else:
-        news_summary = "(요약 없음)"
-    if warn:
-        return warn + "\n" + news_summary
-    return news_summary
+        news_chunk_size = max(1, len(news_list_limited) // NEWS_MAX_CHUNKS)
+    return news_list_limited, news_chunk_size
 
-    
\ No newline at end of file
+def select_news_chunks(chunk_summaries):
+    """리스크 키워드가 포함된 chunk 우선으로 최대 NEWS_MAX_CHUNKS개 선택"""
+    from llm_utils import extract_risk_related_chunks
+    return extract_risk_related_chunks(chunk_summaries[:NEWS_MAX_CHUNKS], NEWS_RISK_KEYWORDS, max_count=NEWS_MAX_CHUNKS)
@@ -0,0 +1,265 @@
+# [동종업계 백분위 모듈] 상장사 재무비율을 KSIC 업종/연도/지표별 정렬 배열로 미리 계산해, 회사 비율의 동종업계 백분위를 조회합니다.
+# - 저장: SQLite(회사별 연도별 비율), 조회: 메모리의 정렬 NumPy 배열 + 이진 탐색(O(log n))
+# - 새 연간 데이터가 들어오면 해당 (업종, 연도, 지표) 배열만 다시 정렬
+import os
+import sys
+import time
+import sqlite3
+import threading
+import numpy as np
+from cache_utils import CACHE_DIR
+
+PEER_INDEX_DB = os.path.join(CACHE_DIR, "peer_index.sqlite3")
+PEER_KSIC_LEVELS = (3, 2)   # 동종업계 기준 KSIC 자릿수 (세분류부터 시도, 표본이 적으면 상위 분류)
+PEER_MIN_COUNT = 5          # 백분위를 계산할 최소 동종 기업 수
+PEER_EMPTY_RETRY_DAYS = int(os.getenv("PEER_EMPTY_RETRY_DAYS", "7"))  # 비율을 계산할 수 없던 (회사, 연도)를 다시 조회하기까지 일수
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    corp_code TEXT PRIMARY KEY,
+    induty_code TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ratios (
+    corp_code TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    ratio TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (corp_code, year, ratio)
+);
+CREATE INDEX IF NOT EXISTS idx_ratios_year ON ratios (year, ratio);
+CREATE TABLE IF NOT EXISTS empty_years (
+    corp_code TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (corp_code, year)
+);
+"""
+
+def _ksic_digits(induty_code):
+    return "".join(ch for ch in str(induty_code or "") if ch.isdigit())
+
+class PeerIndex:
+    """
+    (KSIC 접두 코드, 연도, 지표) → 정렬된 비율 배열
+    배열은 처음 조회할 때 만들고, 해당 그룹에 새 데이터가 들어오면 다음 조회 때 다시 만듦
+    """
+    def __init__(self, path=PEER_INDEX_DB):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._arrays = {}
+        self._dirty = set()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def induty_code(self, corp_code):
+        row = self._conn().execute("SELECT induty_code FROM companies WHERE corp_code=?", (corp_code,)).fetchone()
+        return row[0] if row else None
+
+    def years_for(self, corp_code):
+        rows = self._conn().execute("SELECT DISTINCT year FROM ratios WHERE corp_code=?", (corp_code,)).fetchall()
+        return {r[0] for r in rows}
+
+    def empty_years_for(self, corp_code):
+        """최근 PEER_EMPTY_RETRY_DAYS 안에 조회했지만 비율이 없던 연도"""
+        cutoff = time.time() - PEER_EMPTY_RETRY_DAYS * 86400
+        rows = self._conn().execute("SELECT year FROM empty_years WHERE corp_code=? AND checked_at >= ?", (corp_code, cutoff)).fetchall()
+        return {r[0] for r in rows}
+
+    def mark_empty_years(self, corp_code, years):
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO empty_years (corp_code, year, checked_at) VALUES (?, ?, ?)",
+                             [(corp_code, int(year), time.time()) for year in years])
+
+    def upsert_company(self, corp_code, induty_code, ratio_rows):
+        """
+        ratio_rows: analyze_financial_ratios_multi_year 결과 DataFrame 또는 records
+        (연도 컬럼 '연도', 나머지 컬럼은 지표, 결측값은 저장하지 않음)
+        """
+        import pandas as pd
+        df = ratio_rows if isinstance(ratio_rows, pd.DataFrame) else pd.DataFrame(ratio_rows)
+        code = _ksic_digits(induty_code)
+        if not code or df.empty or "연도" not in df.columns:
+            return 0
+        rows = []
+        for record in df.to_dict("records"):
+            year = int(record["연도"])
+            for ratio, value in record.items():
+                if ratio != "연도" and value is not None and not pd.isna(value) and np.isfinite(value):
+                    rows.append((corp_code, year, ratio, float(value)))
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO companies (corp_code, induty_code, updated_at) VALUES (?, ?, ?)", (corp_code, code, time.time()))
+            conn.executemany("INSERT OR REPLACE INTO ratios (corp_code, year, ratio, value) VALUES (?, ?, ?, ?)", rows)
+        with self._lock:
+            for _, year, ratio, _ in rows:
+                for level in PEER_KSIC_LEVELS:
+                    self._dirty.add((code[:level], year, ratio))
+        return len(rows)
+
+    def _peer_array(self, prefix, year, ratio):
+        key = (prefix, year, ratio)
+        with self._lock:
+            if key in self._arrays and key not in self._dirty:
+                return self._arrays[key]
+        rows = self._conn().execute(
+            "SELECT r.value FROM ratios r JOIN companies c ON c.corp_code = r.corp_code "
+            "WHERE c.induty_code LIKE ? AND r.year=? AND r.ratio=?",
+            (prefix + "%", year, ratio),
+        ).fetchall()
+        values = np.sort(np.fromiter((r[0] for r in rows), dtype=np.float64, count=len(rows)))
+        with self._lock:
+            self._arrays[key] = values
+            self._dirty.discard(key)
+        return values
+
+    def percentile(self, induty_code, year, ratio, value):
+        """
+        동종업계 내 백분위(0~100, 값이 작을수록 낮음) 반환: {'percentile', 'peers', 'ksic'}
+        표본이 PEER_MIN_COUNT 미만이면 상위 KSIC 분류로 넓히고, 그래도 부족하면 None
+        """
+        code = _ksic_digits(induty_code)
+        if not code or value is None or not np.isfinite(value):
+            return None
+        for level in PEER_KSIC_LEVELS:
+            if len(code) < level:
+                continue
+            values = self._peer_array(code[:level], int(year), ratio)
+            if len(values) < PEER_MIN_COUNT:
+                continue
+            below = np.searchsorted(values, value, side="left")
+            not_above = np.searchsorted(values, value, side="right")
+            return {"percentile": float((below + not_above) / 2 / len(values) * 100), "peers": len(values), "ksic": code[:level]}
+        return None
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "companies": conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0],
+            "rows": conn.execute("SELECT COUNT(*) FROM ratios").fetchone()[0],
+            "years": [r[0] for r in conn.execute("SELECT DISTINCT year FROM ratios ORDER BY year").fetchall()],
+            "cached_arrays": len(self._arrays),
+        }
+
+_peer_index = None
+_peer_index_lock = threading.Lock()
+
+def get_peer_index():
+    global _peer_index
+    with _peer_index_lock:
+        if _peer_index is None:
+            _peer_index = PeerIndex()
+        return _peer_index
+
+def get_induty_code(api_key, corp_code, index=None):
+    """DART 업종코드 (인덱스에 저장된 값 우선, 없으면 회사정보 API 조회)"""
+    index = index or get_peer_index()
+    code = index.induty_code(corp_code)
+    if code:
+        return code
+    from dart_api import get_company_info
+    return get_company_info(api_key, corp_code).get("induty_code")
+
+def format_peer_percentiles(index, induty_code, ratio_rows):
+    """회사의 최신 연도 지표별 동종업계 백분위를 리포트용 텍스트로 반환"""
+    import pandas as pd
+    df = ratio_rows if isinstance(ratio_rows, pd.DataFrame) else pd.DataFrame(ratio_rows)
+    if df.empty or "연도" not in df.columns:
+        return "(동종업계 비교 데이터 없음)"
+    lines = []
+    for record in df.sort_values("연도", ascending=False).to_dict("records"):
+        year = int(record["연도"])
+        for ratio, value in record.items():
+            if ratio == "연도" or value is None or pd.isna(value):
+                continue
+            hit = index.percentile(induty_code, year, ratio, float(value))
+            if hit:
+                lines.append(f"{ratio} {year}: {value:.2f} → KSIC {hit['ksic']} 동종 {hit['peers']}개사 중 백분위 {hit['percentile']:.0f}")
+        if lines:
+            break  # 백분위를 계산할 수 있는 가장 최근 연도만 사용
+    return "\n".join(lines) if lines else "(동종업계 비교 데이터 없음)"
+
+def peer_percentiles_for_report(api_key, corp_code, ratio_rows):
+    """리포트 생성 시 호출: 회사 비율을 인덱스에 반영(유니버스 점진 확장)한 뒤 동종업계 백분위 텍스트 반환"""
+    index = get_peer_index()
+    induty_code = get_induty_code(api_key, corp_code, index)
+    if not induty_code:
+        return "(동종업계 비교 데이터 없음)"
+    index.upsert_company(corp_code, induty_code, ratio_rows)
+    return format_peer_percentiles(index, induty_code, ratio_rows)
+
+def build_peer_universe(api_key, years, corp_codes=None, limit=None, refresh=False, prefetch=True):
+    """
+    상장사 전체(또는 corp_codes)의 재무비율을 인덱스에 적재 (야간 배치용)
+    이미 적재된 (회사, 연도)와 최근 비율이 없던 (회사, 연도)는 건너뛰고 새 연도만 조회 (refresh=True면 전부 다시 조회)
+    prefetch=True면 먼저 다중회사 주요계정으로 재무제표 저장소를 일괄 채움 (회사별 API 호출 최소화)
+    사전조회가 한도 초과 등으로 중간에 멈추면 저장소에 없는 연도는 회사별로 조회
+    """
+    from dart_api import load_corp_code_index
+    from financial import analyze_financial_ratios_multi_year
+    index = get_peer_index()
+    corp_codes = list(corp_codes or load_corp_code_index(api_key)["listed"])[:limit]
+    years = sorted(int(y) for y in years)
+    fetch = True
+    if prefetch:
+        from bulk_prefetch import prefetch_statements
+        stats = prefetch_statements(api_key, sorted(set(years) | {y - 1 for y in years}), corp_codes, refresh=refresh)
+        print(f"[INFO] 재무제표 사전조회: {stats}")
+        fetch = stats["stopped"]
+        if fetch:
+            print("[경고] 사전조회가 중간에 멈춰 저장소에 없는 회사는 회사별로 조회합니다.")
+    updated = 0
+    for i, corp_code in enumerate(corp_codes, 1):
+        skip = set() if refresh else index.years_for(corp_code) | index.empty_years_for(corp_code)
+        missing = [y for y in years if y not in skip]
+        if not missing:
+            continue
+        try:
+            induty_code = get_induty_code(api_key, corp_code, index)
+            # 매출액증가율 계산을 위해 직전 연도도 함께 조회하되, 저장은 새 연도만
+            fetch_years = sorted(set(missing) | {y - 1 for y in missing})
+            df = analyze_financial_ratios_multi_year(api_key, corp_code, fetch_years, detail=False, fetch=fetch)
+            df = df[df["연도"].isin(missing)]
+            updated += 1 if index.upsert_company(corp_code, induty_code, df) else 0
+            # 비율이 없던 연도는 PEER_EMPTY_RETRY_DAYS 동안 다시 조회하지 않음
+            stored_years = index.years_for(corp_code)
+            empty = [y for y in missing if y not in stored_years]
+            if empty:
+                index.mark_empty_years(corp_code, empty)
+        except Exception as e:
+            print(f"[경고] 동종업계 인덱스 적재 실패 ({corp_code}): {e}")
+        if i % 100 == 0:
+            print(f"[INFO] 동종업계 인덱스 적재 진행: {i}/{len(corp_codes)}")
+    print(f"[INFO] 동종업계 인덱스 적재 완료: {updated}개사 갱신")
+    return updated
+
+if __name__ == "__main__":
+    # 사용법:
+    #   python peer_index.py build [--years 3] [--limit N] [--refresh] [--no-prefetch]
+    #   python peer_index.py stats
+    args = sys.argv[1:]
+    command = args[0] if args else "stats"
+    if command == "build":
+        n_years = int(args[args.index("--years") + 1]) if "--years" in args else 3
+        limit = int(args[args.index("--limit") + 1]) if "--limit" in args else None
+        api_key = os.getenv("DART_API_KEY")
+        if not api_key:
+            from run import DART_API_KEY as api_key
+        from credentials import credential_pool, print_pools_usage
+        api_key = credential_pool("dart", api_key)
+        current_year = int(time.strftime('%Y'))
+        build_peer_universe(api_key, [current_year - 1 - i for i in range(n_years)], limit=limit, refresh="--refresh" in args,
+                            prefetch="--no-prefetch" not in args)
+        print_pools_usage()
+    else:
+        print(get_peer_index().stats())
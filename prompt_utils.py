@@ -0,0 +1,132 @@
+# [프롬프트 압축 모듈] 재무비율 압축 표기, 섹션 간 중복 제거, 섹션별 토큰 예산 적용 기능을 제공합니다.
+import re
+import math
+
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+def estimate_tokens(text):
+    """토큰 수 근사치 (한글 1글자≈1토큰, 그 외 4글자≈1토큰)"""
+    text = str(text or "")
+    hangul = len(_HANGUL_RE.findall(text))
+    return hangul + math.ceil((len(text) - hangul) / 4)
+
+def _fmt_number(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "-"
+    value = float(value)
+    if abs(value) >= 100:
+        return f"{value:.0f}"
+    if abs(value) >= 10:
+        return f"{value:.1f}".rstrip("0").rstrip(".")
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+def _trend_flag(values, threshold=0.05):
+    """첫 유효값 대비 마지막 유효값 추세: ↑ / ↓ / →"""
+    valid = [v for v in values if v is not None and not (isinstance(v, float) and math.isnan(v))]
+    if len(valid) < 2:
+        return ""
+    first, last = float(valid[0]), float(valid[-1])
+    base = abs(first) if first else 1.0
+    change = (last - first) / base
+    if change > threshold:
+        return "↑"
+    if change < -threshold:
+        return "↓"
+    return "→"
+
+def compact_ratio_table(df, year_col="연도"):
+    """
+    재무비율 DataFrame을 지표별 한 줄로 압축 (연도 오름차순, 반올림, 추세 표시)
+    예) 부채비율(%) 21:45.1 22:43.2 23:- 24:52.3 ↑
+    """
+    if df is None or df.empty or year_col not in df.columns:
+        return "(재무비율 데이터 없음)"
+    df = df.sort_values(year_col)
+    years = [str(y)[-2:] for y in df[year_col]]
+    lines = []
+    for col in df.columns:
+        if col == year_col:
+            continue
+        values = list(df[col])
+        if all(_fmt_number(v) == "-" for v in values):
+            continue
+        cells = " ".join(f"{y}:{_fmt_number(v)}" for y, v in zip(years, values))
+        lines.append(f"{col} {cells} {_trend_flag(values)}".rstrip())
+    return "\n".join(lines) if lines else "(재무비율 데이터 없음)"
+
+def _normalize_line(line):
+    line = re.sub(r"^[A-Z]\.\s*", "", line.strip())
+    return re.sub(r"\s+", " ", line)
+
+def trim_to_tokens(text, max_tokens):
+    """줄 단위로 앞에서부터 max_tokens 이내만 남김 (마지막 줄은 글자 단위로 자름)"""
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+    kept = []
+    used = 0
+    for line in str(text).split("\n"):
+        cost = estimate_tokens(line) + 1
+        if used + cost > max_tokens:
+            remaining = max_tokens - used
+            if remaining > 10:
+                while line and estimate_tokens(line) > remaining - 1:
+                    line = line[: int(len(line) * 0.8)]
+                if line:
+                    kept.append(line + "…")
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+class PromptStats:
+    """실행 1회 동안 압축 전/후 토큰 수 누적"""
+    def __init__(self):
+        self.original = 0
+        self.compacted = 0
+        self.by_prompt = {}
+
+    def record(self, name, original_tokens, compacted_tokens):
+        self.original += original_tokens
+        self.compacted += compacted_tokens
+        self.by_prompt[name] = (original_tokens, compacted_tokens)
+
+    def report(self):
+        saved = self.original - self.compacted
+        pct = saved / self.original * 100 if self.original else 0.0
+        details = ", ".join(f"{k} {o}→{c}" for k, (o, c) in self.by_prompt.items())
+        return f"[INFO] 프롬프트 압축: 약 {self.original}토큰 → {self.compacted}토큰 ({pct:.0f}% 절감) [{details}]"
+
+def build_compact_prompt(sections, instruction, total_budget=None, stats=None, name="prompt", original_text=None):
+    """
+    sections: [(제목, 본문, 우선순위, 섹션 토큰 예산)] (우선순위 숫자가 작을수록 중요)
+    1. 우선순위 높은 섹션부터 처리하며, 앞 섹션에 이미 나온 줄은 뒤 섹션에서 제거
+    2. 섹션별 토큰 예산으로 자름
+    3. 전체 예산 초과 시 우선순위 낮은 섹션부터 줄임
+    stats: PromptStats에 (original_text 토큰, 완성된 프롬프트 토큰) 기록
+    original_text: 압축하지 않았을 때 보낼 전체 프롬프트 (지시문 포함, 없으면 완성된 프롬프트와 같다고 봄)
+    """
+    seen = set()
+    ordered = sorted(enumerate(sections), key=lambda x: (x[1][2], x[0]))
+    bodies = {}
+    for idx, (title, body, priority, budget) in ordered:
+        lines = []
+        for line in str(body or "").split("\n"):
+            key = _normalize_line(line)
+            if key and key in seen:
+                continue
+            if key:
+                seen.add(key)
+            lines.append(line)
+        bodies[idx] = trim_to_tokens("\n".join(lines).strip(), budget)
+    if total_budget is not None:
+        overhead = estimate_tokens(instruction) + sum(estimate_tokens(s[0]) + 2 for s in sections)
+        for idx, (title, body, priority, budget) in reversed(ordered):
+            total = overhead + sum(estimate_tokens(b) for b in bodies.values())
+            if total <= total_budget:
+                break
+            excess = total - total_budget
+            bodies[idx] = trim_to_tokens(bodies[idx], max(0, estimate_tokens(bodies[idx]) - excess))
+    prompt = "\n".join(f"[{title}]\n{bodies[idx]}" for idx, (title, *_rest) in enumerate(sections) if bodies[idx]) + f"\n\n{instruction}"
+    if stats is not None:
+        stats.record(name, estimate_tokens(original_text) if original_text is not None else estimate_tokens(prompt), estimate_tokens(prompt))
+    return prompt
@@ -0,0 +1,165 @@
+# [리포트 모드 모듈] 리포트 깊이(quick/standard/deep)별 단계 구성과 전체 소요 시간 예산을 관리합니다.
+# - quick: 재무비율 표/해설 + 통합 분석만 (대화형 사용자용, 짧은 예산)
+# - standard: 기존 리포트 (공시/보고서 원문 핵심감사사항, 뉴스 40건), 기본은 예산/마감 없이 기존과 같은 출력
+# - deep: 공시/보고서 원문을 더 길게, 핵심감사사항 검색 범위 확대, 뉴스 100건
+# 단계 시작 전에 남은 예산으로 이 단계와 뒤따르는 더 중요한 단계를 마칠 수 있는지 추정해,
+# 부족하면 축약(short)하거나 생략(skip)하고 리포트에 표시합니다. 통합 분석은 항상 실행합니다.
+import os
+import time
+import threading
+from deadline import expired
+
+REPORT_TIER = os.getenv("REPORT_TIER", "standard")
+# 마감 시간 = 예산 × 배수: 예산은 단계 축약/생략 판단 기준, 마감이 지나면 남은 외부 호출을 중단 (deadline.py)
+REPORT_DEADLINE_FACTOR = float(os.getenv("REPORT_DEADLINE_FACTOR", "2"))
+
+# 모드별 예산(초)과 실행할 단계, 단계 옵션
+REPORT_TIERS = {
+    "quick": {
+        "budget": float(os.getenv("REPORT_BUDGET_QUICK", "30")),
+        "stages": {"finratio_analysis", "integrated_analysis"},
+    },
+    "standard": {
+        # 기본은 예산/마감 없음 (배치/감시/작업 큐 등 기존 리포트와 동일), REPORT_BUDGET_STANDARD로 지정 시에만 적용
+        "budget": float(os.environ["REPORT_BUDGET_STANDARD"]) if os.getenv("REPORT_BUDGET_STANDARD") else None,
+        "stages": {"peers", "filings", "yearly_reports", "news", "industry_risk", "kam", "filings_summary", "news_summary", "finratio_analysis", "integrated_analysis"},
+        "filings_count": 40, "news_count": 40, "document_chars": 800, "kam_sections": 2, "yearly_texts": 5,
+    },
+    "deep": {
+        "budget": float(os.getenv("REPORT_BUDGET_DEEP", "600")),
+        "stages": {"peers", "filings", "yearly_reports", "news", "industry_risk", "kam", "filings_summary", "news_summary", "finratio_analysis", "integrated_analysis"},
+        "filings_count": 40, "news_count": 100, "document_chars": 3000, "kam_sections": 4, "yearly_texts": 10,
+    },
+}
+
+# summarize_company_risks의 단계 실행 순서 (kam: industry_risk 단계 안에서 결정하는 핵심감사사항 LLM 판단)
+REPORT_STAGE_ORDER = ["peers", "filings", "yearly_reports", "news", "industry_risk", "kam", "filings_summary", "news_summary", "finratio_analysis", "integrated_analysis"]
+
+# 단계 중요도 (작을수록 중요, 예산이 부족하면 큰 값부터 축약/생략)
+STAGE_PRIORITY = {
+    "integrated_analysis": 0,
+    "finratio_analysis": 1,
+    "filings": 2,
+    "filings_summary": 2,
+    "peers": 3,
+    "yearly_reports": 3,
+    "industry_risk": 3,
+    "kam": 4,
+    "news": 4,
+    "news_summary": 4,
+}
+# 필수 단계 (예산과 관계없이 실행)
+REQUIRED_STAGES = {"integrated_analysis"}
+# 축약 실행이 가능한 단계 (축약 시 예상 소요 비율)
+SHORTENABLE_STAGES = {"filings": 0.5, "yearly_reports": 0.3, "news": 0.4, "filings_summary": 0.5, "kam": 0.5}
+
+# 단계별 예상 소요(초): 기본값에서 시작해 실제 실행 시간의 지수이동평균으로 갱신 (프로세스 내)
+_STAGE_SECONDS_DEFAULT = {
+    "peers": 5.0, "filings": 3.0, "yearly_reports": 20.0, "news": 10.0, "industry_risk": 5.0, "kam": 8.0,
+    "filings_summary": 15.0, "news_summary": 0.1, "finratio_analysis": 6.0, "integrated_analysis": 8.0,
+}
+_stage_seconds = dict(_STAGE_SECONDS_DEFAULT)
+_stage_seconds_lock = threading.Lock()
+
+def record_stage_seconds(stage, seconds, alpha=0.3):
+    with _stage_seconds_lock:
+        previous = _stage_seconds.get(stage)
+        _stage_seconds[stage] = seconds if previous is None else previous * (1 - alpha) + seconds * alpha
+
+def estimate_stage_seconds(stage):
+    with _stage_seconds_lock:
+        return _stage_seconds.get(stage, 1.0)
+
+def resolve_tier(tier=None):
+    tier = tier or REPORT_TIER
+    if tier not in REPORT_TIERS:
+        raise Exception(f"알 수 없는 리포트 모드: {tier} (quick/standard/deep)")
+    return tier
+
+class ReportBudget:
+    """
+    리포트 1회의 시간 예산과 단계별 실행 결정
+    plan(stage) → 'full' / 'short' / 'skip' / 'off'(이 모드에서 실행하지 않는 단계)
+    남은 예산에서 REPORT_STAGE_ORDER상 뒤에 실행할 더 중요한 단계의 예상 시간을 먼저 떼어 두고 판단
+    """
+    def __init__(self, tier=None, budget_seconds=None):
+        self.tier = resolve_tier(tier)
+        self.settings = REPORT_TIERS[self.tier]
+        self.budget = self.settings["budget"] if budget_seconds is None else budget_seconds
+        self.started = time.monotonic()
+        self.decisions = {}
+
+    def option(self, name, default=None):
+        return self.settings.get(name, default)
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def remaining(self):
+        """남은 예산(초), 예산이 없으면 None"""
+        return None if self.budget is None else self.budget - self.elapsed()
+
+    def deadline_seconds(self):
+        """리포트 마감까지 남은 시간(초) (deadline.report_deadline에 전달), 예산이 없으면 None(마감 없음)"""
+        if self.budget is None:
+            return None
+        return self.budget * REPORT_DEADLINE_FACTOR - self.elapsed()
+
+    def enabled(self, stage):
+        return stage in self.settings["stages"]
+
+    def plan(self, stage, reusable=False):
+        """reusable=True(체크포인트에 결과가 있음)면 비용이 없으므로 그대로 실행"""
+        if not self.enabled(stage):
+            decision = "off"
+        elif reusable or stage in REQUIRED_STAGES:
+            decision = "full"
+        elif expired():
+            # 리포트 마감(deadline.py)이 지남: 외부 호출이 곧바로 실패하므로 실행하지 않음
+            decision = "skip"
+        elif self.budget is None:
+            decision = "full"
+        else:
+            priority = STAGE_PRIORITY.get(stage, 5)
+            later = REPORT_STAGE_ORDER[REPORT_STAGE_ORDER.index(stage) + 1:] if stage in REPORT_STAGE_ORDER else ()
+            reserve = sum(estimate_stage_seconds(s) for s in later if self.enabled(s) and STAGE_PRIORITY.get(s, 5) < priority)
+            available = self.remaining() - reserve
+            cost = estimate_stage_seconds(stage)
+            if available >= cost:
+                decision = "full"
+            elif stage in SHORTENABLE_STAGES and available >= cost * SHORTENABLE_STAGES[stage]:
+                decision = "short"
+            else:
+                decision = "skip"
+        self.decisions[stage] = decision
+        if decision in ("short", "skip"):
+            left = self.remaining()
+            reason = "리포트 마감 시간 초과" if left is None else f"시간 예산 부족({left:.0f}초 남음)"
+            print(f"[경고] {reason}: {stage} {'축약' if decision == 'short' else '생략'}")
+        return decision
+
+    def cost_ratio(self, stage):
+        """결정된 실행 방식의 예상 소요 비율 (축약 실행 시간을 전체 실행 기준으로 환산해 기록할 때 사용)"""
+        return SHORTENABLE_STAGES.get(stage, 1.0) if self.decisions.get(stage) == "short" else 1.0
+
+    def placeholder(self, stage):
+        """실행하지 않은 단계 자리에 넣을 표시 문구"""
+        if self.decisions.get(stage) == "off":
+            return f"({self.tier} 모드: 생략)"
+        return "(시간 예산 초과로 생략)"
+
+    def header(self):
+        """리포트 상단 표시: 모드, 예산/소요, 축약·생략된 단계 (예산 없는 standard는 기존 리포트와 같도록 빈 문자열)"""
+        if self.budget is None and not any(d in ("short", "skip") for d in self.decisions.values()):
+            return ""
+        budget = "예산 없음" if self.budget is None else f"예산 {self.budget:.0f}초"
+        lines = [f"[리포트 모드] {self.tier} ({budget}, 소요 {self.elapsed():.0f}초)"]
+        shortened = [s for s, d in self.decisions.items() if d == "short"]
+        skipped = [s for s, d in self.decisions.items() if d == "skip"]
+        if shortened:
+            lines.append(f"- 시간 예산으로 축약된 단계: {', '.join(shortened)}")
+        if skipped:
+            lines.append(f"- 시간 예산으로 생략된 단계: {', '.join(skipped)}")
+        if expired():
+            lines.append("- 리포트 마감 시간을 넘겨 남은 외부 호출을 중단했습니다.")
+        return "\n".join(lines)
@@ -0,0 +1,248 @@
+# [결과 카탈로그 모듈] results/ 아래에 생성된 리포트 파일(CSV/PNG/TXT)을 SQLite 카탈로그에 기록합니다.
+# 최신 리포트 조회, N일 지난 파일 정리 같은 작업을 디렉터리 탐색 없이 인덱스 조회로 처리합니다.
+# - 파일은 임시 파일에 쓴 뒤 os.replace로 교체하고(원자적), 교체가 끝난 뒤 카탈로그에 한 트랜잭션으로 기록
+# - 리포트 실행(run) 단위로 회사/corp_code/단계별 결과 fingerprint를 함께 기록
+# - runs/artifacts 모두 회사는 results/ 폴더명과 같은 정규화 이름(company_key)으로 저장
+# - 카탈로그 오류(잠김, 읽기 전용 DB 등)는 경고만 출력하고 리포트 생성은 계속
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
+import threading
+import contextvars
+from contextlib import contextmanager
+
+RESULTS_DIR = "results"
+RESULTS_CATALOG_DB = os.getenv("RESULTS_CATALOG_DB", os.path.join(RESULTS_DIR, "catalog.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    company TEXT NOT NULL,
+    corp_code TEXT,
+    status TEXT NOT NULL,
+    stages TEXT NOT NULL DEFAULT '{}',
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    company TEXT NOT NULL,
+    corp_code TEXT,
+    run_id TEXT,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_company ON artifacts (company, created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_corp ON artifacts (corp_code, created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_created ON artifacts (created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_run ON artifacts (run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_company ON runs (company, started_at);
+"""
+
+_active_run = contextvars.ContextVar("results_run", default=None)
+
+def stage_fingerprint(value):
+    """단계 결과의 fingerprint (JSON 직렬화 값의 sha1 앞 16자리, 직렬화할 수 없으면 repr 사용)"""
+    try:
+        data = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        data = repr(value)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+def company_key(company):
+    """카탈로그에 저장/조회하는 회사 이름 (run.sanitize_filename과 같은 규칙: results/<폴더명>)"""
+    return re.sub(r'[\\/*?:"<>|]', "_", company) if company else company
+
+def artifact_kind(path):
+    return os.path.splitext(path)[1].lstrip(".").lower() or "file"
+
+class ResultsCatalog:
+    def __init__(self, path=RESULTS_CATALOG_DB):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def start_run(self, run_id, company, corp_code=None):
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO runs (run_id, company, corp_code, status, stages, started_at) VALUES (?, ?, ?, 'running', '{}', ?)",
+                         (run_id, company_key(company), corp_code, time.time()))
+
+    def finish_run(self, run_id, status, stages):
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE runs SET status=?, stages=?, finished_at=? WHERE run_id=?",
+                         (status, json.dumps(stages, ensure_ascii=False, sort_keys=True), time.time(), run_id))
+
+    def record_artifact(self, path, company, corp_code=None, run_id=None):
+        path = os.path.normpath(path)
+        stat = os.stat(path)
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO artifacts (path, company, corp_code, run_id, kind, size, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (path, company_key(company), corp_code, run_id, artifact_kind(path), stat.st_size, stat.st_mtime))
+
+    def latest(self, company=None, corp_code=None, kind=None, limit=1):
+        """회사명 또는 corp_code의 최신 파일 (kind: csv/png/txt)"""
+        where, params = [], []
+        for column, value in (("company", company_key(company)), ("corp_code", corp_code), ("kind", kind)):
+            if value:
+                where.append(f"{column}=?")
+                params.append(value)
+        sql = "SELECT * FROM artifacts" + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY created_at DESC LIMIT ?"
+        return [dict(r) for r in self._conn().execute(sql, params + [limit]).fetchall()]
+
+    def older_than(self, days, kind=None):
+        cutoff = time.time() - days * 86400
+        sql = "SELECT * FROM artifacts WHERE created_at < ?" + (" AND kind=?" if kind else "") + " ORDER BY created_at"
+        return [dict(r) for r in self._conn().execute(sql, [cutoff] + ([kind] if kind else [])).fetchall()]
+
+    def runs(self, company=None, limit=20):
+        sql = "SELECT * FROM runs" + (" WHERE company=?" if company else "") + " ORDER BY started_at DESC LIMIT ?"
+        rows = self._conn().execute(sql, ([company_key(company)] if company else []) + [limit]).fetchall()
+        return [dict(r, stages=json.loads(r["stages"])) for r in rows]
+
+    def prune(self, days, kind=None, dry_run=False):
+        """N일 지난 파일 삭제 후 카탈로그에서 제거. 반환값: 삭제(예정) 경로 목록"""
+        rows = self.older_than(days, kind)
+        if dry_run:
+            return [r["path"] for r in rows]
+        removed = []
+        for row in rows:
+            try:
+                os.remove(row["path"])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[경고] 결과 파일 삭제 실패 ({row['path']}): {e}")
+                continue
+            removed.append(row["path"])
+        conn = self._conn()
+        with conn:
+            conn.executemany("DELETE FROM artifacts WHERE path=?", [(p,) for p in removed])
+        return removed
+
+    def rebuild(self, results_dir=RESULTS_DIR):
+        """기존 results/ 트리를 한 번 훑어 카탈로그에 없는 파일을 등록 (카탈로그 도입 이전 결과용, 폴더명을 회사명으로 사용)"""
+        known = {r[0] for r in self._conn().execute("SELECT path FROM artifacts").fetchall()}
+        rows = []
+        for entry in os.scandir(results_dir) if os.path.isdir(results_dir) else []:
+            if not entry.is_dir():
+                continue
+            for file in os.scandir(entry.path):
+                path = os.path.normpath(file.path)
+                if file.is_file() and path not in known and not file.name.startswith(".") and ".tmp-" not in file.name:
+                    stat = file.stat()
+                    rows.append((path, entry.name, None, None, artifact_kind(path), stat.st_size, stat.st_mtime))
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO artifacts (path, company, corp_code, run_id, kind, size, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def stats(self):
+        conn = self._conn()
+        return {
+            "artifacts": conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0],
+            "bytes": conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0],
+            "companies": conn.execute("SELECT COUNT(DISTINCT company) FROM artifacts").fetchone()[0],
+            "runs": conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0],
+        }
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_results_catalog():
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ResultsCatalog()
+        return _catalog
+
+@contextmanager
+def catalog_run(company, corp_code=None, run_id=None):
+    """리포트 1회 실행 범위: 안에서 기록되는 파일/단계 fingerprint를 이 run에 연결 (카탈로그 오류는 리포트 생성을 막지 않음)"""
+    run = {"run_id": run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}", "company": company, "corp_code": corp_code, "stages": {}}
+    try:
+        get_results_catalog().start_run(run["run_id"], company, corp_code)
+    except (sqlite3.Error, OSError) as e:
+        print(f"[경고] 결과 카탈로그 실행 기록 실패 ({run['run_id']}): {e}")
+    token = _active_run.set(run)
+    status = "failed"
+    try:
+        yield run
+        status = "done"
+    finally:
+        _active_run.reset(token)
+        # finally에서 나는 카탈로그 오류가 리포트의 원래 예외를 가리지 않도록
+        try:
+            get_results_catalog().finish_run(run["run_id"], status, run["stages"])
+        except (sqlite3.Error, OSError) as e:
+            print(f"[경고] 결과 카탈로그 실행 기록 실패 ({run['run_id']}): {e}")
+
+def note_stage(stage, value):
+    """진행 중인 run이 있으면 단계 결과 fingerprint 기록 (run_stage에서 호출)"""
+    run = _active_run.get()
+    if run is not None:
+        run["stages"][stage] = stage_fingerprint(value)
+
+def record_artifact(path, company):
+    """결과 파일 기록 (진행 중인 run이 있으면 run_id/corp_code 연결). 카탈로그 오류는 리포트 생성을 막지 않음"""
+    run = _active_run.get() or {}
+    try:
+        get_results_catalog().record_artifact(path, company, run.get("corp_code"), run.get("run_id"))
+    except (sqlite3.Error, OSError) as e:
+        print(f"[경고] 결과 카탈로그 기록 실패 ({path}): {e}")
+
+@contextmanager
+def atomic_output(path):
+    """같은 폴더의 임시 파일 경로를 넘겨주고, 블록이 성공하면 path로 교체 (확장자 유지: 저장 형식 판별용)"""
+    base, ext = os.path.splitext(path)
+    tmp_path = f"{base}.tmp-{uuid.uuid4().hex[:8]}{ext}"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+if __name__ == "__main__":
+    # 사용법:
+    #   python results_catalog.py stats
+    #   python results_catalog.py latest 삼성전자 [csv|png|txt]
+    #   python results_catalog.py runs [회사명]
+    #   python results_catalog.py older 90 [--prune]
+    #   python results_catalog.py rebuild        # 기존 results/ 파일 등록
+    args = sys.argv[1:]
+    command = args[0] if args else "stats"
+    catalog = get_results_catalog()
+    if command == "latest" and len(args) > 1:
+        for row in catalog.latest(company=args[1], kind=args[2] if len(args) > 2 else None, limit=5):
+            print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(row['created_at']))}  {row['kind']:<4} {row['size']:>10,}  {row['path']}")
+    elif command == "runs":
+        for run in catalog.runs(args[1] if len(args) > 1 else None):
+            print(f"{run['run_id']}  {run['company']}  {run['status']}  stages={len(run['stages'])}")
+    elif command == "older" and len(args) > 1:
+        days = float(args[1])
+        paths = catalog.prune(days, dry_run="--prune" not in args)
+        print("\n".join(paths))
+        print(f"[INFO] {days:g}일 지난 파일 {len(paths)}개" + (" 삭제" if "--prune" in args else " (삭제하려면 --prune)"))
+    elif command == "rebuild":
+        print(f"[INFO] 카탈로그에 {catalog.rebuild()}개 파일 등록")
+    else:
+        print(catalog.stats())
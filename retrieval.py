@@ -0,0 +1,97 @@
+# [검색 모듈] 공시/뉴스 chunk 선별용 로컬 BM25 어휘 검색 인덱스를 제공합니다.
+import re
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[가-힣]+|[a-z0-9]+")
+_HANGUL_RE = re.compile(r"[가-힣]+")
+
+def tokenize(text):
+    """
+    한국어 대응 토크나이저
+    - 영문/숫자: 소문자 단어 단위
+    - 한글: 어절 전체 + 글자 bigram (조사/어미가 붙은 어절도 매칭되도록)
+    """
+    tokens = []
+    for word in _TOKEN_RE.findall(str(text).lower()):
+        tokens.append(word)
+        if len(word) > 2 and _HANGUL_RE.fullmatch(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+def split_passages(texts, max_chars=800):
+    """텍스트 목록을 줄 단위로 묶어 max_chars 이하 passage 목록으로 분할"""
+    passages = []
+    for text in texts:
+        buf = ""
+        for line in str(text).split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            if buf and len(buf) + len(line) + 1 > max_chars:
+                passages.append(buf)
+                buf = ""
+            buf = f"{buf}\n{line}" if buf else line[:max_chars]
+        if buf:
+            passages.append(buf)
+    return passages
+
+class LexicalIndex:
+    """
+    BM25 역색인 (term별 posting을 CSR 형태의 NumPy 배열로 저장)
+    - indptr[t]:indptr[t+1] 구간의 doc_ids/tfs가 term t의 posting
+    """
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.texts = list(texts)
+        self.k1 = k1
+        self.b = b
+        vocab = {}
+        postings = []
+        doc_lens = np.zeros(len(self.texts), dtype=np.float32)
+        for doc_id, text in enumerate(self.texts):
+            tokens = tokenize(text)
+            doc_lens[doc_id] = len(tokens)
+            counts = {}
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                postings.append((vocab.setdefault(tok, len(vocab)), doc_id, tf))
+        postings.sort()
+        terms = np.array([p[0] for p in postings], dtype=np.int32)
+        self.vocab = vocab
+        self.doc_ids = np.array([p[1] for p in postings], dtype=np.int32)
+        self.tfs = np.array([p[2] for p in postings], dtype=np.float32)
+        self.indptr = np.searchsorted(terms, np.arange(len(vocab) + 1)).astype(np.int32)
+        n_docs = max(1, len(self.texts))
+        df = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_len = float(doc_lens.mean()) if len(doc_lens) and doc_lens.mean() > 0 else 1.0
+        self.norm = (k1 * (1 - b + b * doc_lens / avg_len)).astype(np.float32)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def scores(self, query):
+        """query에 대한 전체 문서 BM25 점수 배열"""
+        scores = np.zeros(len(self.texts), dtype=np.float32)
+        for tok in set(tokenize(query)):
+            t = self.vocab.get(tok)
+            if t is None:
+                continue
+            lo, hi = self.indptr[t], self.indptr[t + 1]
+            docs = self.doc_ids[lo:hi]
+            tf = self.tfs[lo:hi]
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + self.norm[docs])
+        return scores
+
+    def search(self, query, top_k=5):
+        """점수 상위 top_k개 [(문서 index, 점수)] 반환 (점수 0인 문서 제외)"""
+        top_k = min(top_k, len(self.texts))
+        if top_k <= 0:
+            return []
+        scores = self.scores(query)
+        idx = np.argpartition(-scores, top_k - 1)[:top_k]
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [(int(i), float(scores[i])) for i in idx if scores[i] > 0]
+
+    def top_texts(self, query, top_k=5):
+        return [self.texts[i] for i, _ in self.search(query, top_k=top_k)]
@@ -1,19 +1,148 @@
 # 기업 리스크 요약 및 파일 저장
-from llm_utils import query_llm, summarize_texts_in_chunks
+from llm_utils import query_llm, summarize_texts_in_chunks, PRIORITY_HIGH, LLM_EMPTY_SUMMARY
 from utils import save_summary_to_file
 from industry_utils import map_to_category, search_industries_by_company
-from dart_api import get_corp_code, get_recent_filings, get_yearly_key_reports
-from news import news_search_and_summary_with_risk
+from industry_risk import generate_accounting_risks_for_industry
+from dart_api import get_corp_code, get_recent_filings, get_yearly_key_reports, encode_filings, decode_filings
+from news import news_search_and_summary_with_risk, NEWS_FALLBACK_PREFIX
+from deadline import DeadlineExceeded, expired
+from memory_utils import MemoryBudgetExceeded
 import time
+import textwrap
 import pandas as pd
 
+# 모든 관련 산업별로 리스크 키워드/이슈 출력, 줄바꿈 40~50자
+def wrap_lines(text, width=45):
+    lines = []
+    for l in text.split('\n'):
+        lines.extend(textwrap.wrap(l, width=width, replace_whitespace=False))
+    return '\n'.join(lines)
+
+# 리포트 단계별 입력 의존관계 (입력이 바뀐 단계와 그 하위 단계만 다시 계산)
+REPORT_STAGE_DEPENDENCIES = {
+    "ratios": [],
+    "peers": ["ratios"],
+    "filings": [],
+    "yearly_reports": [],
+    "news": [],
+    "industry_risk": ["filings", "yearly_reports"],
+    "filings_summary": ["filings", "yearly_reports"],
+    "news_summary": ["news"],
+    "finratio_analysis": ["ratios", "peers"],
+    "integrated_analysis": ["filings_summary", "news_summary", "ratios", "peers"],
+}
+
+def dependent_stages(stages):
+    """stages와 이를 입력으로 쓰는 모든 하위 단계 집합"""
+    result = set(stages)
+    changed = True
+    while changed:
+        changed = False
+        for stage, deps in REPORT_STAGE_DEPENDENCIES.items():
+            if stage not in result and result.intersection(deps):
+                result.add(stage)
+                changed = True
+    return result
+
+# 체크포인트(JSON)에 레코드 객체로 저장하는 단계의 (encode, decode)
+STAGE_CODECS = {
+    "filings": (encode_filings, decode_filings),
+    "yearly_reports": (encode_filings, decode_filings),
+}
+
+# 저장 형식이 바뀐 단계의 체크포인트 형식 버전 (filings는 [텍스트, 건수], news는 문자열이던 이전 형식을 재사용하지 않고 다시 계산)
+STAGE_FORMAT_VERSIONS = {
+    "filings": 2,
+    "yearly_reports": 2,
+    "news": 2,
+}
+
+def encode_stage_value(stage, value):
+    """단계 결과 → 체크포인트 저장 값 (형식 버전이 있는 단계는 {"format": 버전, "value": 값})"""
+    codec = STAGE_CODECS.get(stage)
+    encoded = codec[0](value) if codec else value
+    version = STAGE_FORMAT_VERSIONS.get(stage)
+    return {"format": version, "value": encoded} if version else encoded
+
+def saved_stage_value(checkpoint, stage):
+    """체크포인트에 저장된 단계 값(인코딩된 형태). 없거나 이전 형식이면 None"""
+    saved = checkpoint.get(stage) if checkpoint is not None else None
+    version = STAGE_FORMAT_VERSIONS.get(stage)
+    if saved is None or version is None:
+        return saved
+    if isinstance(saved, dict) and saved.get("format") == version:
+        return saved["value"]
+    print(f"[INFO] 이전 형식 체크포인트 무시: {stage}")
+    return None
+
+class StageIncomplete(Exception):
+    """단계 함수가 LLM 호출 실패 등으로 대체 결과만 만든 경우: value는 이번 리포트에 쓰고 체크포인트에는 저장하지 않음 (다음 실행에서 재시도)"""
+    def __init__(self, value, reason):
+        super().__init__(reason)
+        self.value = value
+
+def require_llm_text(text):
+    """LLM 단계 결과 확인: 빈 응답(query_llm은 API 실패 시 빈 문자열 반환)이면 StageIncomplete"""
+    if not (text and text.strip()):
+        raise StageIncomplete(text or "", "LLM 응답 없음")
+    return text
+
+def require_news_summaries(chunks):
+    """news 단계 결과 확인: 기사 요약이 실패해 원문 일부로 대신한 chunk가 있으면 StageIncomplete (다음 실행에서 캐시에 없는 기사만 다시 요약)"""
+    failed = sum(1 for chunk in chunks if NEWS_FALLBACK_PREFIX in chunk)
+    if failed:
+        raise StageIncomplete(chunks, f"뉴스 chunk {len(chunks)}개 중 {failed}개에 기사 요약 실패")
+    return chunks
+
+# 단계 함수 밖에서 결과를 체크포인트에 넣을 때(async_api 미리 가져오기) 쓰는 결과 확인 함수
+STAGE_RESULT_CHECKS = {
+    "news": require_news_summaries,
+}
+
+def run_stage(checkpoint, stage, fn, cost_ratio=1.0, incomplete=None):
+    """
+    체크포인트에 저장된 단계 결과가 있으면 재사용하고, 없으면 실행 후 저장
+    실행 시간은 리포트 예산의 단계별 예상 소요로 기록 (cost_ratio: 축약 실행이면 그 비율로 나눠 전체 실행 기준으로 환산)
+    fn이 StageIncomplete를 내면 그 값을 반환하되 저장하지 않음
+    incomplete: 이번 실행에서 저장하지 않는 단계 집합 (시간 예산으로 축약/생략한 단계 포함, 입력 단계가 여기 있으면 이 단계도 저장하지 않고 추가)
+    """
+    codec = STAGE_CODECS.get(stage)
+    from results_catalog import note_stage
+    saved = saved_stage_value(checkpoint, stage)
+    if saved is not None:
+        print(f"[INFO] 체크포인트 재사용: {stage}")
+        note_stage(stage, saved)
+        return codec[1](saved) if codec else saved
+    from memory_utils import track_stage
+    from report_tiers import record_stage_seconds
+    started = time.monotonic()
+    complete = True
+    with track_stage(stage):
+        try:
+            value = fn()
+        except StageIncomplete as e:
+            print(f"[경고] {stage} 결과 불완전({e}), 체크포인트에 저장하지 않음")
+            value, complete = e.value, False
+    record_stage_seconds(stage, (time.monotonic() - started) / cost_ratio)
+    encoded = encode_stage_value(stage, value)
+    note_stage(stage, encoded["value"] if stage in STAGE_FORMAT_VERSIONS else encoded)
+    # 마감이 지난 뒤 끝난 단계는 중간에 실패한 호출이 섞였을 수 있으므로 재시도에서 재사용하지 않음
+    # 저장하지 않은 입력으로 만든 결과도 다음 실행에서 입력과 함께 다시 계산
+    if expired() or (incomplete is not None and incomplete.intersection([stage] + REPORT_STAGE_DEPENDENCIES.get(stage, []))):
+        complete = False
+    if not complete and incomplete is not None:
+        incomplete.add(stage)
+    if checkpoint is not None and complete:
+        checkpoint.put(stage, encoded)
+    return value
+
 # 연도별 주요보고서 요약 및 키워드 추출
 def format_yearly_key_reports(yearly_key_reports, llm_api_key, skip_llm=False):
     from collections import defaultdict
     results = []
     grouped = defaultdict(list)
-    for year, report_name, text in yearly_key_reports:
-        grouped[year].append((report_name, text))
+    for filing in yearly_key_reports:
+        grouped[filing.year].append((filing.report_nm, filing.document()))
     for year in sorted(grouped.keys(), reverse=True):
         results.append(f"[{year}]")
         for report_name, text in grouped[year]:
@@ -24,53 +153,57 @@ def format_yearly_key_reports(yearly_key_reports, llm_api_key, skip_llm=False):
                 # LLM 요약
                 prompt = f"아래는 {year}년 {report_name} 주요 내용입니다. 핵심 내용을 2-3문장으로 요약해줘.\n{text}"
                 try:
-                    summary = query_llm(llm_api_key, prompt, temperature=0.8).strip()
+                    summary = query_llm(llm_api_key, prompt, task="summary").strip()
                 except Exception:
                     summary = "(LLM 요약 실패)"
                 kw_prompt = f"아래 텍스트에서 리스크(위험, 부정, 우려, 부실, 손실, 규제, 소송, 부채, 부정적 변화 등)와 관련된 핵심 키워드만 한글로 5개 이내로 추출해줘. 키워드만 콤마로 구분해서 답변해줘.\n{text}"
                 try:
-                    keywords = query_llm(llm_api_key, kw_prompt, temperature=0.7).strip()
+                    keywords = query_llm(llm_api_key, kw_prompt, task="keywords").strip()
                 except Exception as e:
                     keywords = "(LLM 키워드 추출 실패)"
                     print(f"[ERROR] LLM 키워드 추출 실패: {e}")
                 results.append(f"- {report_name}\n  요약: {summary}\n  리스크 키워드: {keywords}")
     return results
 
-def summarize_company_risks(company_name, api_key, llm_api_key, since_date, financial_summary, naver_client_id=None, naver_client_secret=None):
+def summarize_company_risks(company_name, api_key, llm_api_key, since_date, financial_summary, naver_client_id=None, naver_client_secret=None, save=True, checkpoint=None, peer_summary=None, tier=None, budget=None, naver_pool=None, log=print):
+    # checkpoint: get(stage)/put(stage, value)를 제공하는 객체 (job_queue 재시도 시 완료된 단계 재사용)
+    # peer_summary: 동종업계 백분위 텍스트 (peer_index.peer_percentiles_for_report)
+    # log: 공시/뉴스 건수 부족 같은 경고 출력 함수 (작업 큐/서비스의 작업 로그)
+    # naver_pool: 네이버 키 풀(CredentialPool), 주면 naver_client_id/secret 대신 사용
+    # tier/budget: 리포트 모드(quick/standard/deep)와 시간 예산 (report_tiers.ReportBudget, 없으면 tier로 새로 생성)
+    from report_tiers import ReportBudget
+    budget = budget or ReportBudget(tier)
+    # 이번 실행에서 체크포인트에 저장하지 않는 단계 (하위 단계도 저장하지 않음)
+    incomplete = set(getattr(checkpoint, "incomplete", ()))
+    def plan(stage):
+        decision = budget.plan(stage, reusable=saved_stage_value(checkpoint, stage) is not None)
+        # 축약/생략한 결과는 전체 결과와 같은 키로 저장하지 않음 (재시도에서 전체 결과로 재사용되고 리포트 표시도 빠지므로)
+        if decision in ("short", "skip"):
+            incomplete.add(stage)
+        return decision
+    def run_budgeted(stage, fn, fallback):
+        # 리포트 마감(deadline.py)이 지나 중단된 단계는 생략으로 표시하고 fallback으로 계속 진행
+        try:
+            return run_stage(checkpoint, stage, fn, budget.cost_ratio(stage), incomplete)
+        except DeadlineExceeded as e:
+            print(f"[경고] {e}: {stage} 생략")
+            budget.decisions[stage] = "skip"
+            incomplete.add(stage)
+            return fallback
     # 산업/카테고리 및 리스크 키워드/이슈 추출
     corp_code = get_corp_code(api_key, company_name)
     industries = []
     industry_risk_keywords = ""
-    # (1) LLM 기반 산업명 직접 추출
-    import textwrap
+    # (1) KSIC 기반 산업명 추출
     try:
         from llm_utils import query_llm
         
-        print(f"[DEBUG] LLM 기반 산업명 추출 시작: {company_name}")
-        
-        # LLM에 회사명을 직접 질의하여 산업명 추출
-        industry_prompt = f"""{company_name}의 주요 산업 분야를 2-3개 나열해주세요.
-다음 규칙을 따라주세요:
-1. 회사명이 아닌 실제 산업 분야만 나열해주세요
-2. 각 산업명은 한 줄에 하나씩 나열해주세요
-3. 불필요한 설명이나 부연 설명 없이 산업명만 간단히 나열해주세요
-
-예시:
-배터리
-에너지저장
-전기차"""
+        print(f"[DEBUG] 산업명 추출 시작 (KSIC 로컬 조회): {company_name}")
         
-        llm_response = query_llm(llm_api_key, industry_prompt, temperature=0.3)
-        
-        if llm_response and llm_response.strip():
-            # LLM 응답에서 산업명 추출
-            industries = [line.strip() for line in llm_response.strip().split('\n') if line.strip()]
-            # 빈 문자열이나 너무 짧은 것 제거
-            industries = [ind for ind in industries if len(ind) >= 2 and len(ind) <= 20]
-            print(f"[DEBUG] LLM에서 추출된 산업명: {industries}")
-        else:
-            print("[DEBUG] LLM 산업명 추출 실패, 기본값 사용")
-            industries = ["기타"]
+        # DART induty_code → 번들 KSIC 표 조회 (회사→산업 캐시 사용, 알 수 없는 코드만 LLM fallback)
+        industries = search_industries_by_company(company_name, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, dart_api_key=api_key, llm_api_key=llm_api_key, corp_code=corp_code, naver_pool=naver_pool)
+        industries = [ind for ind in industries if len(ind) >= 2 and len(ind) <= 30]
+        print(f"[DEBUG] 추출된 산업명: {industries}")
 
         
         if not industries:
@@ -91,7 +224,7 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
                 try:
                     from llm_utils import query_llm
                     fallback_prompt = f"'{company_name}'은 어떤 산업에 속하는 회사인가요? 산업명 1-2개만 간단히 답해주세요. 예: 전자, 에너지, 제조, 금융 등"
-                    llm_result = query_llm(llm_api_key, fallback_prompt, temperature=0.5).strip()
+                    llm_result = query_llm(llm_api_key, fallback_prompt, task="industry").strip()
                     if llm_result and len(llm_result) > 2:
                         industries = [llm_result]
                         print(f"[DEBUG] LLM fallback 성공: {industries}")
@@ -105,8 +238,8 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
         if not industries:
             industries = ["기타"]
         # LLM 기반 감사보고서와 산업명 연관성 판단 후 핵심감사사항 추출 함수
-        def extract_audit_matters_from_reports(all_filings, industry_name):
-            """감사보고서에서 LLM을 통해 해당 산업과 연관된 핵심감사사항을 추출"""
+        def extract_audit_matters_from_reports(filings_index, industry_name, max_sections=2, failures=None):
+            """감사보고서에서 LLM을 통해 해당 산업과 연관된 핵심감사사항을 추출 (점수 상위 max_sections개 섹션만 LLM 판단, LLM 실패 시 failures에 산업명 추가)"""
             try:
                 from llm_utils import query_llm
                 
@@ -115,23 +248,19 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
                 # 핵심감사사항 관련 키워드
                 audit_keywords = ["핵심감사사항", "핵심 감사사항", "key audit matter", "kam", "중요한 감사사항"]
                 
-                # 감사보고서에서 핵심감사사항 섹션 찾기
-                audit_sections = []
-                for filing in all_filings:
-                    if any(keyword in filing.lower() for keyword in audit_keywords):
-                        lines = filing.split('\n')
-                        for i, line in enumerate(lines):
-                            if any(keyword in line.lower() for keyword in audit_keywords):
-                                # 핵심감사사항 섹션 이후 20줄 추출 (더 많은 컨텍스트)
-                                context = '\n'.join(lines[i:i+20]).strip()
-                                if len(context) > 100:  # 의미있는 내용인지 확인
-                                    audit_sections.append(context[:1000])  # 최대 1000자
+                # BM25 인덱스에서 "산업명 + 핵심감사사항/리스크" 상위 passage만 선별
+                query = f"{industry_name} {' '.join(audit_keywords)} 감사 위험 리스크"
+                audit_sections = [
+                    passage[:1000]  # 최대 1000자
+                    for passage in filings_index.top_texts(query, top_k=5)
+                    if len(passage) > 100 and any(keyword in passage.lower() for keyword in audit_keywords)
+                ]
                 
                 if not audit_sections:
                     return []
                 
                 # LLM에 감사보고서와 산업명 연관성 판단 요청
-                for section in audit_sections[:3]:  # 최대 3개 섹션만 처리
+                for section in audit_sections[:max_sections]:  # 점수 상위 섹션만 처리
                     matching_prompt = f"""다음은 감사보고서의 핵심감사사항 내용입니다:
 
 {section}
@@ -145,7 +274,9 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
 - 연관 있는 경우: "배터리 제조 공정의 원가 계산 및 재고 평가에 대한 감사 위험이 식별되었습니다."
 - 연관 없는 경우: "연관없음"""
                     
-                    llm_response = query_llm(llm_api_key, matching_prompt, temperature=0.3)
+                    llm_response = query_llm(llm_api_key, matching_prompt, task="kam_match")
+                    if not (llm_response and llm_response.strip()) and failures is not None:
+                        failures.append(industry_name)
                     
                     if llm_response and llm_response.strip() and "연관없음" not in llm_response:
                         # 연관된 핵심감사사항 발견
@@ -153,31 +284,18 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
                 
                 return audit_matters[:3]  # 최대 3개만 반환
                 
+            except MemoryBudgetExceeded:
+                raise
             except Exception as e:
                 print(f"[DEBUG] LLM 기반 핵심감사사항 추출 실패 ({industry_name}): {e}")
+                if failures is not None:
+                    failures.append(industry_name)
                 return []
         
-        # LLM을 통한 회계리스크 이슈 생성 함수
-        def generate_accounting_risks_for_industry(industry_name, llm_api_key):
-            """특정 산업의 회계리스크 이슈를 LLM에 질의하여 생성"""
-            try:
-                from llm_utils import query_llm  # 함수 내부에서 import
-                
-                prompt = f"""{industry_name} 산업의 주요 회계리스크 이슈를 4-5개 나열해줘. 
-각 항목은 다음과 같은 형식으로 작성해줘:
-- (구체적인 회계리스크 이슈 설명)
-
-실제 {industry_name} 산업의 특성을 반영하여 구체적이고 전문적으로 작성해줘.
-예시: 매출 인식, 재고 평가, 자산 손상, 충당부채, 관계사 거래 등과 관련된 리스크"""
-                
-                response = query_llm(llm_api_key, prompt, temperature=0.7).strip()
-                return response if response else "회계리스크 이슈 생성에 실패했습니다."
-            except Exception as e:
-                print(f"[DEBUG] 회계리스크 생성 실패 ({industry_name}): {e}")
-                return "회계리스크 이슈 생성에 실패했습니다."
-        
         # 산업별 리스크 처리는 all_filings 정의 이후로 이동
         industry_risk_keywords = "(산업별 리스크 처리는 데이터 로드 이후 수행됩니다)"
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         print(f"[DEBUG] 산업별 리스크 처리 중 예외 발생: {e}")
         # 정제된 산업명이 있으면 유지, 없으면 기타로 설정
@@ -197,115 +315,141 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
     categories_str = "- " + "\n- ".join(industries)
 
     # 공시/보고서 chunk 생성
-    filings, filings_count = get_recent_filings(api_key, corp_code, since_date, count=40, max_length=600, return_count=True)
-    filings_list = []
-    if isinstance(filings, list):
-        for f in filings:
-            date = f.get('date', '') if isinstance(f, dict) else ''
-            title = f.get('title', '') if isinstance(f, dict) else str(f)
-            content = f.get('content', '') if isinstance(f, dict) else ''
-            chunk = f"[{date}] {title}\n{content.strip()[:800]}"
-            if chunk.strip():
-                filings_list.append(chunk)
+    filings_plan = plan("filings")
+    if filings_plan in ("full", "short"):
+        filings_count = budget.option("filings_count", 40) if filings_plan == "full" else 15
+        filings = run_budgeted("filings", lambda: get_recent_filings(api_key, corp_code, since_date, count=filings_count, log=log), [])
     else:
-        filings_list = [line for line in filings.split('\n') if not line.startswith('[경고]') and line.strip()]
+        filings = []
+    filings_list = [filing.line() for filing in filings]
 
     # 연도별 주요보고서 chunk 생성
     import time
     current_year = int(time.strftime('%Y'))
     years = [current_year - 1 - i for i in range(5)]
-    yearly_key_reports = get_yearly_key_reports(api_key, corp_code, years, max_length=1000)
-    yearly_key_texts = [f"[{year}] {report_name}\n{text[:800]}" for year, report_name, text in yearly_key_reports if text.strip()]
+    # 사업보고서/감사보고서 원문의 감사보고서·핵심감사사항 섹션 포함 (rcept_no 단위 캐시)
+    # 축약 시 원문(document.xml) 없이 공시 목록만 사용
+    yearly_plan = plan("yearly_reports")
+    if yearly_plan in ("full", "short"):
+        yearly_key_reports = run_budgeted("yearly_reports", lambda: get_yearly_key_reports(api_key, corp_code, years, fetch_documents=yearly_plan == "full"), [])
+    else:
+        yearly_key_reports = []
+    document_chars = budget.option("document_chars", 800)
+    yearly_key_texts = [f"[{filing.year}] {filing.report_nm}\n{filing.document()[:document_chars]}" for filing in yearly_key_reports]
     all_filings = filings_list + yearly_key_texts
+    # 핵심감사사항 검색용 원문 (보고서당 최대 8000자)
+    audit_source_texts = filings_list + [f"[{filing.year}] {filing.report_nm}\n{filing.document()[:8000]}" for filing in yearly_key_reports]
 
     # 뉴스 chunk 생성
     from news import news_search_and_summary_with_risk
-    news_texts = news_search_and_summary_with_risk(company_name, since_date, financial_summary, llm_api_key, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, min_news=40)
-    news_list = []
-    if isinstance(news_texts, list):
-        for n in news_texts:
-            title = n.get('title', '') if isinstance(n, dict) else str(n)
-            content = n.get('content', '') if isinstance(n, dict) else ''
-            chunk = f"{title}\n{content.strip()[:800]}"
-            if chunk.strip():
-                news_list.append(chunk)
+    news_plan = plan("news")
+    if news_plan in ("full", "short"):
+        news_count = budget.option("news_count", 40) if news_plan == "full" else 15
+        news_list = run_budgeted("news", lambda: require_news_summaries(news_search_and_summary_with_risk(company_name, since_date, financial_summary, llm_api_key, naver_client_id=naver_client_id, naver_client_secret=naver_client_secret, min_news=news_count, max_news=news_count, naver_pool=naver_pool, log=log)), [])
     else:
-        news_list = [line for line in news_texts.split('\n') if not line.startswith('[경고]') and line.strip()]
+        news_list = []
 
     max_item_length = 1000
     all_filings = [item[:max_item_length] for item in all_filings]
     news_list = [item[:max_item_length] for item in news_list]
 
     # 산업별 리스크 처리 (이제 all_filings가 정의되었으므로 안전하게 수행 가능)
-    try:
-        print(f"[DEBUG] 산업별 리스크 처리 시작: {industries}")
+    def build_industry_risk_keywords():
+        try:
+            print(f"[DEBUG] 산업별 리스크 처리 시작: {industries}")
         
-        # 중복 방지를 위한 처리된 산업 추적
-        processed_industries = set()
+            # 중복 방지를 위한 처리된 산업 추적
+            processed_industries = set()
         
-        # 모든 관련 산업별로 리스크 키워드/이슈 출력, 줄바꿈 40~50자
-        def wrap_lines(text, width=45):
-            lines = []
-            for l in text.split('\n'):
-                lines.extend(textwrap.wrap(l, width=width, replace_whitespace=False))
-            return '\n'.join(lines)
+            industry_risk_keywords = ''
         
-        industry_risk_keywords = ''
+            # 공시/보고서 passage BM25 인덱스 (산업별 핵심감사사항 검색에 재사용)
+            from retrieval import LexicalIndex, split_passages
+            from report_tiers import record_stage_seconds
+            filings_index = LexicalIndex(split_passages(audit_source_texts, max_chars=1000))
+            # 핵심감사사항 LLM 판단 섹션 수 (모드별, 시간 예산 부족 시 1개 또는 생략)
+            kam_plan = budget.plan("kam")
+            kam_sections = budget.option("kam_sections", 2) if kam_plan == "full" else 1 if kam_plan == "short" else 0
+            kam_seconds = 0.0
+            # LLM 호출이 실패한 산업 (결과는 리포트에 쓰되 체크포인트에 저장하지 않음)
+            failures = []
         
-        # 각 산업별로 개별 처리 (중복 방지)
-        for ind in industries:
-            # 이미 처리된 산업인지 확인 (유사한 산업명 중복 방지)
-            if any(processed_ind in ind or ind in processed_ind for processed_ind in processed_industries):
-                continue
+            # 각 산업별로 개별 처리 (중복 방지)
+            for ind in industries:
+                # 이미 처리된 산업인지 확인 (유사한 산업명 중복 방지)
+                if any(processed_ind in ind or ind in processed_ind for processed_ind in processed_industries):
+                    continue
                 
-            processed_industries.add(ind)
+                processed_industries.add(ind)
             
-            # 항상 원래 산업명 표시
-            industry_risk_keywords += f"[{ind}]\n"
+                # 항상 원래 산업명 표시
+                industry_risk_keywords += f"[{ind}]\n"
             
-            # 1. 핵심감사사항: 감사보고서에서 추출
-            audit_matters = extract_audit_matters_from_reports(all_filings, ind)
+                # 1. 핵심감사사항: 감사보고서에서 추출
+                kam_started = time.monotonic()
+                audit_matters = extract_audit_matters_from_reports(filings_index, ind, kam_sections, failures) if kam_sections else []
+                kam_seconds += time.monotonic() - kam_started
             
-            industry_risk_keywords += "핵심감사사항:\n"
-            if audit_matters:
-                for matter in audit_matters[:3]:  # 최대 3개만 표시
-                    # 간단히 정리하여 표시
-                    clean_matter = matter.replace('\n', ' ').strip()[:200] + "..."
-                    industry_risk_keywords += f"- {clean_matter}\n"
-            else:
-                industry_risk_keywords += "- 해당 내용 관련 핵심감사사항이 표기되지 않았습니다.\n"
+                industry_risk_keywords += "핵심감사사항:\n"
+                if not kam_sections:
+                    industry_risk_keywords += f"- {budget.placeholder('kam')}\n"
+                elif audit_matters:
+                    for matter in audit_matters[:3]:  # 최대 3개만 표시
+                        # 간단히 정리하여 표시
+                        clean_matter = matter.replace('\n', ' ').strip()[:200] + "..."
+                        industry_risk_keywords += f"- {clean_matter}\n"
+                else:
+                    industry_risk_keywords += "- 해당 내용 관련 핵심감사사항이 표기되지 않았습니다.\n"
             
-            # 2. 주요 회계리스크 이슈: LLM에 질의
-            industry_risk_keywords += "\n주요 회계리스크 이슈:\n"
-            accounting_risks = generate_accounting_risks_for_industry(ind, llm_api_key)
+                # 2. 주요 회계리스크 이슈: 산업 리스크 라이브러리 조회 (없을 때만 LLM 생성)
+                industry_risk_keywords += "\n주요 회계리스크 이슈:\n"
+                accounting_risks = generate_accounting_risks_for_industry(ind, llm_api_key)
             
-            # 응답을 정리하여 표시
-            if accounting_risks and "실패" not in accounting_risks:
-                # LLM 응답에서 불필요한 부분 제거 및 정리
-                risk_lines = accounting_risks.split('\n')
-                for line in risk_lines:
-                    line = line.strip()
-                    if line and not line.startswith(ind) and not line.startswith('주요'):
-                        if not line.startswith('-'):
-                            line = f"- {line}"
-                        industry_risk_keywords += f"{line}\n"
-            else:
-                industry_risk_keywords += "- 회계리스크 이슈 생성에 실패했습니다.\n"
+                # 응답을 정리하여 표시
+                if accounting_risks and "실패" not in accounting_risks:
+                    # LLM 응답에서 불필요한 부분 제거 및 정리
+                    risk_lines = accounting_risks.split('\n')
+                    for line in risk_lines:
+                        line = line.strip()
+                        if line and not line.startswith(ind) and not line.startswith('주요'):
+                            if not line.startswith('-'):
+                                line = f"- {line}"
+                            industry_risk_keywords += f"{line}\n"
+                else:
+                    industry_risk_keywords += "- 회계리스크 이슈 생성에 실패했습니다.\n"
+                    failures.append(ind)
             
-            industry_risk_keywords += "\n"  # 산업 간 구분을 위한 빈 줄
+                industry_risk_keywords += "\n"  # 산업 간 구분을 위한 빈 줄
         
-        industry_risk_keywords = industry_risk_keywords.strip()
-        print(f"[DEBUG] 산업별 리스크 처리 완료")
+            industry_risk_keywords = industry_risk_keywords.strip()
+            if kam_sections:
+                record_stage_seconds("kam", kam_seconds / budget.cost_ratio("kam"))
+            print(f"[DEBUG] 산업별 리스크 처리 완료")
+            if failures:
+                raise StageIncomplete(industry_risk_keywords, f"LLM 실패 산업: {', '.join(dict.fromkeys(failures))}")
+            if kam_plan in ("short", "skip"):
+                raise StageIncomplete(industry_risk_keywords, "시간 예산으로 핵심감사사항 축약")
         
-    except Exception as e:
-        print(f"[DEBUG] 산업별 리스크 처리 중 예외: {e}")
-        # 기본 리스크 정보 제공
-        industry_risk_keywords = ''
-        for ind in industries:
-            industry_risk_keywords += f"[{ind}]\n"
-            industry_risk_keywords += "핵심감사사항:\n- 해당 내용 관련 핵심감사사항이 표기되지 않았습니다.\n"
-            industry_risk_keywords += "\n주요 회계리스크 이슈:\n- 회계리스크 이슈 생성에 실패했습니다.\n\n"
-        industry_risk_keywords = industry_risk_keywords.strip()
+        except StageIncomplete:
+            raise
+        except MemoryBudgetExceeded:
+            raise
+        except Exception as e:
+            print(f"[DEBUG] 산업별 리스크 처리 중 예외: {e}")
+            # 기본 리스크 정보 제공
+            industry_risk_keywords = ''
+            for ind in industries:
+                industry_risk_keywords += f"[{ind}]\n"
+                industry_risk_keywords += "핵심감사사항:\n- 해당 내용 관련 핵심감사사항이 표기되지 않았습니다.\n"
+                industry_risk_keywords += "\n주요 회계리스크 이슈:\n- 회계리스크 이슈 생성에 실패했습니다.\n\n"
+            raise StageIncomplete(industry_risk_keywords.strip(), f"산업별 리스크 처리 예외: {e}")
+        return industry_risk_keywords
+    if plan("industry_risk") == "full":
+        industry_risk_keywords = run_stage(checkpoint, "industry_risk", build_industry_risk_keywords, incomplete=incomplete)
+    else:
+        industry_risk_keywords = budget.placeholder("industry_risk")
+    # 핵심감사사항 검색용 원문(보고서당 최대 8000자)은 더 이상 쓰지 않으므로 즉시 해제
+    del audit_source_texts, yearly_key_reports
 
     # 공시/보고서 요약 스킵 여부
     skip_llm = False
@@ -314,51 +458,54 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
 
     # 공시/보고서 요약 (최신 공시 40개 + 최근 5년 재무제표/감사/사업보고서, 최소 7개 chunk)
     filings_list_limited = filings_list[:40] if len(filings_list) > 40 else filings_list
-    yearly_key_texts_limited = yearly_key_texts[:5] if len(yearly_key_texts) > 5 else yearly_key_texts
+    yearly_texts_count = budget.option("yearly_texts", 5)
+    yearly_key_texts_limited = yearly_key_texts[:yearly_texts_count] if len(yearly_key_texts) > yearly_texts_count else yearly_key_texts
     all_filings_limited = filings_list_limited + yearly_key_texts_limited
-    # 최소 7개 chunk가 나오도록 분할
-    min_chunks = 7
+    # 최소 7개 chunk가 나오도록 분할 (시간 예산 부족 시 3개, chunk_size=1 재요약 생략)
+    filings_summary_plan = plan("filings_summary")
+    min_chunks = 7 if filings_summary_plan == "full" else 3
     chunk_size = max(1, len(all_filings_limited) // min_chunks)
     if chunk_size * min_chunks < len(all_filings_limited):
         chunk_size += 1
-    summarized_filings = summarize_texts_in_chunks(all_filings_limited, llm_api_key, chunk_size=chunk_size) if (all_filings_limited and not skip_llm) else []
-    if summarized_filings and len(summarized_filings) < min_chunks:
-        # 부족할 경우 chunk_size=1로 재요약
-        summarized_filings = summarize_texts_in_chunks(all_filings_limited, llm_api_key, chunk_size=1)
+    def summarize_filings():
+        summarized = summarize_texts_in_chunks(all_filings_limited, llm_api_key, chunk_size=chunk_size) if (all_filings_limited and not skip_llm) else []
+        if summarized and len(summarized) < min_chunks and filings_summary_plan == "full":
+            # 부족할 경우 chunk_size=1로 재요약
+            summarized = summarize_texts_in_chunks(all_filings_limited, llm_api_key, chunk_size=1)
+        failed = sum(1 for s in summarized if s == LLM_EMPTY_SUMMARY)
+        if failed:
+            raise StageIncomplete(summarized, f"chunk {len(summarized)}개 중 {failed}개 LLM 요약 실패")
+        return summarized
+    if filings_summary_plan in ("full", "short"):
+        summarized_filings = run_budgeted("filings_summary", summarize_filings, [])
+    else:
+        summarized_filings = []
     def format_alpha_chunks(chunks):
         alpha = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
         return '\n\n'.join([f"{alpha[i%26]}. {chunk}" for i, chunk in enumerate(chunks)])
 
-    # 뉴스 요약 (최신 40개, 최소 7개 chunk)
-    news_list_limited = news_list[:40] if len(news_list) > 40 else news_list
-    news_min_chunks = 7
-    news_max_chunks = 10
-    # chunk_size를 조정해 7~10개 chunk가 되도록 분할
-    if len(news_list_limited) < news_min_chunks:
-        news_chunk_size = 1
-    else:
-        news_chunk_size = max(1, len(news_list_limited) // news_max_chunks)
-    summarized_news = summarize_texts_in_chunks(news_list_limited, llm_api_key, chunk_size=news_chunk_size) if (news_list_limited and not skip_llm) else []
-    # 부족하면 chunk_size=1로 재분할
-    if summarized_news and len(summarized_news) < news_min_chunks:
-        summarized_news = summarize_texts_in_chunks(news_list_limited, llm_api_key, chunk_size=1)
-    # 10개 초과하지 않도록 슬라이싱
-    summarized_news = summarized_news[:news_max_chunks] if summarized_news else []
-
     if summarized_filings:
         summarized_filings = [s if s.strip() else f'(원문 일부) {all_filings_limited[i][:200]}' for i, s in enumerate(summarized_filings)]
     wrapped_filings_summary = format_alpha_chunks(summarized_filings[:10]) if summarized_filings else '\n'.join([f'(원문 일부) {item[:200]}' for item in all_filings[:10]]) if all_filings else '(요약 없음)'
+    if filings_summary_plan in ("skip", "off") and not all_filings:
+        wrapped_filings_summary = budget.placeholder("filings_summary")
     filings_summary_str = wrapped_filings_summary
 
-    # 뉴스 요약
+    # 뉴스 요약 (news 단계의 chunk는 이미 캐시된 기사 요약을 묶은 것이므로 다시 LLM 요약하지 않음)
     news_list_limited = news_list[:10] if len(news_list) > 10 else news_list
-    summarized_news = summarize_texts_in_chunks(news_list_limited, llm_api_key, chunk_size=1) if (news_list_limited and not skip_llm) else []
+    news_summary_plan = plan("news_summary")
+    if news_summary_plan == "full":
+        summarized_news = run_stage(checkpoint, "news_summary", lambda: list(news_list_limited) if (news_list_limited and not skip_llm) else [], incomplete=incomplete)
+    else:
+        summarized_news = []
     def format_alpha_news(chunks):
         alpha = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
         return '\n\n'.join([f"{alpha[i%26]}. {chunk}" for i, chunk in enumerate(chunks)])
     if summarized_news:
         summarized_news = [s if s.strip() else f'(원문 일부) {news_list_limited[i][:200]}' for i, s in enumerate(summarized_news)]
     wrapped_news_summary = format_alpha_news(summarized_news[:10]) if summarized_news else '\n'.join([f'(원문 일부) {item[:200]}' for item in news_list[:10]]) if news_list else '(요약 없음)'
+    if news_summary_plan in ("skip", "off") and not news_list:
+        wrapped_news_summary = budget.placeholder("news_summary")
     news_summary_str = wrapped_news_summary
 
     # 재무비율 표 생성 및 LLM 해설/통합분석 복원
@@ -377,15 +524,33 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
     else:
         print("[DEBUG] 재무비율 DataFrame이 비어있거나 올바르지 않습니다.")
         ratios_table = "(재무비율 데이터 없음)"
+    # LLM 프롬프트용 압축 재무비율 (지표별 한 줄, 반올림 + 추세 표시)
+    from prompt_utils import PromptStats, build_compact_prompt, compact_ratio_table, estimate_tokens
+    prompt_stats = PromptStats()
+    compact_ratios = compact_ratio_table(financial_summary) if isinstance(financial_summary, pd.DataFrame) else "(재무비율 데이터 없음)"
+    peer_summary_str = peer_summary.strip() if peer_summary and peer_summary.strip() else "(동종업계 비교 데이터 없음)"
     # LLM 해설: 표가 있으면 항상 분석
     try:
         from llm_utils import query_llm  # 함수 내부에서 import
         
-        if ratios_table.strip() and ratios_table.strip() != "(재무비율 데이터 없음)":
-            finratio_llm_analysis = query_llm(llm_api_key, f"아래는 주요 재무비율 표입니다. 표를 참고하여 최근 5개년의 재무 건전성, 성장성, 수익성, 위험성, 주요 리스크 신호를 5문장 이내로 요약해줘:\n{ratios_table}", temperature=0.7)
+        finratio_plan = plan("finratio_analysis")
+        if finratio_plan in ("skip", "off"):
+            wrapped_finratio_llm_analysis = budget.placeholder("finratio_analysis")
+        elif ratios_table.strip() and ratios_table.strip() != "(재무비율 데이터 없음)":
+            finratio_prompt = f"아래는 주요 재무비율(지표 연도:값, 끝 기호는 추세)입니다. 최근 5개년의 재무 건전성, 성장성, 수익성, 위험성, 주요 리스크 신호를 5문장 이내로 요약해줘:\n{compact_ratios}"
+            # 압축 전 프롬프트: 같은 지시를 markdown 재무비율 표로 보낼 때
+            original_finratio_prompt = f"아래는 주요 재무비율 표입니다. 표를 참고하여 최근 5개년의 재무 건전성, 성장성, 수익성, 위험성, 주요 리스크 신호를 5문장 이내로 요약해줘:\n{ratios_table}"
+            if peer_summary_str != "(동종업계 비교 데이터 없음)":
+                peer_prompt = f"\n\n[동종업계 백분위 (0=최저, 100=최고)]\n{peer_summary_str}\n동종업계 대비 높거나 낮은 지표도 언급해줘."
+                finratio_prompt += peer_prompt
+                original_finratio_prompt += peer_prompt
+            prompt_stats.record("재무비율 해설", estimate_tokens(original_finratio_prompt), estimate_tokens(finratio_prompt))
+            finratio_llm_analysis = run_stage(checkpoint, "finratio_analysis", lambda: require_llm_text(query_llm(llm_api_key, finratio_prompt, priority=PRIORITY_HIGH, task="analysis")), incomplete=incomplete)
             wrapped_finratio_llm_analysis = finratio_llm_analysis.strip() if finratio_llm_analysis else "(LLM 해설 없음)"
         else:
             wrapped_finratio_llm_analysis = "(재무비율 데이터 없음)"
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         print(f"[DEBUG] 재무비율 LLM 해설 실패: {e}")
         wrapped_finratio_llm_analysis = "(LLM 해설 실패)"
@@ -394,13 +559,36 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
     try:
         from llm_utils import query_llm  # 함수 내부에서 import
         
-        integrated_prompt = f"산업/카테고리: {industries}\n공시/보고서 요약: {filings_summary_str}\n뉴스 요약: {news_summary_str}\n주요 재무비율: {ratios_table}\n\n위 정보를 참고하여, 해당 기업의 최근 5년간 주요 리스크 요인과 시사점, 향후 주의해야 할 점을 5문장 이내로 종합 요약해줘."
-        integrated_llm_analysis = query_llm(llm_api_key, integrated_prompt, temperature=0.7)
+        # 섹션 간 중복 제거 + 섹션별/전체 토큰 예산 (우선순위: 산업 > 재무비율 > 공시 > 뉴스)
+        integrated_instruction = "위 정보를 참고하여, 해당 기업의 최근 5년간 주요 리스크 요인과 시사점, 향후 주의해야 할 점을 5문장 이내로 종합 요약해줘."
+        integrated_prompt = build_compact_prompt(
+            [
+                ("산업/카테고리", ", ".join(industries), 0, 60),
+                ("주요 재무비율", compact_ratios, 1, 400),
+                ("동종업계 백분위", peer_summary_str, 1, 250),
+                ("공시/보고서 요약", filings_summary_str, 2, 900),
+                ("뉴스 요약", news_summary_str, 3, 900),
+            ],
+            integrated_instruction,
+            total_budget=2000,
+            stats=prompt_stats,
+            name="통합 분석",
+            # 압축 전 프롬프트: 같은 입력(markdown 재무비율 표, 중복 제거/예산 없음)과 지시문
+            original_text=f"산업/카테고리: {industries}\n공시/보고서 요약: {filings_summary_str}\n뉴스 요약: {news_summary_str}\n주요 재무비율: {ratios_table}\n동종업계 백분위: {peer_summary_str}\n\n{integrated_instruction}",
+        )
+        plan("integrated_analysis")
+        integrated_llm_analysis = run_stage(checkpoint, "integrated_analysis", lambda: require_llm_text(query_llm(llm_api_key, integrated_prompt, priority=PRIORITY_HIGH, task="analysis")), incomplete=incomplete)
         wrapped_integrated_llm_analysis = integrated_llm_analysis.strip() if integrated_llm_analysis else "(LLM 통합분석 없음)"
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         print(f"[DEBUG] LLM 산업명 추출 실패: {e}")
         industries = ["기타"]
         wrapped_integrated_llm_analysis = "(LLM 통합분석 실패)"
+    if expired() and wrapped_integrated_llm_analysis in ("(LLM 통합분석 없음)", "(LLM 통합분석 실패)"):
+        # 필수 단계인 통합 분석이 마감으로 끝나지 못함: 미완성 리포트를 완료로 저장하지 않고 실패시켜 작업 큐가 재시도하도록
+        raise DeadlineExceeded("리포트 마감 시간 초과로 통합 분석을 완료하지 못했습니다.")
+    print(prompt_stats.report())
     # 최종 요약 파일 생성 및 저장
     # (4) 전체 줄바꿈 및 가독성 개선
     # 모든 주요 요약/분석 텍스트에 줄바꿈 적용 (표 제외)
@@ -409,8 +597,11 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
     finratio_llm_analysis_wrapped = wrap_lines(wrapped_finratio_llm_analysis, width=45)
     integrated_llm_analysis_wrapped = wrap_lines(wrapped_integrated_llm_analysis, width=45)
 
+    # 리포트 모드/예산 표시 (예산 없는 standard는 표시하지 않아 기존 리포트와 동일)
+    report_header = budget.header()
+    report_header = f"{report_header}\n\n" if report_header else ""
     risk_summary = f"""
-[산업/카테고리]
+{report_header}[산업/카테고리]
 {categories_str}
 
 [산업별 리스크 키워드/이슈]
@@ -425,13 +616,17 @@ def summarize_company_risks(company_name, api_key, llm_api_key, since_date, fina
 [재무비율 표]
 {ratios_table}
 
+[동종업계 비교]
+{peer_summary_str}
+
 [재무비율 해설]
 {finratio_llm_analysis_wrapped}
 
 [통합 LLM 분석]
 {integrated_llm_analysis_wrapped}
 """
-    save_summary_to_file(company_name, risk_summary)
+    if save:
+        save_summary_to_file(company_name, risk_summary)
     return risk_summary
 
   
\ No newline at end of file
@@ -1,6 +1,5 @@
 # [메인 실행 스크립트] 재무분석, 뉴스요약, 리스크 요약 등 전체 워크플로우를 실행합니다.
 from financial import analyze_financial_ratios_multi_year, export_to_csv, plot_financial_ratios
-from news import news_search_and_summary_with_risk
 from risk_summary import summarize_company_risks
 import os
 
@@ -14,6 +13,7 @@ DART_API_KEY = ""
 OPENAI_API_KEY = ""
 NAVER_CLIENT_ID = ""
 NAVER_CLIENT_SECRET = ""
+# 키를 여러 개 쓰려면 환경변수 DART_API_KEYS / OPENAI_API_KEYS / NAVER_CREDENTIALS에 등록하세요 (credentials.py 참고).
 
 import os
 import re
@@ -21,10 +21,90 @@ import re
 def sanitize_filename(name):
     return re.sub(r'[\\/*?:"<>|]', "_", name)
 
-def main():
+def generate_report(company_name, dart_api_key=None, openai_api_key=None, naver_client_id=None, naver_client_secret=None, log=print, checkpoint=None, tier=None, deadline_seconds=None):
+    """
+    회사 1곳의 재무비율 CSV/PNG와 최종리스크요약 TXT를 생성
+    checkpoint: get(stage)/put(stage, value) 객체를 주면 완료된 단계 결과를 저장/재사용 (job_queue 참고)
+    tier: 리포트 모드 quick/standard/deep (없으면 환경변수 REPORT_TIER, 기본 standard, report_tiers.py 참고)
+    deadline_seconds: 리포트 마감(초). 없으면 모드 예산 × REPORT_DEADLINE_FACTOR, 예산 없는 standard는 마감 없음
+    반환값: {'company', 'corp_code', 'csv', 'png', 'txt'} (생성된 파일 경로)
+    """
     import time
-    import sys
+    import pandas as pd
     from dart_api import get_corp_code
+    from risk_summary import run_stage
+    from utils import save_summary_to_file
+    from results_catalog import catalog_run
+    from credentials import credential_pool
+    from report_tiers import ReportBudget
+    from deadline import report_deadline
+    # 시간 예산은 corp_code/재무비율 조회를 포함한 리포트 전체 기준
+    budget = ReportBudget(tier)
+    # 키를 넘기지 않으면 키 풀 사용 (환경변수 DART_API_KEYS 등에 여러 키를 등록했으면 나눠 쓰고, 없으면 아래 단일 키)
+    dart_api_key = dart_api_key or credential_pool("dart", DART_API_KEY)
+    openai_api_key = openai_api_key or credential_pool("openai", OPENAI_API_KEY)
+    if naver_client_id and naver_client_secret:
+        naver_pool = credential_pool("naver", (naver_client_id, naver_client_secret))
+    else:
+        naver_pool = credential_pool("naver", (NAVER_CLIENT_ID, NAVER_CLIENT_SECRET) if NAVER_CLIENT_ID else None)
+    safe_company_name = sanitize_filename(company_name)
+    os.makedirs(f"results/{safe_company_name}", exist_ok=True)
+    current_year = int(time.strftime('%Y'))
+    years = [current_year - 1 - i for i in range(5)]  # 최근 5개년 (올해 제외)
+    # 마감까지 남은 시간을 모든 DART/네이버/LLM 호출 timeout으로 전달 (deadline.py, 마감을 요청한 경우에만)
+    with report_deadline(deadline_seconds if deadline_seconds is not None else budget.deadline_seconds()):
+        log("[INFO] corp_code 추출 시도...")
+        corp_code = get_corp_code(dart_api_key, company_name)
+        log(f"[INFO] corp_code 추출 성공: {corp_code}")
+        # 결과 카탈로그: 이 실행에서 저장되는 파일과 단계 fingerprint를 같은 run_id로 기록 (작업 큐 재시도는 같은 run_id)
+        job_id = getattr(checkpoint, "job_id", None)
+        with catalog_run(company_name, corp_code, run_id=f"job-{job_id}" if job_id is not None else None):
+            log("[INFO] 재무비율 분석 시작...")
+            df = pd.DataFrame(run_stage(checkpoint, "ratios", lambda: analyze_financial_ratios_multi_year(dart_api_key, corp_code, years).to_dict('records')))
+            log("[INFO] 재무비율 분석 완료")
+            csv_name = f"{safe_company_name}_재무비율.csv"
+            png_name = f"{safe_company_name}_재무비율.png"
+            export_to_csv(df, safe_company_name, csv_name)
+            log("[INFO] 재무비율 CSV 저장 완료")
+            plot_financial_ratios(df, safe_company_name, filename=png_name)
+            log("[INFO] 재무비율 그래프 저장 완료")
+            peer_summary = None
+            if budget.plan("peers", reusable=checkpoint is not None and checkpoint.get("peers") is not None) == "full":
+                from memory_utils import MemoryBudgetExceeded
+                try:
+                    from peer_index import peer_percentiles_for_report
+                    peer_summary = run_stage(checkpoint, "peers", lambda: peer_percentiles_for_report(dart_api_key, corp_code, df))
+                    log("[INFO] 동종업계 백분위 계산 완료")
+                except MemoryBudgetExceeded:
+                    raise
+                except Exception as e:
+                    log(f"[경고] 동종업계 백분위 계산 실패: {e}")
+            log(f"[INFO] 리스크 통합 요약 시작... (리포트 모드: {budget.tier})")
+            since_date = f"{current_year - 5}0101"  # 최근 5년치 시작일
+            risk_summary = summarize_company_risks(company_name, dart_api_key, openai_api_key, since_date, df, save=False, checkpoint=checkpoint, peer_summary=peer_summary, budget=budget, naver_pool=naver_pool, log=log)
+            txt_path = save_summary_to_file(safe_company_name, risk_summary)
+            log("[INFO] 리스크 통합 요약 완료")
+    return {
+        "company": company_name,
+        "corp_code": corp_code,
+        "csv": os.path.join("results", safe_company_name, csv_name),
+        "png": os.path.join("results", safe_company_name, png_name),
+        "txt": txt_path,
+    }
+
+def main():
+    # 사용법: python run.py [회사명] [--tier quick|standard|deep]
+    import sys
+    
+    # 리포트 모드 옵션 분리
+    tier = None
+    if "--tier" in sys.argv:
+        i = sys.argv.index("--tier")
+        if i + 1 >= len(sys.argv):
+            print("[ERROR] --tier 뒤에 quick/standard/deep 중 하나를 입력해주세요.")
+            return
+        tier = sys.argv[i + 1]
+        del sys.argv[i:i + 2]
     
     # 명령행 인수가 있는지 확인
     if len(sys.argv) > 1:
@@ -50,43 +130,16 @@ def main():
     
     print(f"[INFO] 회사명 입력 완료: {company_name}")
     safe_company_name = sanitize_filename(company_name)
-    os.makedirs(f"results/{safe_company_name}", exist_ok=True)
-    current_year = int(time.strftime('%Y'))
-    years = [current_year - 1 - i for i in range(5)]  # 최근 5개년 (올해 제외)
     try:
-        print("[INFO] corp_code 추출 시도...")
-        corp_code = get_corp_code(DART_API_KEY, company_name)
-        print(f"[INFO] corp_code 추출 성공: {corp_code}")
+        report = generate_report(company_name, tier=tier)
+        print(f"[최종리스크요약 저장 완료] {report['txt']}")
     except Exception as e:
-        print(f"[ERROR] corp_code 추출 실패: {e}")
+        print(f"[ERROR] 리포트 생성 실패: {e}")
         import traceback
         traceback.print_exc()
         return
-    print("[INFO] 재무비율 분석 시작...")
-    df = analyze_financial_ratios_multi_year(DART_API_KEY, corp_code, years)
-    print("[INFO] 재무비율 분석 완료")
-    export_to_csv(df, safe_company_name, f"{safe_company_name}_재무비율.csv")
-    print("[INFO] 재무비율 CSV 저장 완료")
-    plot_financial_ratios(df, safe_company_name, filename=f"{safe_company_name}_재무비율.png")
-    print("[INFO] 재무비율 그래프 저장 완료")
-    print("[INFO] 리스크 요약 시작...")
-    # 1. 리스크 요약 생성 및 저장
-    try:
-        from risk_summary import summarize_company_risks
-        since_date = f"{current_year - 5}0101"  # 최근 5년치 시작일
-        print("[INFO] 뉴스 요약 시작...")
-        news = news_search_and_summary_with_risk(company_name, since_date, df, OPENAI_API_KEY, naver_client_id=NAVER_CLIENT_ID, naver_client_secret=NAVER_CLIENT_SECRET, min_news=10)
-        print("[INFO] 뉴스 요약 완료")
-        print("[INFO] 리스크 통합 요약 시작...")
-        risk_summary = summarize_company_risks(company_name, DART_API_KEY, OPENAI_API_KEY, since_date, df, naver_client_id=NAVER_CLIENT_ID, naver_client_secret=NAVER_CLIENT_SECRET)
-        print("[INFO] 리스크 통합 요약 완료")
-        print(f"[최종리스크요약 저장 완료] results/{safe_company_name}/{safe_company_name}_최종리스크요약.txt")
-    except Exception as e:
-        print(f"[ERROR] 최종리스크요약 생성 실패: {e}")
-        import traceback
-        traceback.print_exc()
     # 2. 결과 저장 경로 안내
     print(f"\n모든 결과가 results/{safe_company_name}/ 폴더에 저장되었습니다. (CSV, PNG, 최종리스크요약)")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,282 @@
+# [리포트 서비스 모듈] 로컬 HTTP 서비스로 리포트 작업을 접수/실행하고 결과 파일을 제공합니다.
+# 프로세스가 계속 살아있으므로 corp_code 인덱스, HTTP 커넥션 풀, LLM 응답 캐시가 요청 간에 재사용됩니다.
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+from credentials import pools_usage
+from singleflight import singleflight_metrics
+from deadline import hedge_metrics
+from report_tiers import REPORT_TIERS
+from results_catalog import company_key
+
+SERVICE_WORKERS = int(os.getenv("REPORT_SERVICE_WORKERS", "4"))          # 동시 실행 작업 수
+SERVICE_MAX_QUEUE = int(os.getenv("REPORT_SERVICE_MAX_QUEUE", "32"))     # 전체 대기열 한도 (초과 시 503)
+SERVICE_TENANT_RUNNING = int(os.getenv("REPORT_SERVICE_TENANT_RUNNING", "2"))  # 테넌트별 동시 실행 한도
+SERVICE_TENANT_QUEUE = int(os.getenv("REPORT_SERVICE_TENANT_QUEUE", "8"))      # 테넌트별 대기 한도 (초과 시 429)
+SERVICE_JOB_RETENTION = 24 * 3600  # 완료 작업 보관 시간(초)
+SERVICE_JOB_EVENTS = int(os.getenv("REPORT_SERVICE_JOB_EVENTS", "500"))  # 작업별로 보관하는 최근 진행 로그 수
+
+ARTIFACT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "png": "image/png",
+    "txt": "text/plain; charset=utf-8",
+}
+
+class QueueFullError(Exception):
+    """대기열 한도 초과 (status: HTTP 상태 코드)"""
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+class ReportJobManager:
+    """
+    리포트 작업 대기열 + 고정 크기 워커 풀
+    - 테넌트별 동시 실행/대기 한도를 두고, 한도를 넘으면 접수 단계에서 거절(backpressure)
+    - 워커는 실행 한도에 걸리지 않은 테넌트의 가장 오래된 작업부터 처리
+    - 같은 회사 작업은 한 번에 하나만 실행 (results/<회사>/ 결과 파일을 같은 경로에 쓰므로)
+    """
+    def __init__(self, run_job, workers=SERVICE_WORKERS, max_queue=SERVICE_MAX_QUEUE, tenant_running=SERVICE_TENANT_RUNNING, tenant_queue=SERVICE_TENANT_QUEUE):
+        self.run_job = run_job
+        self.max_queue = max_queue
+        self.tenant_running = tenant_running
+        self.tenant_queue = tenant_queue
+        self.jobs = {}
+        self.pending = deque()
+        self.running = {}  # tenant -> 실행 중 작업 수
+        self.running_companies = set()  # 실행 중인 회사 (results/ 폴더명 기준)
+        self.cond = threading.Condition()
+        self.threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, workers))]
+        for t in self.threads:
+            t.start()
+
+    def submit(self, tenant, company_name, tier=None):
+        with self.cond:
+            self._expire_old_jobs()
+            if len(self.pending) >= self.max_queue:
+                raise QueueFullError("대기열이 가득 찼습니다. 잠시 후 다시 시도하세요.", 503)
+            if sum(1 for j in self.pending if j["tenant"] == tenant) >= self.tenant_queue:
+                raise QueueFullError(f"테넌트 '{tenant}'의 대기 작업 한도를 초과했습니다.", 429)
+            job = {
+                "id": uuid.uuid4().hex,
+                "tenant": tenant,
+                "company": company_name,
+                "tier": tier,
+                "status": "queued",
+                "events": deque(maxlen=SERVICE_JOB_EVENTS),
+                "event_count": 0,  # 지금까지 쌓인 전체 이벤트 수 (오래된 이벤트는 events에서 밀려남)
+                "artifacts": {},
+                "error": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self.jobs[job["id"]] = job
+            self.pending.append(job)
+            self._event(job, "[INFO] 작업 접수")
+            self.cond.notify_all()
+            return job
+
+    def get(self, job_id):
+        with self.cond:
+            return self.jobs.get(job_id)
+
+    def snapshot(self, job):
+        with self.cond:
+            return {k: v for k, v in job.items() if k not in ("events", "event_count")} | {"events": job["event_count"]}
+
+    def wait_events(self, job, offset, timeout=15):
+        """
+        offset(지금까지 받은 이벤트 수) 이후 이벤트가 생기거나 작업이 끝날 때까지 대기 후 (새 이벤트, 다음 offset, 종료 여부) 반환
+        보관 한도를 넘어 이미 밀려난 이벤트는 건너뜀
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: job["event_count"] > offset or job["status"] in ("done", "failed"), timeout=timeout)
+            dropped = job["event_count"] - len(job["events"])
+            events = list(job["events"])[max(0, offset - dropped):]
+            return events, job["event_count"], job["status"] in ("done", "failed")
+
+    def metrics(self):
+        with self.cond:
+            return {
+                "queued": len(self.pending),
+                "running": sum(self.running.values()),
+                "running_by_tenant": dict(self.running),
+                "workers": len(self.threads),
+                "jobs": len(self.jobs),
+                "credentials": pools_usage(),
+                "singleflight": singleflight_metrics(),
+                "hedging": hedge_metrics(),
+            }
+
+    def _event(self, job, message):
+        job["events"].append({"ts": time.time(), "message": message})
+        job["event_count"] += 1
+        self.cond.notify_all()
+
+    def _next_job(self):
+        for job in self.pending:
+            if self.running.get(job["tenant"], 0) < self.tenant_running and company_key(job["company"]) not in self.running_companies:
+                self.pending.remove(job)
+                return job
+        return None
+
+    def _expire_old_jobs(self):
+        now = time.time()
+        for job_id in [j["id"] for j in self.jobs.values() if j["finished_at"] and now - j["finished_at"] > SERVICE_JOB_RETENTION]:
+            del self.jobs[job_id]
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                job = None
+                while job is None:
+                    job = self._next_job()
+                    if job is None:
+                        self.cond.wait()
+                tenant = job["tenant"]
+                self.running[tenant] = self.running.get(tenant, 0) + 1
+                self.running_companies.add(company_key(job["company"]))
+                job["status"] = "running"
+                job["started_at"] = time.time()
+                self._event(job, "[INFO] 작업 시작")
+
+            def log(message, job=job):
+                with self.cond:
+                    self._event(job, str(message))
+
+            try:
+                artifacts = self.run_job(job["company"], log, job["tier"])
+                status, error = "done", None
+            except Exception as e:
+                artifacts, status, error = {}, "failed", str(e)
+            with self.cond:
+                self.running[tenant] -= 1
+                if not self.running[tenant]:
+                    del self.running[tenant]
+                self.running_companies.discard(company_key(job["company"]))
+                job["artifacts"] = {k: v for k, v in artifacts.items() if k in ARTIFACT_TYPES and v}
+                job["status"] = status
+                job["error"] = error
+                job["finished_at"] = time.time()
+                self._event(job, "[INFO] 작업 완료" if status == "done" else f"[ERROR] 작업 실패: {error}")
+
+def _run_report_job(company_name, log, tier=None):
+    from run import generate_report
+    return generate_report(company_name, log=log, tier=tier)
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs                       {"company": "삼성전자", "tier": "quick"} (tier 생략 시 REPORT_TIER, 헤더 X-Tenant로 테넌트 구분)
+    GET  /jobs/<id>                  작업 상태
+    GET  /jobs/<id>/events           진행 로그 스트림 (text/event-stream)
+    GET  /jobs/<id>/artifacts/<csv|png|txt>
+    GET  /metrics, /health
+    """
+    manager = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/jobs":
+            return self._send_json(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self._send_json(400, {"error": "JSON 본문이 올바르지 않습니다."})
+        company_name = str(body.get("company", "")).strip()
+        if len(company_name) < 2 or "/" in company_name or "\\" in company_name:
+            return self._send_json(400, {"error": "유효한 회사명을 입력해주세요."})
+        tier = body.get("tier") or None
+        if tier is not None and tier not in REPORT_TIERS:
+            return self._send_json(400, {"error": f"리포트 모드는 {', '.join(REPORT_TIERS)} 중 하나여야 합니다."})
+        tenant = self.headers.get("X-Tenant", "default")
+        try:
+            job = self.manager.submit(tenant, company_name, tier)
+        except QueueFullError as e:
+            return self._send_json(e.status, {"error": str(e)}, headers={"Retry-After": "30"})
+        return self._send_json(202, {"job_id": job["id"], "status": job["status"]}, headers={"Location": f"/jobs/{job['id']}"})
+
+    def do_GET(self):
+        parts = [p for p in urlparse(self.path).path.split("/") if p]
+        if parts == ["health"]:
+            return self._send_json(200, {"status": "ok"})
+        if parts == ["metrics"]:
+            return self._send_json(200, self.manager.metrics())
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "not found"})
+        job = self.manager.get(parts[1])
+        if job is None:
+            return self._send_json(404, {"error": "작업을 찾을 수 없습니다."})
+        if len(parts) == 2:
+            return self._send_json(200, self.manager.snapshot(job))
+        if parts[2:] == ["events"]:
+            return self._stream_events(job)
+        if len(parts) == 4 and parts[2] == "artifacts" and parts[3] in ARTIFACT_TYPES:
+            return self._send_artifact(job, parts[3])
+        return self._send_json(404, {"error": "not found"})
+
+    def _stream_events(self, job):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        offset = 0
+        try:
+            while True:
+                events, offset, finished = self.manager.wait_events(job, offset)
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if finished and not events:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_artifact(self, job, kind):
+        path = job["artifacts"].get(kind)
+        if job["status"] != "done" or not path or not os.path.exists(path):
+            return self._send_json(404, {"error": f"{kind} 결과 파일이 없습니다.", "status": job["status"]})
+        self.send_response(200)
+        self.send_header("Content-Type", ARTIFACT_TYPES[kind])
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(64 * 1024)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+def serve(host="127.0.0.1", port=8080, run_job=_run_report_job):
+    ReportRequestHandler.manager = ReportJobManager(run_job)
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    server.daemon_threads = True
+    print(f"[INFO] 리포트 서비스 시작: http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("[INFO] 리포트 서비스 종료")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    # 사용법: python service.py [포트]
+    serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
@@ -0,0 +1,153 @@
+# [요청 병합 모듈] 동시에 들어온 같은 요청(같은 key)을 실행 1회로 합쳐 결과/예외를 모든 호출자에게 나눠줍니다.
+# 캐시가 비어 있는 첫 실행에서 여러 작업이 같은 corpCode/company.json/LLM 프롬프트를 동시에 호출하는 중복을 없앱니다.
+# - 스레드용 SingleFlight: 먼저 온 호출(leader)만 실행하고 나머지는 완료를 기다림
+# - asyncio용 AsyncSingleFlight: 실행을 Task 하나로 공유, 대기자 하나가 취소돼도 다른 대기자는 계속 기다리며 모두 취소되면 Task도 취소
+# 결과 객체는 호출자 사이에 공유되므로 변경하지 않는 값(bytes, 문자열, 튜플 등)만 반환해야 합니다.
+# (requests.Response는 http_utils.response_snapshot으로 바꿔 공유하고 호출자마다 새 Response로 복원)
+import asyncio
+import threading
+import weakref
+from deadline import DeadlineExceeded, expired, remaining
+
+class _Call:
+    __slots__ = ("event", "result", "error", "aborted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.aborted = False
+
+class SingleFlight:
+    """스레드 간 요청 병합 그룹 (name: 통계 표시용)"""
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "shared": 0, "errors": 0}
+
+    def do(self, key, fn):
+        """key가 같은 호출이 진행 중이면 그 결과를 기다려 반환(예외도 그대로 전달), 없으면 fn() 실행"""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.stats["executed"] += 1
+                else:
+                    self.stats["shared"] += 1
+            if leader:
+                return self._run(key, call, fn)
+            # 대기자는 자신의 리포트 마감까지만 기다림 (leader의 마감이 더 늦을 수 있음)
+            if not call.event.wait(remaining()):
+                raise DeadlineExceeded(f"리포트 마감 시간 초과로 {self.name} 요청 대기 중단")
+            if call.aborted:
+                # leader가 KeyboardInterrupt나 자신의 리포트 마감 초과로 중단됨: 결과가 없으므로 대기자가 다시 실행
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def _run(self, key, call, fn):
+        try:
+            call.result = fn()
+            return call.result
+        except DeadlineExceeded:
+            call.aborted = True
+            raise
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        except BaseException:
+            call.aborted = True
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._calls))
+
+class AsyncSingleFlight:
+    """이벤트 루프 안의 요청 병합 그룹 (루프마다 따로 생성: get_async_flight 사용)"""
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # key → [task, 대기자 수]
+        self.stats = {"executed": 0, "shared": 0, "errors": 0}
+
+    async def do(self, key, coro_fn):
+        while True:
+            try:
+                return await self._do(key, coro_fn)
+            except DeadlineExceeded:
+                # 공유 Task는 먼저 요청한 쪽의 마감으로 실행됨: 내 마감이 남았으면 다시 실행
+                if expired():
+                    raise
+
+    async def _do(self, key, coro_fn):
+        entry = self._calls.get(key)
+        if entry is None:
+            task = asyncio.ensure_future(coro_fn())
+            entry = self._calls[key] = [task, 0]
+            self.stats["executed"] += 1
+            task.add_done_callback(lambda t, key=key: self._done(key, t))
+        else:
+            self.stats["shared"] += 1
+        entry[1] += 1
+        try:
+            # shield: 이 대기자가 취소돼도 공유 Task는 계속 실행
+            return await asyncio.shield(entry[0])
+        except asyncio.CancelledError:
+            if not entry[0].done() and entry[1] == 1:
+                # 마지막 대기자까지 취소됨 → 실행 중단 (이후 들어오는 같은 요청은 새로 실행)
+                if self._calls.get(key) is entry:
+                    del self._calls[key]
+                entry[0].cancel()
+            raise
+        finally:
+            entry[1] -= 1
+
+    def _done(self, key, task):
+        entry = self._calls.get(key)
+        if entry is not None and entry[0] is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def metrics(self):
+        return dict(self.stats, in_flight=len(self._calls))
+
+# 용도별 공용 그룹 (스레드)
+dart_flight = SingleFlight("dart")
+naver_flight = SingleFlight("naver")
+llm_flight = SingleFlight("llm")
+
+# 이벤트 루프 → {name: AsyncSingleFlight}
+_async_flights = weakref.WeakKeyDictionary()
+
+def get_async_flight(name):
+    """현재 이벤트 루프의 name 그룹 (Task는 루프에 묶이므로 루프별로 따로 유지)"""
+    loop = asyncio.get_running_loop()
+    flights = _async_flights.setdefault(loop, {})
+    if name not in flights:
+        flights[name] = AsyncSingleFlight(name)
+    return flights[name]
+
+def request_key(url, params, scope=None):
+    """
+    GET 요청 병합 key (인증키 파라미터는 호출자가 제외하고 넘김)
+    scope: 키 풀 식별값(CredentialPool.identity). 다른 키로 호출한 요청끼리는 병합하지 않음
+    """
+    return (scope, url, tuple(sorted((k, str(v)) for k, v in (params or {}).items())))
+
+def singleflight_metrics():
+    return {flight.name: flight.metrics() for flight in (dart_flight, naver_flight, llm_flight)}
@@ -45,8 +45,12 @@ def save_summary_to_file(company_name, summary):
     os.makedirs(result_dir, exist_ok=True)
     filename = os.path.join(result_dir, f"{company_name}_최종리스크요약.txt")
     filename = get_unique_filepath(filename)
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(summary)
+    from results_catalog import atomic_output, record_artifact
+    with atomic_output(filename) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(summary)
+    record_artifact(filename, company_name)
+    return filename
 
 def clean_news_text(text):
     """뉴스 원문 내 HTML 엔티티, 특수문자, 불필요한 공백/줄바꿈을 정제"""
@@ -0,0 +1,212 @@
+# [공시 감시 모듈] 관심 기업의 신규 DART 공시를 감지해, 변경된 회사의 변경된 단계만 리포트를 재생성합니다.
+import os
+import sys
+import time
+import datetime
+from cache_utils import DiskCache
+from risk_summary import REPORT_STAGE_DEPENDENCIES, dependent_stages
+
+WATCH_BULK_THRESHOLD = 20          # 관심 기업이 이보다 많으면 회사 미지정 전체 공시목록으로 조회
+WATCH_MAX_LOOKBACK_DAYS = 90       # 회사 미지정 list.json 조회 가능 기간(3개월), 회사별 조회는 제한 없음
+NEWS_REFRESH_SECONDS = 24 * 3600   # 뉴스 단계는 공시와 무관하게 하루 단위로 갱신
+
+# 보고서명 키워드 → 다시 계산해야 하는 단계
+KEY_REPORT_STAGES = {
+    "사업보고서": ["yearly_reports", "ratios"],
+    "감사보고서": ["yearly_reports"],
+    "반기보고서": ["yearly_reports"],
+    "분기보고서": ["yearly_reports"],
+}
+
+# corp_code → 마지막으로 처리한 접수번호(rcept_no, YYYYMMDD + 일련번호라 문자열 비교로 순서 판단)
+watch_cursor_cache = DiskCache("watch_cursor")
+report_stage_cache = DiskCache("report_stages")
+# corp_code → 리포트 재생성이 실패해 다음 점검에서 다시 계산할 단계 (이미 무효화되어 체크포인트에 없음)
+watch_retry_cache = DiskCache("watch_retry")
+
+class CompanyCheckpoint:
+    """corp_code 단위로 실행 간 유지되는 리포트 단계별 체크포인트 (generate_report의 checkpoint 인자로 사용)"""
+    def __init__(self, corp_code, max_age=None):
+        self.corp_code = corp_code
+        self.max_age = max_age or {"news": NEWS_REFRESH_SECONDS}
+
+    def _key(self, stage):
+        return f"{self.corp_code}:{stage}"
+
+    def get(self, stage):
+        entry = report_stage_cache.get(self._key(stage))
+        return entry["value"] if entry else None
+
+    def put(self, stage, value):
+        report_stage_cache.set(self._key(stage), {"value": value, "ts": time.time()})
+
+    def invalidate(self, stages):
+        """stages와 그 하위 단계를 모두 삭제하고, 삭제된 단계 목록 반환"""
+        removed = dependent_stages(stages)
+        for stage in removed:
+            report_stage_cache.delete(self._key(stage))
+        return removed
+
+    def expire_stale(self):
+        """max_age가 지난 단계(예: 뉴스)를 하위 단계와 함께 무효화"""
+        now = time.time()
+        stale = []
+        for stage, max_age in self.max_age.items():
+            entry = report_stage_cache.get(self._key(stage))
+            if entry and now - entry["ts"] > max_age:
+                stale.append(stage)
+        return self.invalidate(stale) if stale else set()
+
+def stages_for_disclosure(item):
+    """신규 공시 1건으로 인해 입력이 바뀌는 루트 단계"""
+    stages = {"filings"}
+    report_nm = item.get("report_nm", "")
+    for keyword, keyword_stages in KEY_REPORT_STAGES.items():
+        if keyword in report_nm:
+            stages.update(keyword_stages)
+    return stages
+
+def poll_new_disclosures(api_key, cursors, today=None):
+    """
+    cursors: {corp_code: 마지막 rcept_no}
+    반환값: {corp_code: [커서 이후 신규 공시 item]}
+    - 관심 기업이 많으면 기간 내 전체 공시를 페이지 단위로 한 번에 조회하고 관심 기업만 필터
+      (전체 조회는 최근 WATCH_MAX_LOOKBACK_DAYS일까지만 가능하므로, 커서가 그보다 오래된 회사는 회사별로 조회)
+    - 적으면 회사별로 커서 날짜 이후만 조회
+    """
+    from dart_api import iter_disclosures
+    today = today or datetime.date.today()
+    earliest = (today - datetime.timedelta(days=WATCH_MAX_LOOKBACK_DAYS)).strftime('%Y%m%d')
+    end_de = today.strftime('%Y%m%d')
+    new_items = {corp_code: [] for corp_code in cursors}
+    sources = []
+    per_company = dict(cursors)
+    if len(cursors) > WATCH_BULK_THRESHOLD:
+        recent = {code: cursor for code, cursor in cursors.items() if cursor[:8] >= earliest}
+        if recent:
+            sources.append((None, min(cursor[:8] for cursor in recent.values())))
+        per_company = {code: cursor for code, cursor in cursors.items() if code not in recent}
+    sources += [(corp_code, cursor[:8]) for corp_code, cursor in per_company.items()]
+    seen = set()
+    for corp_code, bgn_de in sources:
+        for item in iter_disclosures(api_key, bgn_de, end_de=end_de, corp_code=corp_code):
+            code, rcept_no = item.get("corp_code"), item.get("rcept_no", "")
+            if code in cursors and rcept_no > cursors[code] and rcept_no not in seen:
+                seen.add(rcept_no)
+                new_items[code].append(item)
+    return {code: items for code, items in new_items.items() if items}
+
+def latest_rcept_no(api_key, corp_code, today):
+    """오늘까지 접수된 이 회사의 마지막 접수번호 (최초 등록 시 커서: 리포트에 이미 반영된 오늘 공시를 다시 처리하지 않도록)"""
+    from dart_api import iter_disclosures
+    end_de = today.strftime('%Y%m%d')
+    rcept_nos = [item.get("rcept_no", "") for item in iter_disclosures(api_key, end_de, end_de=end_de, corp_code=corp_code)]
+    return max([end_de + "000000"] + rcept_nos)
+
+def _regenerate_report(company_name, checkpoint):
+    from run import generate_report
+    return generate_report(company_name, checkpoint=checkpoint)
+
+def _try_regenerate(regenerate, name, checkpoint):
+    """회사 1곳 리포트 재생성. 실패해도 다른 회사 처리를 계속하도록 오류만 출력하고 False 반환 (batch.run_batch와 같은 회사 단위 격리)"""
+    try:
+        regenerate(name, checkpoint)
+        return True
+    except Exception as e:
+        print(f"[ERROR] 리포트 재생성 실패, 다음 점검에서 재시도: {name}: {e}")
+        return False
+
+def run_watch_once(company_names, api_key=None, regenerate=_regenerate_report, today=None):
+    """
+    관심 기업 목록을 1회 점검
+    - 커서가 없는 회사: 전체 리포트 생성 후 리포트 생성 직전의 마지막 접수번호로 커서 설정
+    - 신규 공시가 있는 회사: 영향받는 단계만 무효화하고 나머지는 체크포인트 재사용
+    - 신규 공시가 없어도 갱신 주기가 지난 단계(뉴스)가 있으면 그 단계만 다시 계산
+    - 재생성이 실패한 회사는 커서를 옮기지 않고 무효화한 단계를 기록해 다음 점검에서 다시 시도 (다른 회사는 계속 처리)
+    반환값: {회사명: 재계산된 단계 목록} (실패한 회사 제외)
+    """
+    from dart_api import load_corp_code_index
+    if api_key is None:
+        from run import DART_API_KEY
+        from credentials import credential_pool
+        api_key = credential_pool("dart", DART_API_KEY)
+    today = today or datetime.date.today()
+    by_name = load_corp_code_index(api_key)["by_name"]
+    names_by_code = {}
+    for name in company_names:
+        if name in by_name:
+            names_by_code[by_name[name]] = name
+        else:
+            print(f"[경고] corp_code를 찾을 수 없어 감시 대상에서 제외: {name}")
+    cursors = {}
+    regenerated = {}
+    for corp_code, name in names_by_code.items():
+        cursor = watch_cursor_cache.get(corp_code)
+        if cursor is None:
+            print(f"[INFO] 최초 감시 등록, 전체 리포트 생성: {name}")
+            checkpoint = CompanyCheckpoint(corp_code)
+            checkpoint.invalidate(REPORT_STAGE_DEPENDENCIES.keys())
+            try:
+                initial_cursor = latest_rcept_no(api_key, corp_code, today)
+            except Exception as e:
+                print(f"[ERROR] 최초 커서 조회 실패, 다음 점검에서 재시도: {name}: {e}")
+                continue
+            if not _try_regenerate(regenerate, name, checkpoint):
+                continue
+            watch_cursor_cache.set(corp_code, initial_cursor)
+            regenerated[name] = sorted(REPORT_STAGE_DEPENDENCIES.keys())
+        else:
+            cursors[corp_code] = cursor
+    if not cursors:
+        return regenerated
+    new_disclosures = poll_new_disclosures(api_key, cursors, today=today)
+    for corp_code in cursors:
+        name = names_by_code[corp_code]
+        items = new_disclosures.get(corp_code, [])
+        roots = set()
+        for item in items:
+            roots |= stages_for_disclosure(item)
+        checkpoint = CompanyCheckpoint(corp_code)
+        retry = set(watch_retry_cache.get(corp_code) or [])
+        stages = (checkpoint.invalidate(roots) if roots else set()) | checkpoint.expire_stale() | retry
+        if not stages:
+            continue
+        if items:
+            print(f"[INFO] 신규 공시 {len(items)}건: {name} → 재계산 단계 {sorted(stages)}")
+        elif retry:
+            print(f"[INFO] 이전 재생성 실패 재시도: {name} → 재계산 단계 {sorted(stages)}")
+        else:
+            print(f"[INFO] 갱신 주기 경과: {name} → 재계산 단계 {sorted(stages)}")
+        if not _try_regenerate(regenerate, name, checkpoint):
+            watch_retry_cache.set(corp_code, sorted(stages))
+            continue
+        if retry:
+            watch_retry_cache.delete(corp_code)
+        if items:
+            watch_cursor_cache.set(corp_code, max(item["rcept_no"] for item in items))
+        regenerated[name] = sorted(stages)
+    return regenerated
+
+def load_watchlist(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+if __name__ == "__main__":
+    # 사용법: python watch.py watchlist.txt [--loop 초]
+    args = sys.argv[1:]
+    if not args:
+        print("사용법: python watch.py watchlist.txt [--loop 초]")
+        sys.exit(1)
+    interval = int(args[args.index("--loop") + 1]) if "--loop" in args else None
+    while True:
+        if interval is None:
+            result = run_watch_once(load_watchlist(args[0]), api_key=os.getenv("DART_API_KEY") or None)
+            print(f"[INFO] 감시 완료: 재생성 {len(result)}개사")
+            break
+        # 반복 실행 중에는 공시 조회 오류 등으로 감시를 멈추지 않고 다음 주기에 다시 점검
+        try:
+            result = run_watch_once(load_watchlist(args[0]), api_key=os.getenv("DART_API_KEY") or None)
+            print(f"[INFO] 감시 완료: 재생성 {len(result)}개사")
+        except Exception as e:
+            print(f"[ERROR] 감시 점검 실패, {interval}초 후 재시도: {e}")
+        time.sleep(interval)